@@ -0,0 +1,17 @@
+# backend/answer_cache.py
+from backend.shared_cache import TieredCache
+
+
+class AnswerCache(TieredCache):
+    """
+    Bộ nhớ đệm câu trả lời cuối cùng của chatbot.
+
+    - Khóa: (intent, (program, course, semester), câu hỏi đã chuẩn hóa).
+    - Giới hạn max_entries, loại bỏ theo LRU.
+    - TTL riêng cho từng intent (truyền vào khi set, 0 → không cache).
+    - Xóa toàn bộ khi phiên bản đồ thị thay đổi.
+    - shared: store chung của cụm (backend/shared_cache.py) → mỗi câu trả lời chỉ gọi LLM 1 lần cho mọi worker.
+    """
+
+    def __init__(self, max_entries=1000, shared=None):
+        super().__init__(max_entries=max_entries, namespace="answer", shared=shared)
@@ -0,0 +1,146 @@
+# backend/answer_templates.py
+"""
+Câu trả lời dựng thẳng từ dữ liệu Neo4j, không gọi LLM, cho các intent chỉ cần trình bày dữ liệu
+(danh sách CTĐT, khung năng lực ngoại ngữ, số tín chỉ của 1 CTĐT).
+
+- Mỗi hàm render_*(data, question) trả về chuỗi markdown, hoặc None nếu câu hỏi cần LLM diễn giải
+  → ChatbotLogic dùng request LLM như cũ.
+- Hàm nào dùng cho intent nào: khóa "template" trong INTENT_PIPELINES (chatbot_logic.py).
+"""
+import re
+
+from backend.prompt_serializer import format_value
+
+HE = [("ky_su", "Kỹ sư"), ("cu_nhan", "Cử nhân")]
+
+LANGUAGE_NAMES = {
+    "TiengAnh": "Tiếng Anh",
+    "TiengPhap": "Tiếng Pháp",
+    "TiengNhat": "Tiếng Nhật",
+    "TiengTrung": "Tiếng Trung",
+}
+
+CERTIFICATE_NAMES = {
+    "chung_chi": "Chứng chỉ",
+    "TOEFL_iBT": "TOEFL iBT",
+    "TOEFL_ITP": "TOEFL ITP",
+    "NAT_TEST": "NAT-TEST",
+    "TOP_J": "TOP J",
+    "DELF_va_DALF": "DELF/DALF",
+}
+
+
+def _has_value(value):
+    return value is not None and value != ""
+
+
+def _credits_line(record, he_key, he_label):
+    """
+    "Hệ Kỹ sư: 180 tín chỉ (150 bắt buộc, 30 tự chọn)", None nếu CTĐT không có dữ liệu hệ này.
+    """
+    tong = record.get(f"tong_so_tin_chi_yeu_cau_doi_voi_{he_key}")
+    bat_buoc = record.get(f"so_tin_chi_bat_buoc_doi_voi_{he_key}")
+    tu_chon = record.get(f"so_tin_chi_tu_chon_doi_voi_{he_key}")
+    if not any(_has_value(v) for v in (tong, bat_buoc, tu_chon)):
+        return None
+
+    line = f"Hệ {he_label}: "
+    line += f"{format_value(tong)} tín chỉ" if _has_value(tong) else "chưa có tổng số tín chỉ"
+
+    chi_tiet = []
+    if _has_value(bat_buoc):
+        chi_tiet.append(f"{format_value(bat_buoc)} bắt buộc")
+    if _has_value(tu_chon):
+        chi_tiet.append(f"{format_value(tu_chon)} tự chọn")
+    if chi_tiet:
+        line += f" ({', '.join(chi_tiet)})"
+    return line
+
+
+def _credits_lines(record):
+    return [line for line in (_credits_line(record, key, label) for key, label in HE) if line]
+
+
+# ==========================
+# hoi_danh_sach_ctdt
+# ==========================
+def render_list_course(data, question):
+    programs = [r for r in data or [] if r.get("ten_chuong_trinh")]
+    if not programs:
+        return None
+
+    answer = f"🎓 **Hiện có {len(programs)} chương trình đào tạo:**\n\n"
+    for i, r in enumerate(programs, 1):
+        thong_tin = []
+        if _has_value(r.get("ma_chuong_trinh")):
+            thong_tin.append(f"mã {format_value(r['ma_chuong_trinh'])}")
+        if _has_value(r.get("Khoa")):
+            thong_tin.append(f"khóa {format_value(r['Khoa'])}")
+
+        answer += f"{i}. **{r['ten_chuong_trinh']}**"
+        if thong_tin:
+            answer += f" ({', '.join(thong_tin)})"
+        answer += "\n"
+        for line in _credits_lines(r):
+            answer += f"   • {line}\n"
+    return answer.rstrip()
+
+
+# ==========================
+# hoi_thong_tin_ctdt — chỉ câu hỏi về số tín chỉ
+# ==========================
+def _asks_credits_only(question):
+    q = question.lower()
+    return "tín chỉ" in q and not any(k in q for k in ("học phần", "môn", "khoa nào", "nội dung"))
+
+
+def render_course_credits(data, question):
+    if not isinstance(data, dict) or not _asks_credits_only(question):
+        return None
+
+    lines = _credits_lines(data)
+    if not lines:
+        return None
+
+    ten = data.get("ten_chuong_trinh") or "này"
+    answer = f"🎓 **Số tín chỉ của chương trình đào tạo {ten}**"
+    if data.get("ten_khoa"):
+        answer += f" ({data['ten_khoa']})"
+    answer += ":\n\n" + "\n".join(f"- {line}" for line in lines)
+    return answer
+
+
+# ==========================
+# hoi_khung_nang_luc_ngoai_ngu
+# ==========================
+def _bac_order(bac):
+    digits = re.findall(r"\d+", str(bac))
+    return (int(digits[0]) if digits else float("inf"), str(bac))
+
+
+def _asked_languages(question, languages):
+    # câu hỏi nêu tên ngôn ngữ → chỉ trình bày ngôn ngữ đó
+    q = question.lower()
+    asked = [ng for ng in languages if LANGUAGE_NAMES.get(ng["lang_type"], "").lower() in q]
+    return asked or languages
+
+
+def render_language_framework(data, question):
+    if not isinstance(data, dict) or not data.get("cac_ngon_ngu"):
+        return None
+
+    answer = "🌐 **Khung năng lực ngoại ngữ**\n\n"
+    khai_niem = (data.get("khung") or {}).get("khai_niem")
+    if khai_niem:
+        answer += f"{khai_niem}\n\n"
+
+    answer += "**Các bậc và chứng chỉ tương đương:**\n"
+    for ngon_ngu in _asked_languages(question, data["cac_ngon_ngu"]):
+        answer += f"\n### {LANGUAGE_NAMES.get(ngon_ngu['lang_type'], ngon_ngu['lang_type'])}\n"
+        for bac in sorted(ngon_ngu.get("bac_dict") or {}, key=_bac_order):
+            answer += f"- **{bac}**\n"
+            for cert, values in ngon_ngu["bac_dict"][bac].items():
+                text = format_value([v for v in values if _has_value(v)])
+                if text:
+                    answer += f"   • {CERTIFICATE_NAMES.get(cert, cert)}: {text}\n"
+    return answer.rstrip()
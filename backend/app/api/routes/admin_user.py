@@ -1,13 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, Query 
-from sqlalchemy.orm import Session
-from sqlalchemy import text
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import or_, select, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from backend.app.db.db_postgres import get_db
-from backend.app.db.models_user import User
+from backend.app.db.db_postgres import get_async_db
+from backend.app.db.models_user import User, ConversationSummary
 from backend.app.core.admin_guard import admin_required
+from backend.app.core.pagination import NEXT_CURSOR_HEADER, MAX_PAGE_SIZE, decode_cursor, next_page
+from backend.app.services.principal_cache import principal_cache
 
 from pydantic import BaseModel
 from typing import Optional
+from datetime import datetime
+import os
 
 
 router = APIRouter(
@@ -15,31 +19,71 @@ router = APIRouter(
     tags=["Admin Users"]
 )
 
+ADMIN_PAGE_SIZE = int(os.getenv("ADMIN_PAGE_SIZE", "100"))
+
+
+def _admin_rows_query(before: Optional[str], limit: int, *extra_columns):
+    """
+    Mỗi dòng = 1 conversation của user (user chưa có conversation: 1 dòng, cột conversation NULL),
+    đọc từ conversation_summaries thay vì join conversations + quét messages.
+    Keyset: (user create_at, user id, conversation created_at, conversation id) giảm dần.
+    """
+    s = ConversationSummary
+    query = (
+        select(
+            User.id.label("user_id"),
+            User.username,
+            User.role,
+            User.create_at.label("user_created_at"),
+            s.conversation_id,
+            s.title.label("title_character"),
+            s.conversation_created_at,
+            *extra_columns
+        )
+        .outerjoin(s, s.user_id == User.id)
+        .order_by(User.create_at.desc(), User.id.desc(), s.conversation_created_at.desc(), s.conversation_id.desc())
+        .limit(limit + 1)
+    )
+
+    if before:
+        user_created_at, user_id, conversation_created_at, conversation_id = decode_cursor(
+            before, datetime.fromisoformat, int, datetime.fromisoformat, int
+        )
+        user_key = tuple_(User.create_at, User.id)
+        if conversation_id is None:
+            # dòng cuối trang trước là user không có conversation → user đó đã hết
+            query = query.where(user_key < (user_created_at, user_id))
+        else:
+            # <= trên index users(create_at, id), phần còn lại lọc conversation của chính user cuối trang
+            query = query.where(
+                user_key <= (user_created_at, user_id),
+                or_(
+                    user_key < (user_created_at, user_id),
+                    tuple_(s.conversation_created_at, s.conversation_id) < (conversation_created_at, conversation_id)
+                )
+            )
+    return query
+
+
+def _admin_row_key(r):
+    return r.user_created_at, r.user_id, r.conversation_created_at, r.conversation_id
+
 
 @router.get("")
-def list_users(
-    db: Session = Depends(get_db),
+async def list_users(
+    response: Response,
+    before: Optional[str] = Query(None, description=f"cursor lấy từ header {NEXT_CURSOR_HEADER}"),
+    limit: int = Query(ADMIN_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db),
     _=Depends(admin_required)
 ):
     """
     Mỗi dòng = 1 conversation của user
     Có title_character (tiêu đề đoạn chat)
+    Còn trang sau → header X-Next-Cursor, gửi lại qua ?before=...
     """
-    rows = db.execute(text("""
-        SELECT 
-            u.id               AS user_id,
-            u.username,
-            u.role,
-            u.create_at        AS user_created_at,
-
-            c.id               AS conversation_id,
-            c.title           AS title_character,
-            c.created_at       AS conversation_created_at
-        FROM users u
-        LEFT JOIN conversations c
-            ON u.id = c.user_id
-        ORDER BY u.create_at DESC, c.created_at DESC
-    """)).fetchall()
+    rows = (await db.execute(_admin_rows_query(before, limit))).fetchall()
+    rows = next_page(rows, limit, response, key=_admin_row_key)
 
     return [
         {
@@ -64,13 +108,13 @@ class AdminUpdateUser(BaseModel):
 
 
 @router.put("/{user_id}")
-def update_user(
+async def update_user(
     user_id: int,
     data: AdminUpdateUser,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     _=Depends(admin_required)
 ):
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(404, "User not found")
 
@@ -86,7 +130,8 @@ def update_user(
             raise HTTPException(400, "Invalid role")
         user.role = data.role
 
-    db.commit()
+    await db.commit()
+    await principal_cache.invalidate_async(user_id)
 
     return {"message": "User updated successfully"}
 
@@ -94,17 +139,17 @@ def update_user(
 
 # ================== DELETE USER ==================
 @router.delete("/{user_id}")
-def delete_user(
+async def delete_user(
     user_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     _=Depends(admin_required)
 ):
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
     # Xoá messages
-    db.execute(
+    await db.execute(
         text("""
             DELETE FROM messages
             WHERE conversation_id IN (
@@ -115,26 +160,27 @@ def delete_user(
     )
 
     # Xoá conversations
-    db.execute(
+    await db.execute(
         text("DELETE FROM conversations WHERE user_id = :uid"),
         {"uid": user_id}
     )
 
     # Xoá user
-    db.delete(user)
-    db.commit()
+    await db.delete(user)
+    await db.commit()
+    await principal_cache.invalidate_async(user_id)
 
     return {"message": "User deleted"}
 
 
 # ================== GET USER CONVERSATIONS ==================
 @router.get("/{user_id}/conversations")
-def get_user_conversations(
+async def get_user_conversations(
     user_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     _=Depends(admin_required)
 ):
-    rows = db.execute(
+    rows = (await db.execute(
         text("""
             SELECT 
                 id,
@@ -145,7 +191,7 @@ def get_user_conversations(
             ORDER BY created_at DESC
         """),
         {"uid": user_id}
-    ).fetchall()
+    )).fetchall()
 
     return [
         {
@@ -157,17 +203,21 @@ def get_user_conversations(
     ]
 
 
-# ================== STORED PROCEDURE (OPTIONAL) ==================
+# ================== FULL VIEW (conversation_summaries) ==================
 @router.get("/full")
-def admin_users_full_view(
-    db: Session = Depends(get_db),
+async def admin_users_full_view(
+    response: Response,
+    before: Optional[str] = Query(None, description=f"cursor lấy từ header {NEXT_CURSOR_HEADER}"),
+    limit: int = Query(ADMIN_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db),
     _=Depends(admin_required)
 ):
     """
-    Dùng stored procedure:
-    get_admin_users_conversations()
+    Như GET /admin/users + tin nhắn đầu tiên, thời điểm tin nhắn cuối, số tin nhắn.
+    Trước đây gọi stored procedure get_admin_users_conversations() (LATERAL trên messages cho từng
+    conversation, không phân trang); giờ đọc thẳng bảng tóm tắt do trigger cập nhật.
     """
-    result = db.execute(
-        text("SELECT * FROM get_admin_users_conversations()")
-    )
-    return [dict(row._mapping) for row in result]
+    s = ConversationSummary
+    query = _admin_rows_query(before, limit, s.first_message, s.last_message_at, s.message_count)
+    rows = next_page((await db.execute(query)).fetchall(), limit, response, key=_admin_row_key)
+    return [dict(row._mapping) for row in rows]
@@ -1,12 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from backend.app.db.db_postgres import get_db
+from backend.app.db.db_postgres import get_async_db
 from backend.app.db.models_user import User
 from backend.app.core.security import hash_password, verify_password
 from backend.app.core.jwt_handler import create_access_token, SECRET_KEY, ALGORITHM
+from backend.app.services.principal_cache import load_principal
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
@@ -15,8 +17,8 @@ class AuthRequest(BaseModel):
     password: str
 
 @router.post("/register")
-def register(data: AuthRequest, db: Session = Depends(get_db)):
-    if db.query(User).filter(User.username == data.username).first():
+async def register(data: AuthRequest, db: AsyncSession = Depends(get_async_db)):
+    if await db.scalar(select(User.id).where(User.username == data.username)):
         raise HTTPException(status_code=400, detail="Username already exists")
 
     user = User(
@@ -25,14 +27,13 @@ def register(data: AuthRequest, db: Session = Depends(get_db)):
         password_hash=data.password
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
 
     return {"message": "Register successful"}
 
 @router.post("/login")
-def login(data: AuthRequest, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == data.username).first()
+async def login(data: AuthRequest, db: AsyncSession = Depends(get_async_db)):
+    user = await db.scalar(select(User).where(User.username == data.username))
     if not user or user.password != data.password:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
@@ -50,9 +51,9 @@ def login(data: AuthRequest, db: Session = Depends(get_db)):
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
-def get_current_user(
+async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
@@ -61,7 +62,9 @@ def get_current_user(
         if user_id is None:
             raise HTTPException(status_code=401, detail="Invalid token")
 
-        user = db.query(User).filter(User.id == user_id).first()
+        # sub là chuỗi; asyncpg không tự ép kiểu như psycopg2
+        # Principal từ cache (TTL ngắn) → phần lớn request không cần SELECT users
+        user = await load_principal(db, int(user_id))
         if not user:
             raise HTTPException(status_code=401, detail="User not found")
 
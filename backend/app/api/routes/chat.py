@@ -1,87 +1,160 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from backend.app.db.models_user import User, Conversation, Message
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.app.db.models_user import Conversation, Message
 from backend.app.api.routes.auth import get_current_user
-from backend.app.db.db_postgres import get_db
+from backend.app.db.db_postgres import get_async_db, AsyncSessionLocal
 from backend.app.schemas.chat import MessageRequest, MessageResponse
 from backend.app.services.chatbot_service import ChatbotLogic
+from backend.app.services.chat_persistence import chat_store
+from backend.app.services.principal_cache import Principal
 from backend.app.core.jwt_handler import verify_token
-from sqlalchemy import text
+from backend.app.core.pagination import NEXT_CURSOR_HEADER, MAX_PAGE_SIZE, decode_cursor, next_page
+from backend.metrics import stage
 from datetime import datetime
+from typing import Optional
+import json
+import os
 
 print("🔥 CHAT ROUTER LOADED – SAFE MODE")
 
 router = APIRouter(prefix="/chat", tags=["Chat"])
 
-_chatbot = ChatbotLogic()
+def get_chatbot(request: Request) -> ChatbotLogic:
+    # tạo trong lifespan (backend/app/main.py), không tạo lúc import router
+    return request.app.state.chatbot
+
+# Phân trang lịch sử (keyset, backend/app/core/pagination.py)
+CONVERSATIONS_PAGE_SIZE = int(os.getenv("CONVERSATIONS_PAGE_SIZE", "50"))
+MESSAGES_PAGE_SIZE = int(os.getenv("MESSAGES_PAGE_SIZE", "100"))
+
+async def _find_conversation_id(req: MessageRequest, current_user: Principal, db: AsyncSession):
+    # Conversation có sẵn phải thuộc user; None → conversation mới, tạo lúc lưu tin nhắn
+    if not req.conversation_id:
+        return None
+
+    conversation_id = await db.scalar(
+        select(Conversation.id).where(
+            Conversation.id == req.conversation_id,
+            Conversation.user_id == current_user.id
+        )
+    )
+    if conversation_id is None:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    return conversation_id
+
 
 @router.post("", response_model=MessageResponse)
 async def chat_endpoint(
     req: MessageRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    chatbot: ChatbotLogic = Depends(get_chatbot)
 ):
-    # Tạo hoặc lấy conversation
-    if req.conversation_id:
-        conversation = db.query(Conversation).filter(
-            Conversation.id == req.conversation_id,
-            Conversation.user_id == current_user.id
-        ).first()
-        if not conversation:
-            raise HTTPException(status_code=404, detail="Conversation not found")
-    else:
-        # Tạo conversation mới
-        conversation = Conversation(
-            user_id=current_user.id,
-            title=req.message[:50] if len(req.message) > 50 else req.message
-        )
-        db.add(conversation)
-        db.commit()
-        db.refresh(conversation)
-    
+    conversation_id = await _find_conversation_id(req, current_user, db)
+    user_id = current_user.id
+    asked_at = datetime.utcnow()
+    # kết thúc transaction đọc → không giữ connection trong lúc chờ LLM
+    await db.close()
+
     # Lấy reply từ chatbot
-    reply = _chatbot.chat(req.message)
-    
-    # Lưu user message
-    user_message = Message(
-        conversation_id=conversation.id,
-        role="user",
-        content=req.message
-    )
-    db.add(user_message)
-    db.commit()
-    db.refresh(user_message)
-    
-    # Lưu assistant message
-    assistant_message = Message(
-        conversation_id=conversation.id,
-        role="assistant",
-        content=reply
-    )
-    db.add(assistant_message)
-    db.commit()
-    db.refresh(assistant_message)
-    
+    reply = await chatbot.chat_async(req.message)
+
+    # conversation mới + 2 tin nhắn: 1 transaction (hoặc hàng đợi write-behind)
+    with stage("persist"):
+        conversation_id, message_id = await chat_store.save_exchange(
+            db, user_id, conversation_id, req.message, reply, asked_at
+        )
+
     return MessageResponse(
         reply=reply,
-        conversation_id=conversation.id,
-        message_id=assistant_message.id
+        conversation_id=conversation_id,
+        message_id=message_id
+    )
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+@router.post("/stream")
+async def chat_stream_endpoint(
+    req: MessageRequest,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    chatbot: ChatbotLogic = Depends(get_chatbot)
+):
+    """
+    Server-Sent Events:
+    - event "intent" / "data": các bước của pipeline
+    - event "token": từng đoạn câu trả lời
+    - event "done": đã lưu tin nhắn (conversation_id, message_id)
+    - event "error": lỗi giữa chừng, không lưu tin nhắn
+    """
+    conversation_id = await _find_conversation_id(req, current_user, db)
+    user_id = current_user.id
+    asked_at = datetime.utcnow()
+    # Trả connection về pool ngay: get_async_db chỉ đóng session sau khi stream xong,
+    # giữ nó suốt lúc chờ LLM + mở thêm stream_db → hết pool khi nhiều stream đồng thời
+    await db.close()
+
+    async def event_stream():
+        parts = []
+        try:
+            async for event, payload in chatbot.stream(req.message):
+                if event == "token":
+                    parts.append(payload)
+                    yield _sse("token", {"text": payload})
+                else:
+                    yield _sse(event, payload)
+        except Exception as e:
+            print("❌ Lỗi stream:", e)
+            yield _sse("error", {"detail": "Xin lỗi, hệ thống gặp lỗi khi xử lý câu hỏi."})
+            return
+
+        reply = "".join(parts).strip()
+
+        # Stream xong mới lưu user + assistant message.
+        # Dùng session riêng vì session của Depends(get_async_db) có thể đã đóng khi body đang stream.
+        async with AsyncSessionLocal() as stream_db:
+            with stage("persist"):
+                saved_conversation_id, message_id = await chat_store.save_exchange(
+                    stream_db, user_id, conversation_id, req.message, reply, asked_at
+                )
+
+        yield _sse("done", {
+            "conversation_id": saved_conversation_id,
+            "message_id": message_id
+        })
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
 
 @router.get("/conversations")
-def get_conversations(
+async def get_conversations(
+    response: Response,
+    before: Optional[str] = Query(None, description=f"cursor lấy từ header {NEXT_CURSOR_HEADER}"),
+    limit: int = Query(CONVERSATIONS_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
     token_payload=Depends(verify_token),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
+    """
+    Conversation mới nhất trước, mỗi trang `limit` dòng.
+    Còn trang sau → header X-Next-Cursor, gửi lại qua ?before=... (keyset trên index user_id, created_at, id).
+    """
     user_id = int(token_payload["sub"])
-    rows = db.execute(
-        text("""
-            SELECT id, title, created_at
-            FROM conversations
-            WHERE user_id = :uid
-        """),
-        {"uid": user_id}
-    ).fetchall()
+    query = select(Conversation.id, Conversation.title, Conversation.created_at).where(
+        Conversation.user_id == user_id
+    )
+    if before:
+        cursor = decode_cursor(before, datetime.fromisoformat, int)
+        query = query.where(tuple_(Conversation.created_at, Conversation.id) < cursor)
+    query = query.order_by(Conversation.created_at.desc(), Conversation.id.desc()).limit(limit + 1)
+
+    rows = next_page((await db.execute(query)).fetchall(), limit, response, key=lambda r: (r.created_at, r.id))
 
     conversations =[]
     for r in rows:
@@ -93,36 +166,40 @@ def get_conversations(
     return conversations
 
 @router.get("/conversations/{conversation_id}/messages")
-def get_messages(
+async def get_messages(
     conversation_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    response: Response,
+    before: Optional[str] = Query(None, description=f"cursor lấy từ header {NEXT_CURSOR_HEADER}"),
+    limit: int = Query(MESSAGES_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    conv = db.execute(
-        text(
-        """
-        SELECT id
-        FROM conversations
-        WHERE id = :cid AND user_id = :uid
-        """),
-        {"cid": conversation_id, "uid": current_user.id}
-    ).fetchone()
-
-    if not conv:
+    """
+    `limit` tin nhắn gần nhất, trả theo thứ tự thời gian tăng dần (như cũ).
+    Tin cũ hơn: ?before=<X-Next-Cursor> (keyset trên index conversation_id, created_at, id).
+    """
+    conv = await db.scalar(
+        select(Conversation.id).where(
+            Conversation.id == conversation_id,
+            Conversation.user_id == current_user.id
+        )
+    )
+
+    if conv is None:
         raise HTTPException(status_code=403, detail="Forbidden")
 
-    rows = db.execute(
-        text("""
-        SELECT role, content, created_at
-        FROM messages
-        WHERE conversation_id = :cid
-        ORDER BY created_at ASC
-        """),
-        {"cid": conversation_id}
-    ).fetchall()
+    query = select(Message.id, Message.role, Message.content, Message.created_at).where(
+        Message.conversation_id == conversation_id
+    )
+    if before:
+        cursor = decode_cursor(before, datetime.fromisoformat, int)
+        query = query.where(tuple_(Message.created_at, Message.id) < cursor)
+    query = query.order_by(Message.created_at.desc(), Message.id.desc()).limit(limit + 1)
+
+    rows = next_page((await db.execute(query)).fetchall(), limit, response, key=lambda r: (r.created_at, r.id))
 
     messages = []
-    for r in rows:
+    for r in reversed(rows):
         messages.append({
             "role": r.role,
             "content": r.content,
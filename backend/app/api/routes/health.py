@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+
+
+router = APIRouter(prefix="/health", tags=["Health"])
+
+
+@router.get("/live")
+def live():
+    """
+    Process còn chạy (không kiểm tra Neo4j / Postgres).
+    """
+    return {"status": "ok"}
+
+
+@router.get("/ready")
+def ready(request: Request):
+    """
+    200 khi Neo4j + Postgres đã kết nối và cache nóng đã nạp (xem backend/app/services/warmup.py),
+    503 trong lúc khởi động / đang thử kết nối lại.
+    """
+    readiness = getattr(request.app.state, "readiness", None)
+    if readiness is None:
+        return JSONResponse({"ready": False}, status_code=503)
+    snapshot = readiness.snapshot()
+    return JSONResponse(snapshot, status_code=200 if snapshot["ready"] else 503)
@@ -0,0 +1,29 @@
+import hmac
+import os
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+
+from backend.app.core.admin_guard import admin_required, oauth2_scheme
+from backend.metrics import REGISTRY, CONTENT_TYPE
+
+
+# Token tĩnh cho Prometheus scrape (Authorization: Bearer <METRICS_TOKEN>); không đặt → chỉ admin đọc được
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+router = APIRouter(tags=["Metrics"])
+
+
+def metrics_access(token: str = Depends(oauth2_scheme)):
+    if METRICS_TOKEN and hmac.compare_digest(token.encode(), METRICS_TOKEN.encode()):
+        return
+    admin_required(token)
+
+
+@router.get("/metrics", response_class=PlainTextResponse, dependencies=[Depends(metrics_access)])
+def metrics():
+    """
+    Metrics định dạng Prometheus: thời gian theo intent / từng bước, truy vấn Neo4j,
+    lần gọi + token OpenAI, trạng thái pool và cache.
+    """
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,45 @@
+"""
+Keyset pagination dùng chung cho lịch sử chat và trang admin.
+
+- Cursor = giá trị các cột sắp xếp của dòng cuối trang trước, JSON → base64 (client coi như chuỗi mờ).
+- Cursor trang sau trả qua header X-Next-Cursor → body vẫn là mảng như trước khi có phân trang.
+"""
+import base64
+import json
+from datetime import datetime
+
+from fastapi import HTTPException, Response
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(*values):
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *parsers):
+    """
+    parsers: hàm đổi từng giá trị về kiểu gốc (datetime.fromisoformat, int...); None giữ nguyên.
+    Cursor sai định dạng → 400.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(parsers):
+            raise ValueError(cursor)
+        return tuple(None if v is None else parse(v) for parse, v in zip(parsers, values))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def next_page(rows, limit, response: Response, key):
+    """
+    rows lấy dư 1 dòng (LIMIT limit + 1) để biết còn trang sau;
+    key(row) → tuple giá trị sắp xếp của dòng, làm cursor.
+    """
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(*key(rows[-1]))
+    return rows
@@ -0,0 +1,58 @@
+# backend/app/db/migrate.py
+"""
+Áp các file migrations/*.sql chưa chạy lên DATABASE_URL, theo thứ tự tên file.
+File đã áp ghi vào bảng schema_migrations → chạy lại nhiều lần không sao.
+
+- File thường: cả file chạy trong 1 transaction (gửi nguyên văn → viết được hàm plpgsql).
+- File có CONCURRENTLY (không chạy được trong transaction): tách theo ";" và chạy autocommit từng câu,
+  nên các câu phải chạy lại được (IF NOT EXISTS / IF EXISTS).
+
+    python -m backend.app.db.migrate
+"""
+from pathlib import Path
+
+from sqlalchemy import text
+
+from backend.app.db.db_postgres import engine
+
+MIGRATIONS_DIR = Path(__file__).parent / "migrations"
+
+
+def _statements(sql):
+    lines = [line for line in sql.splitlines() if not line.strip().startswith("--")]
+    return [stmt.strip() for stmt in "\n".join(lines).split(";") if stmt.strip()]
+
+
+def _record(conn, name):
+    conn.execute(text("INSERT INTO schema_migrations (name) VALUES (:name)"), {"name": name})
+
+
+def migrate(bind=engine):
+    with bind.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "name VARCHAR(255) PRIMARY KEY, applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+        ))
+        applied = set(conn.execute(text("SELECT name FROM schema_migrations")).scalars())
+
+    for path in sorted(MIGRATIONS_DIR.glob("*.sql")):
+        if path.name in applied:
+            continue
+        print(f"🛠️ Migration {path.name}")
+        sql = path.read_text(encoding="utf-8")
+
+        if "CONCURRENTLY" in sql:
+            with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                for stmt in _statements(sql):
+                    conn.exec_driver_sql(stmt)
+                _record(conn, path.name)
+        else:
+            with bind.begin() as conn:
+                conn.exec_driver_sql(sql)
+                _record(conn, path.name)
+
+    print("✅ Database đã ở migration mới nhất")
+
+
+if __name__ == "__main__":
+    migrate()
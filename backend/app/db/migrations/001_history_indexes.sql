@@ -0,0 +1,14 @@
+-- Keyset pagination cho lịch sử chat:
+--   GET /chat/conversations                    WHERE user_id = ?         ORDER BY created_at DESC, id DESC
+--   GET /chat/conversations/{id}/messages      WHERE conversation_id = ? ORDER BY created_at DESC, id DESC
+-- CONCURRENTLY: không khóa ghi bảng messages trong lúc tạo index (không chạy được trong transaction).
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_conversations_user_created
+    ON conversations (user_id, created_at, id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_messages_conversation_created
+    ON messages (conversation_id, created_at, id);
+
+-- Index 1 cột cũ trùng phần đầu của index mới → bỏ, đỡ 1 lần ghi index mỗi INSERT
+DROP INDEX CONCURRENTLY IF EXISTS idx_conversations_user_id;
+
+DROP INDEX CONCURRENTLY IF EXISTS idx_messages_conversation_id;
@@ -0,0 +1,132 @@
+-- Bảng tóm tắt conversation cho trang admin (GET /admin/users, /admin/users/full):
+-- tin nhắn đầu tiên, thời điểm tin nhắn cuối, số tin nhắn — cập nhật bằng trigger khi INSERT messages,
+-- thay cho LEFT JOIN LATERAL quét messages cho từng conversation.
+CREATE TABLE IF NOT EXISTS conversation_summaries (
+    conversation_id integer PRIMARY KEY REFERENCES conversations (id) ON DELETE CASCADE,
+    user_id integer NOT NULL,
+    title character varying(255),
+    conversation_created_at timestamp without time zone,
+    first_message text,
+    first_message_at timestamp without time zone,
+    last_message_at timestamp without time zone,
+    message_count integer NOT NULL DEFAULT 0
+);
+
+-- keyset pagination admin: users (create_at, id) → conversation (created_at, id) của từng user
+CREATE INDEX IF NOT EXISTS idx_conversation_summaries_user_created
+    ON conversation_summaries (user_id, conversation_created_at, conversation_id);
+
+CREATE INDEX IF NOT EXISTS idx_users_create_at ON users (create_at, id);
+
+
+-- Conversation mới → 1 dòng tóm tắt rỗng (admin thấy cả conversation chưa có tin nhắn, như trước)
+CREATE OR REPLACE FUNCTION conversation_summaries_on_conversations() RETURNS trigger
+    LANGUAGE plpgsql
+    AS $$
+BEGIN
+    INSERT INTO conversation_summaries (conversation_id, user_id, title, conversation_created_at, message_count)
+    SELECT id, user_id, title, created_at, 0 FROM new_conversations
+    ON CONFLICT (conversation_id) DO NOTHING;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_conversation_summaries_on_conversations ON conversations;
+CREATE TRIGGER trg_conversation_summaries_on_conversations
+    AFTER INSERT ON conversations
+    REFERENCING NEW TABLE AS new_conversations
+    FOR EACH STATEMENT EXECUTE FUNCTION conversation_summaries_on_conversations();
+
+
+-- Tin nhắn mới → cộng dồn theo conversation. Trigger mức statement: 1 lệnh INSERT nhiều dòng
+-- (write-behind) chỉ upsert 1 lần cho mỗi conversation có trong lô.
+CREATE OR REPLACE FUNCTION conversation_summaries_on_messages() RETURNS trigger
+    LANGUAGE plpgsql
+    AS $$
+BEGIN
+    INSERT INTO conversation_summaries AS s (
+        conversation_id, user_id, title, conversation_created_at,
+        first_message, first_message_at, last_message_at, message_count
+    )
+    SELECT c.id, c.user_id, c.title, c.created_at,
+           f.content, f.created_at, n.last_message_at, n.message_count
+    FROM (
+        SELECT conversation_id, count(*) AS message_count, max(created_at) AS last_message_at
+        FROM new_messages
+        GROUP BY conversation_id
+    ) n
+    JOIN conversations c ON c.id = n.conversation_id
+    JOIN LATERAL (
+        SELECT m.content, m.created_at
+        FROM new_messages m
+        WHERE m.conversation_id = n.conversation_id
+        ORDER BY m.created_at, m.id
+        LIMIT 1
+    ) f ON TRUE
+    ON CONFLICT (conversation_id) DO UPDATE SET
+        first_message = CASE
+            WHEN s.first_message_at IS NULL OR EXCLUDED.first_message_at < s.first_message_at
+            THEN EXCLUDED.first_message ELSE s.first_message END,
+        first_message_at = LEAST(s.first_message_at, EXCLUDED.first_message_at),
+        last_message_at = GREATEST(s.last_message_at, EXCLUDED.last_message_at),
+        message_count = s.message_count + EXCLUDED.message_count;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_conversation_summaries_on_messages ON messages;
+CREATE TRIGGER trg_conversation_summaries_on_messages
+    AFTER INSERT ON messages
+    REFERENCING NEW TABLE AS new_messages
+    FOR EACH STATEMENT EXECUTE FUNCTION conversation_summaries_on_messages();
+
+
+-- Dữ liệu cũ: tính 1 lần từ messages (cùng transaction với trigger → không sót / đếm trùng)
+INSERT INTO conversation_summaries (
+    conversation_id, user_id, title, conversation_created_at,
+    first_message, first_message_at, last_message_at, message_count
+)
+SELECT c.id, c.user_id, c.title, c.created_at,
+       f.content, f.created_at, n.last_message_at, COALESCE(n.message_count, 0)
+FROM conversations c
+LEFT JOIN (
+    SELECT conversation_id, count(*) AS message_count, max(created_at) AS last_message_at
+    FROM messages
+    GROUP BY conversation_id
+) n ON n.conversation_id = c.id
+LEFT JOIN (
+    SELECT DISTINCT ON (conversation_id) conversation_id, content, created_at
+    FROM messages
+    ORDER BY conversation_id, created_at, id
+) f ON f.conversation_id = c.id
+ON CONFLICT (conversation_id) DO NOTHING;
+
+
+-- Stored procedure cũ giữ nguyên chữ ký, đọc từ bảng tóm tắt
+-- (bản cũ đọc c.title_character — cột không tồn tại — và trả created_at của tin nhắn đầu làm last_message_at)
+CREATE OR REPLACE FUNCTION get_admin_users_conversations() RETURNS TABLE(
+    username text, role text, user_created_at timestamp without time zone,
+    conversation_id integer, title_character text, conversation_created_at timestamp without time zone,
+    first_message text, last_message_at timestamp without time zone
+)
+    LANGUAGE plpgsql
+    AS $$
+BEGIN
+    RETURN QUERY
+    SELECT
+        u.username::text,
+        u.role::text,
+        u.create_at,
+
+        s.conversation_id,
+        s.title::text,
+        s.conversation_created_at,
+
+        s.first_message,
+        s.last_message_at
+    FROM users u
+    LEFT JOIN conversation_summaries s
+        ON u.id = s.user_id
+    ORDER BY u.create_at DESC, s.conversation_created_at DESC;
+END;
+$$;
@@ -0,0 +1,42 @@
+-- Cột thời gian dùng làm khóa keyset pagination (lịch sử chat, trang admin) không được NULL:
+-- NULL đứng đầu khi ORDER BY ... DESC và (NULL, id) < cursor cho ra NULL → trang sau dừng sớm / bỏ sót dòng.
+-- Dòng cũ thiếu thời gian: lấy mốc gần nhất suy ra được, không có thì lấy thời điểm chạy migration (UTC,
+-- giống datetime.utcnow() của app).
+
+-- conversation: tin nhắn đầu tiên của nó
+UPDATE conversations c
+SET created_at = COALESCE(
+    (SELECT min(m.created_at) FROM messages m WHERE m.conversation_id = c.id),
+    now() AT TIME ZONE 'utc'
+)
+WHERE c.created_at IS NULL;
+
+-- user: conversation đầu tiên của user
+UPDATE users u
+SET create_at = COALESCE(
+    (SELECT min(c.created_at) FROM conversations c WHERE c.user_id = u.id),
+    now() AT TIME ZONE 'utc'
+)
+WHERE u.create_at IS NULL;
+
+-- tin nhắn: thời điểm tạo conversation
+UPDATE messages m
+SET created_at = c.created_at
+FROM conversations c
+WHERE c.id = m.conversation_id AND m.created_at IS NULL;
+
+UPDATE conversation_summaries s
+SET conversation_created_at = c.created_at
+FROM conversations c
+WHERE c.id = s.conversation_id AND s.conversation_created_at IS NULL;
+
+ALTER TABLE users ALTER COLUMN create_at SET DEFAULT (now() AT TIME ZONE 'utc');
+ALTER TABLE users ALTER COLUMN create_at SET NOT NULL;
+
+ALTER TABLE conversations ALTER COLUMN created_at SET DEFAULT (now() AT TIME ZONE 'utc');
+ALTER TABLE conversations ALTER COLUMN created_at SET NOT NULL;
+
+ALTER TABLE messages ALTER COLUMN created_at SET DEFAULT (now() AT TIME ZONE 'utc');
+ALTER TABLE messages ALTER COLUMN created_at SET NOT NULL;
+
+ALTER TABLE conversation_summaries ALTER COLUMN conversation_created_at SET NOT NULL;
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Index
 from datetime import datetime
 from backend.app.db.db_postgres import Base
 
@@ -12,7 +12,8 @@ class User(Base):
     password_hash = Column(String, nullable=True)
 
     role = Column(String(20), default="user")
-    create_at = Column(DateTime, default=datetime.utcnow)
+    # khóa keyset trang admin → NOT NULL (migrations/003_keyset_not_null.sql)
+    create_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
 class Conversation(Base):
     __tablename__ = "conversations"
@@ -20,7 +21,10 @@ class Conversation(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     title = Column(String(255), nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    # keyset pagination GET /chat/conversations (migrations/001_history_indexes.sql)
+    __table_args__ = (Index("idx_conversations_user_created", "user_id", "created_at", "id"),)
 
 
 class Message(Base):
@@ -30,4 +34,28 @@ class Message(Base):
     conversation_id = Column(Integer, ForeignKey("conversations.id"), nullable=False)
     role = Column(String(20), nullable=False)  # "user" or "assistant"
     content = Column(Text, nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
\ No newline at end of file
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    # keyset pagination GET /chat/conversations/{id}/messages (migrations/001_history_indexes.sql)
+    __table_args__ = (Index("idx_messages_conversation_created", "conversation_id", "created_at", "id"),)
+
+
+class ConversationSummary(Base):
+    """
+    Tóm tắt conversation cho trang admin, do trigger Postgres cập nhật khi INSERT conversations / messages
+    (migrations/002_conversation_summaries.sql) — app chỉ đọc.
+    """
+    __tablename__ = "conversation_summaries"
+
+    conversation_id = Column(Integer, ForeignKey("conversations.id", ondelete="CASCADE"), primary_key=True)
+    user_id = Column(Integer, nullable=False)
+    title = Column(String(255), nullable=True)
+    conversation_created_at = Column(DateTime, nullable=False)
+    first_message = Column(Text)
+    first_message_at = Column(DateTime)
+    last_message_at = Column(DateTime)
+    message_count = Column(Integer, nullable=False, server_default="0")
+
+    __table_args__ = (
+        Index("idx_conversation_summaries_user_created", "user_id", "conversation_created_at", "conversation_id"),
+    )
@@ -1,10 +1,40 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from backend.app.api.routes.chat import router as chat_router
 from backend.app.api.routes.auth import router as auth_router
 from backend.app.api.routes.admin_user import router as admin_router
+from backend.app.api.routes.metrics import router as metrics_router
+from backend.app.api.routes.health import router as health_router
+from backend.app.services.chat_persistence import chat_store
+from backend.app.services.chatbot_service import ChatbotLogic
+from backend.app.services import warmup
+from backend.app.db.db_postgres import close_engines
+from backend.shared_cache import shared_store
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Tạo chatbot + kết nối Neo4j / Postgres / OpenAI ở đây thay vì lúc import
+    # → import nhanh, mỗi worker tự kết nối; AuraDB tạm lỗi không làm app chết lúc khởi động
+    app.state.chatbot = ChatbotLogic()
+    app.state.readiness = warmup.Readiness()
+    warm_task = warmup.warm_up(app.state.chatbot, app.state.readiness)
+    await warmup.wait_for_warm(warm_task)
+
+    yield
+
+    await warmup.shutdown(app.state.chatbot, warm_task)
+    # ghi nốt tin nhắn còn trong hàng đợi write-behind (ghi sync, join thread nền → không chặn event loop)
+    await asyncio.to_thread(chat_store.close)
+    await close_engines()
+    if shared_store is not None:
+        await shared_store.close_async()
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -12,8 +42,11 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],  # cursor phân trang lịch sử chat
 )
 
 app.include_router(auth_router)
 app.include_router(chat_router)
-app.include_router(admin_router)
\ No newline at end of file
+app.include_router(admin_router)
+app.include_router(metrics_router)
+app.include_router(health_router)
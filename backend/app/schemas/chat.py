@@ -8,4 +8,5 @@ class MessageRequest(BaseModel):
 class MessageResponse(BaseModel):
     reply: str
     conversation_id: int
-    message_id: int
+    # None khi lưu tin nhắn kiểu write-behind (chưa có id lúc trả lời)
+    message_id: Optional[int] = None
@@ -0,0 +1,255 @@
+# backend/app/services/chat_persistence.py
+"""
+Lưu 1 lượt hỏi đáp (conversation + tin nhắn user + tin nhắn assistant) cho /chat và /chat/stream.
+
+CHAT_PERSISTENCE_MODE:
+- "transaction" (mặc định): conversation mới + 2 tin nhắn ghi trong 1 transaction, 1 lần commit
+  (trước đây 3 lần commit + refresh, mỗi lần 1 round trip Postgres).
+- "write_behind": tin nhắn vào hàng đợi, luồng nền gom nhiều request thành 1 lệnh INSERT nhiều dòng
+  mỗi CHAT_WRITE_BEHIND_INTERVAL giây (hoặc khi đủ CHAT_WRITE_BEHIND_BATCH dòng); flush khi tắt app.
+  Conversation mới vẫn ghi ngay (cần id trả về cho frontend); message_id trả về None
+  và tin nhắn có thể xuất hiện trong lịch sử chậm tối đa 1 chu kỳ flush.
+  Hàng đợi giữ tối đa CHAT_WRITE_BEHIND_MAX_PENDING dòng (Postgres ngừng lâu → bỏ tin nhắn cũ nhất).
+"""
+import logging
+import os
+import threading
+from datetime import datetime
+
+from sqlalchemy import insert
+from sqlalchemy.exc import DataError, IntegrityError
+
+from backend.app.db.db_postgres import SessionLocal
+from backend.app.db.models_user import Conversation, Message
+
+logger = logging.getLogger(__name__)
+
+PERSISTENCE_MODES = ("transaction", "write_behind")
+
+
+def conversation_title(message):
+    return message[:50] if len(message) > 50 else message
+
+
+class MessageWriteBehind:
+    """
+    Hàng đợi tin nhắn chờ ghi + luồng nền ghi theo lô (session sync, không đụng event loop).
+
+    Lô ghi lỗi → ghi lại từng dòng:
+    - dòng lỗi dữ liệu (IntegrityError / DataError, vd conversation đã bị admin xóa) → bỏ + log,
+      không chặn tin nhắn của user khác;
+    - lỗi tạm thời (mất kết nối Postgres...) → dòng đó và các dòng sau về lại đầu hàng đợi, thử lại ở chu kỳ sau.
+    Hàng đợi vượt max_pending dòng → bỏ dòng cũ nhất.
+    """
+
+    def __init__(self, session_factory, interval=0.5, batch_size=500, max_pending=10000):
+        self.session_factory = session_factory
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+
+        self._pending = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.queued = 0
+        self.written = 0
+        self.batches = 0
+        self.failures = 0
+        self.dropped = 0
+
+    def _ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="chat-write-behind", daemon=True)
+            self._thread.start()
+
+    def enqueue(self, rows):
+        with self._lock:
+            self._pending.extend(rows)
+            self.queued += len(rows)
+            self._trim()
+            full = len(self._pending) >= self.batch_size
+            self._ensure_started()
+        if full:
+            self._wake.set()
+
+    def _trim(self):
+        # gọi khi đang giữ self._lock
+        overflow = len(self._pending) - self.max_pending
+        if overflow > 0:
+            del self._pending[:overflow]
+            self.dropped += overflow
+            logger.error(f"❌ Hàng đợi write-behind đầy ({self.max_pending} dòng), bỏ {overflow} tin nhắn cũ nhất.")
+
+    def _requeue(self, rows):
+        with self._lock:
+            self._pending[:0] = rows
+            self._trim()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+
+    def _write(self, rows):
+        db = self.session_factory()
+        try:
+            db.execute(insert(Message), rows)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _write_one_by_one(self, rows):
+        """
+        Ghi từng dòng của lô vừa lỗi. Trả về số dòng ghi xong trước khi gặp lỗi tạm thời
+        (len(rows) nếu đi hết lô).
+        """
+        for i, row in enumerate(rows):
+            try:
+                self._write([row])
+            except (IntegrityError, DataError) as e:
+                self.dropped += 1
+                logger.error(
+                    f"❌ Bỏ tin nhắn không ghi được (conversation_id={row.get('conversation_id')}): "
+                    f"{e.__class__.__name__}: {e.orig}"
+                )
+                continue
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"❌ Ghi tin nhắn thất bại, thử lại ở lần flush sau: {e}")
+                return i
+            self.written += 1
+        return len(rows)
+
+    def flush(self):
+        # 1 luồng ghi tại 1 thời điểm (luồng nền / close)
+        with self._flush_lock:
+            with self._lock:
+                rows, self._pending = self._pending, []
+
+            for start in range(0, len(rows), self.batch_size):
+                batch = rows[start:start + self.batch_size]
+                try:
+                    self._write(batch)
+                except Exception as e:
+                    self.failures += 1
+                    logger.warning(f"⚠️ Ghi lô {len(batch)} tin nhắn thất bại, ghi lại từng dòng: {e}")
+                    done = self._write_one_by_one(batch)
+                    if done < len(batch):
+                        self._requeue(rows[start + done:])
+                        return
+                    continue
+                self.written += len(batch)
+                self.batches += 1
+
+    def close(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=max(5.0, self.interval * 4))
+        self.flush()
+        with self._lock:
+            lost = len(self._pending)
+        if lost:
+            logger.error(f"❌ Còn {lost} tin nhắn chưa ghi được khi tắt app.")
+        else:
+            logger.info(f"💾 Write-behind: đã ghi {self.written} tin nhắn trong {self.batches} lô.")
+
+    def stats(self):
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            "pending": pending,
+            "queued": self.queued,
+            "written": self.written,
+            "batches": self.batches,
+            "failures": self.failures,
+            "dropped": self.dropped,
+        }
+
+
+class ChatStore:
+    def __init__(self, session_factory, mode="transaction", writer=None):
+        if mode not in PERSISTENCE_MODES:
+            raise ValueError(f"CHAT_PERSISTENCE_MODE phải là 1 trong {PERSISTENCE_MODES}, nhận: {mode}")
+        self.mode = mode
+        self.writer = writer or (MessageWriteBehind(session_factory) if mode == "write_behind" else None)
+
+    async def save_exchange(self, db, user_id, conversation_id, question, reply, asked_at):
+        """
+        Lưu câu hỏi + câu trả lời (db: AsyncSession); tạo conversation nếu conversation_id là None.
+        asked_at: thời điểm nhận câu hỏi (tin nhắn user luôn đứng trước assistant khi sắp theo created_at).
+        Trả về (conversation_id, message_id của assistant — None ở chế độ write_behind).
+        """
+        if self.mode == "write_behind":
+            return await self._save_write_behind(db, user_id, conversation_id, question, reply, asked_at)
+
+        try:
+            if conversation_id is None:
+                conversation = Conversation(user_id=user_id, title=conversation_title(question))
+                db.add(conversation)
+                await db.flush()  # lấy id trong cùng transaction
+                conversation_id = conversation.id
+
+            db.add(Message(conversation_id=conversation_id, role="user", content=question, created_at=asked_at))
+            assistant_message = Message(
+                conversation_id=conversation_id, role="assistant", content=reply, created_at=datetime.utcnow()
+            )
+            db.add(assistant_message)
+            await db.flush()
+            # đọc id trước commit: sau commit object bị expire, đọc lại sẽ tốn thêm 1 SELECT
+            message_id = assistant_message.id
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+
+        return conversation_id, message_id
+
+    async def _save_write_behind(self, db, user_id, conversation_id, question, reply, asked_at):
+        if conversation_id is None:
+            conversation = Conversation(user_id=user_id, title=conversation_title(question))
+            db.add(conversation)
+            await db.flush()
+            conversation_id = conversation.id
+            await db.commit()
+
+        self.writer.enqueue([
+            {"conversation_id": conversation_id, "role": "user", "content": question, "created_at": asked_at},
+            {"conversation_id": conversation_id, "role": "assistant", "content": reply,
+             "created_at": datetime.utcnow()},
+        ])
+        return conversation_id, None
+
+    def flush(self):
+        if self.writer:
+            self.writer.flush()
+
+    def close(self):
+        if self.writer:
+            self.writer.close()
+
+    def stats(self):
+        return {"mode": self.mode, **(self.writer.stats() if self.writer else {})}
+
+
+PERSISTENCE_MODE = os.getenv("CHAT_PERSISTENCE_MODE", "transaction")
+
+chat_store = ChatStore(
+    SessionLocal,
+    mode=PERSISTENCE_MODE,
+    writer=MessageWriteBehind(
+        SessionLocal,
+        interval=float(os.getenv("CHAT_WRITE_BEHIND_INTERVAL", "0.5")),
+        batch_size=int(os.getenv("CHAT_WRITE_BEHIND_BATCH", "500")),
+        max_pending=int(os.getenv("CHAT_WRITE_BEHIND_MAX_PENDING", "10000")),
+    ) if PERSISTENCE_MODE == "write_behind" else None
+)
@@ -13,3 +13,11 @@ class ChatbotLogic:
     def chat(self, message: str) -> str:
         # gọi lại logic cũ
         return self.core.handle_user_query(message)
+
+    async def chat_async(self, message: str) -> str:
+        # pipeline async: không chặn event loop của uvicorn
+        return await self.core.handle_user_query_async(message)
+
+    def stream(self, message: str):
+        # async generator (event, payload) cho endpoint SSE
+        return self.core.stream_user_query_async(message)
@@ -0,0 +1,176 @@
+# backend/app/services/principal_cache.py
+"""
+Cache thông tin user đã xác thực cho get_current_user: JWT đã ký sẵn user id,
+không cần 1 lần SELECT users cho mỗi request chat chỉ để xác nhận user còn tồn tại.
+
+- Khóa: sub của token (user id). Giá trị: Principal (id, username, role, create_at) — bản chụp,
+  không phải object ORM (không gắn với session của request nào).
+- TTL ngắn (PRINCIPAL_CACHE_TTL giây) + tối đa PRINCIPAL_CACHE_SIZE user, loại bỏ theo LRU.
+- Route admin update_user / delete_user gọi invalidate_async(user_id) sau khi commit:
+  xóa trong process + đổi khóa "epoch" trên shared store (Redis, backend/shared_cache.py).
+  Worker khác đọc epoch tối đa mỗi PRINCIPAL_CACHE_SYNC_SECONDS giây, thấy đổi → xóa cache của mình
+  (admin sửa user hiếm → xóa cả cache thay vì theo từng user). Redis lỗi → coi như epoch đổi.
+- Không có shared store: worker khác chỉ thấy thay đổi khi hết TTL → TTL mặc định 5 giây thay vì 30.
+"""
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, namedtuple
+
+from backend.app.db.models_user import User
+from backend.metrics import REGISTRY
+from backend.shared_cache import SHARED_CACHE_PREFIX, shared_store
+
+Principal = namedtuple("Principal", ["id", "username", "role", "create_at"])
+
+
+class PrincipalCache:
+    def __init__(self, max_entries=10000, ttl_seconds=30, shared=None, sync_seconds=1.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        # epoch trên shared store: đổi mỗi lần 1 worker bất kỳ invalidate
+        self.shared = shared
+        self.sync_seconds = sync_seconds
+        self._epoch_key = f"{SHARED_CACHE_PREFIX}:principal:epoch"
+        self._epoch = None
+        self._next_sync = 0.0
+
+        self._entries = OrderedDict()  # user_id → (principal, expires_at)
+        # tăng mỗi lần invalidate → bỏ kết quả của lần đọc DB bắt đầu trước đó
+        self._generation = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+        self._lock = threading.Lock()
+
+    @property
+    def generation(self):
+        return self._generation
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            principal, expires_at = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[user_id]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return principal
+
+    def set(self, principal, generation):
+        if not self.ttl_seconds:
+            return
+
+        with self._lock:
+            # user vừa bị sửa / xóa trong lúc đang đọc DB → không ghi bản cũ
+            if generation != self._generation:
+                return
+
+            self._entries[principal.id] = (principal, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(principal.id)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+            self._generation += 1
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    # ---------- đồng bộ giữa các worker ----------
+    async def invalidate_async(self, user_id):
+        self.invalidate(user_id)
+        if self.shared is None:
+            return
+        epoch = uuid.uuid4().hex
+        self._epoch = epoch
+        # TTL dài hơn TTL cache: khóa hết hạn → worker thấy epoch đổi → xóa cache (vô hại)
+        await self.shared.set_async(self._epoch_key, epoch, max(self.ttl_seconds * 10, 3600))
+
+    async def sync_async(self):
+        """
+        Đọc epoch trên shared store (tối đa 1 lần / sync_seconds); khác lần trước → xóa cache của process.
+        """
+        if self.shared is None or time.monotonic() < self._next_sync:
+            return
+        self._next_sync = time.monotonic() + self.sync_seconds
+
+        errors = self.shared.errors
+        available = self.shared.stats()["available"]
+        epoch = await self.shared.get_async(self._epoch_key)
+        # Redis lỗi / đang tạm bỏ qua → không biết worker khác có invalidate không → xóa cho chắc
+        failed = not available or self.shared.errors != errors
+        if failed or epoch != self._epoch:
+            self.clear()
+        self._epoch = None if failed else epoch
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "size": len(self._entries),
+        }
+
+
+principal_cache = PrincipalCache(
+    max_entries=int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000")),
+    ttl_seconds=float(os.getenv("PRINCIPAL_CACHE_TTL", "30" if shared_store is not None else "5")),
+    shared=shared_store,
+    sync_seconds=float(os.getenv("PRINCIPAL_CACHE_SYNC_SECONDS", "1")),
+)
+
+
+async def load_principal(db, user_id, cache=None):
+    """
+    Principal của user_id: từ cache, hoặc 1 lần đọc bảng users (db: AsyncSession). None nếu user không còn.
+    cache: mặc định principal_cache của process.
+    """
+    cache = cache or principal_cache
+    await cache.sync_async()
+    principal = cache.get(user_id)
+    if principal is not None:
+        return principal
+
+    generation = cache.generation
+    user = await db.get(User, user_id)
+    if user is None:
+        return None
+
+    principal = Principal(id=user.id, username=user.username, role=user.role, create_at=user.create_at)
+    cache.set(principal, generation)
+    return principal
+
+
+def _collect_principal_cache_stats():
+    stats = principal_cache.stats()
+    return [
+        ("chatbot_principal_cache_hits_total", "Số lần get_current_user trúng cache", {}, stats["hits"]),
+        ("chatbot_principal_cache_misses_total", "Số lần get_current_user phải đọc bảng users", {}, stats["misses"]),
+        ("chatbot_principal_cache_size", "Số user đang cache", {}, stats["size"]),
+    ]
+
+
+REGISTRY.add_collector(_collect_principal_cache_stats)
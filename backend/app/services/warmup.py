@@ -0,0 +1,131 @@
+# backend/app/services/warmup.py
+"""
+Khởi động app (gọi từ lifespan trong backend/app/main.py), thay cho việc mở kết nối lúc import module.
+
+- Neo4j, Postgres, OpenAI kết nối song song; Neo4j nạp sẵn cache nóng
+  (plan Cypher, tên CTĐT / học phần / học kỳ, điều kiện tốt nghiệp chung); OpenAI nạp sẵn tokenizer.
+- Thành phần lỗi (vd AuraDB tạm không truy cập được) được thử lại nền với backoff tăng dần,
+  app vẫn khởi động; GET /health/ready trả 503 tới khi Neo4j + Postgres sẵn sàng.
+- Lifespan chờ tối đa STARTUP_WARM_TIMEOUT giây cho lần làm nóng đầu rồi mới nhận request
+  (bình thường: request đầu tiên đã có cache nóng như trước).
+"""
+import asyncio
+import logging
+import os
+import time
+
+from backend.app.db import db_postgres
+from backend.prompt_serializer import load_encoding
+
+logger = logging.getLogger(__name__)
+
+STARTUP_WARM_TIMEOUT = float(os.getenv("STARTUP_WARM_TIMEOUT", "30"))
+STARTUP_RETRY_MAX_BACKOFF = float(os.getenv("STARTUP_RETRY_MAX_BACKOFF", "30"))
+
+COMPONENTS = ("neo4j", "postgres", "openai")
+# OpenAI lỗi lúc làm nóng không chặn ready: câu trả lời dạng template vẫn phục vụ được
+REQUIRED_COMPONENTS = ("neo4j", "postgres")
+
+
+class Readiness:
+    def __init__(self, components=COMPONENTS):
+        self._status = {name: "starting" for name in components}
+        self._attempts = {name: 0 for name in components}
+        self.started_at = time.monotonic()
+        self.ready_at = None
+
+    def attempt(self, name):
+        self._attempts[name] += 1
+
+    def mark(self, name, status):
+        self._status[name] = status
+        if self.ready_at is None and self.ready:
+            self.ready_at = time.monotonic()
+            logger.info(f"✅ App sẵn sàng sau {self.ready_at - self.started_at:.2f}s")
+
+    @property
+    def ready(self):
+        return all(self._status[name] == "ok" for name in REQUIRED_COMPONENTS)
+
+    def snapshot(self):
+        return {
+            "ready": self.ready,
+            "components": {
+                name: {"status": status, "attempts": self._attempts[name]}
+                for name, status in self._status.items()
+            },
+            "warm_seconds": round(self.ready_at - self.started_at, 3) if self.ready_at else None,
+        }
+
+
+async def _until_ok(readiness, name, warm, retry=True):
+    """
+    Chạy warm() tới khi thành công; lỗi → chờ 1, 2, 4... (tối đa STARTUP_RETRY_MAX_BACKOFF) giây rồi thử lại.
+    retry=False: chỉ thử 1 lần (thành phần không bắt buộc).
+    """
+    delay = 1.0
+    while True:
+        readiness.attempt(name)
+        try:
+            await warm()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # /health/ready không cần đăng nhập → chỉ trạng thái + số lần thử, chi tiết lỗi nằm trong log
+            readiness.mark(name, "error")
+            if not retry:
+                logger.warning(f"⚠️ Làm nóng {name} lỗi (bỏ qua): {e}")
+                return
+            logger.warning(f"⚠️ Khởi động {name} lỗi, thử lại sau {delay:.0f}s: {e}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, STARTUP_RETRY_MAX_BACKOFF)
+            continue
+
+        readiness.mark(name, "ok")
+        logger.info(f"🔥 {name} sẵn sàng")
+        return
+
+
+def warm_up(chatbot, readiness):
+    """
+    chatbot: ChatbotLogic của FastAPI (backend/app/services/chatbot_service.py).
+    Trả về future chạy nền; lifespan hủy khi tắt app.
+    """
+    core = chatbot.core
+
+    async def neo4j():
+        # driver sync → chạy trong thread, không chặn event loop
+        await asyncio.to_thread(core.neo4j_handle.connect)
+
+    async def openai():
+        # tokenizer đếm token prompt: lần đầu tiktoken tải bảng BPE qua mạng → nạp trong thread, trước request đầu
+        await asyncio.to_thread(load_encoding, core.openai_handler.model_reasoning)
+        await core.openai_handler.warm_async()
+
+    return asyncio.gather(
+        _until_ok(readiness, "neo4j", neo4j),
+        _until_ok(readiness, "postgres", db_postgres.ping),
+        _until_ok(readiness, "openai", openai, retry=False),
+    )
+
+
+async def wait_for_warm(task):
+    # chờ làm nóng tối đa STARTUP_WARM_TIMEOUT giây; quá hạn → vẫn nhận request, task tiếp tục chạy nền
+    try:
+        await asyncio.wait_for(asyncio.shield(task), STARTUP_WARM_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.warning(
+            f"⚠️ Chưa làm nóng xong sau {STARTUP_WARM_TIMEOUT:g}s, app nhận request ở trạng thái chưa ready."
+        )
+
+
+async def shutdown(chatbot, task):
+    task.cancel()
+    try:
+        await task
+    except (asyncio.CancelledError, Exception):
+        pass
+
+    neo4j_handler = chatbot.core.neo4j_handle
+    await neo4j_handler.close_async()
+    await asyncio.to_thread(neo4j_handler.close)
@@ -0,0 +1,420 @@
+# backend/benchmarks/chat_loadtest.py
+"""
+Load test offline cho POST /chat và /chat/stream: chạy backend.app.main:app ngay trong process
+(gọi thẳng giao diện ASGI, không mở cổng), không cần AuraDB / OpenAI / Postgres:
+
+- OpenAI   → FakeOpenAI (fake_openai.py), độ trễ cấu hình bằng --llm-latency / --llm-ttft
+- Neo4j    → InMemoryGraphStore (graph_fixture.py), hoặc Neo4j local qua --neo4j-uri
+             (vd container neo4j:5, đọc NEO4J_USERNAME / NEO4J_PASSWORD từ biến môi trường)
+- Postgres → SQLite file tạm, hoặc --database-url
+- Xác thực chạy thật (JWT của 1 user tạo sẵn) → đo cả get_current_user.
+
+Answer cache tắt mặc định (mỗi request chạy đủ pipeline), bật lại bằng --answer-cache.
+Shared cache (Redis dùng chung giữa các worker): --shared-cache redis://... hoặc --shared-cache local
+(RESP server trong RAM, resp_server.py); chạy 2 lần cùng 1 URL → lần 2 đọc lại kết quả của lần 1 như worker khác.
+Thứ tự câu hỏi sinh từ --seed → cùng tham số cho cùng tải; kết quả ghi ra --json để so sánh giữa các lần đổi code.
+
+Chạy từ thư mục gốc repo (cần dependency của app: fastapi, sqlalchemy, python-jose... + aiosqlite cho SQLite):
+    python -m backend.benchmarks.chat_loadtest --concurrency 16 --requests 400
+    python -m backend.benchmarks.chat_loadtest --stream --llm-latency 1.2 --json bench.json
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+import types
+from collections import defaultdict
+
+from backend.benchmarks.fake_openai import FakeLLMSettings, FakeOpenAI, FakeAsyncOpenAI
+from backend.benchmarks.graph_fixture import GraphFixture, InMemoryGraphStore
+
+# (intent mong đợi, câu hỏi) — tên CTĐT / học phần có trong GraphFixture
+WORKLOAD = [
+    ("hoi_dieu_kien_tot_nghiep_chung", "Điều kiện tốt nghiệp là gì?"),
+    ("hoi_dieu_kien_tot_nghiep_ctdt", "Điều kiện tốt nghiệp của Công nghệ thông tin là gì?"),
+    ("hoi_dieu_kien_tot_nghiep_ctdt", "Điều kiện tốt nghiệp của Khoa học dữ liệu"),
+    ("hoi_chuan_ngoai_ngu_dau_ra_chung", "Chuẩn ngoại ngữ đầu ra là gì?"),
+    ("chuan_ngoai_ngu_ctdt", "Chuẩn ngoại ngữ đầu ra của Kỹ thuật phần mềm là gì?"),
+    ("hoi_chuan_ngoai_ngu_muc_diem", "IELTS bao nhiêu thì tốt nghiệp?"),
+    ("hoi_chuan_ngoai_ngu_muc_diem", "TOEIC bao nhiêu thì ra trường?"),
+    ("hoi_khung_nang_luc_ngoai_ngu", "Khung năng lực ngoại ngữ 6 bậc gồm những gì?"),
+    ("hoi_thong_tin_ctdt", "Ngành Khoa học dữ liệu có bao nhiêu tín chỉ?"),
+    ("hoi_danh_sach_ctdt", "Có những chương trình đào tạo nào?"),
+    ("hoi_hoc_phan_theo_hoc_ky_ctdt", "CTĐT Công nghệ thông tin học kỳ 5 học môn gì?"),
+    ("hoi_hoc_phan_theo_hoc_ky_ctdt", "HK3 của Hệ thống thông tin có những môn gì?"),
+    ("hoi_tien_quyet_hoc_phan_ctdt",
+     "Trong chương trình đào tạo Công nghệ thông tin để học môn Cấu trúc dữ liệu và giải thuật cần học trước môn nào?"),
+    ("hoi_tien_quyet_hoc_phan_ctdt", "Trong chương trình đào tạo Trí tuệ nhân tạo nếu rớt học phần Giải tích 1 thì không được học học phần nào?"),
+    ("hoi_hoc_phan_song_hanh_ctdt", "Học phần song hành của Công nghệ thông tin là gì?"),
+]
+
+PERCENTILES = (50, 95, 99)
+
+
+# ==========================
+# Thay dịch vụ ngoài bằng bản giả (phải chạy trước khi import backend.app.main)
+# ==========================
+def install_offline_stack(args):
+    settings = FakeLLMSettings(
+        latency=args.llm_latency, ttft=args.llm_ttft, jitter=args.jitter, seed=args.seed
+    )
+
+    # backend/config.py (không commit) chứa khóa thật → thay bằng module giả
+    config = types.ModuleType("backend.config")
+    config.NEO4J_URI = args.neo4j_uri or "bolt://graph-fixture"
+    config.NEO4J_USERNAME = os.getenv("NEO4J_USERNAME", "neo4j")
+    config.NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD", "")
+    config.client = FakeOpenAI(settings)
+    sys.modules["backend.config"] = config
+
+    # openai_handler tạo AsyncOpenAI(...) lúc import
+    import openai
+    openai.AsyncOpenAI = lambda **kwargs: FakeAsyncOpenAI(settings, **kwargs)
+
+    store = None
+    if not args.neo4j_uri:
+        from backend import graph_store
+        store = InMemoryGraphStore(GraphFixture(args.extra_courses), args.neo4j_latency)
+        graph_store.GraphStore = lambda uri, auth: store
+
+    os.environ["ANSWER_CACHE_SIZE"] = os.getenv("ANSWER_CACHE_SIZE", "1000") if args.answer_cache else "0"
+    if args.persistence:
+        os.environ["CHAT_PERSISTENCE_MODE"] = args.persistence
+    if args.shared_cache:
+        # backend/shared_cache.py đọc SHARED_CACHE_URL lúc import
+        url = args.shared_cache
+        if url == "local":
+            from backend.benchmarks.resp_server import RespServer
+            url = RespServer().start()
+        os.environ["SHARED_CACHE_URL"] = url
+    return settings, store
+
+
+def install_database(url):
+    """
+    Trỏ SessionLocal + AsyncSessionLocal sang database benchmark, tạo bảng + 1 user, trả về access token.
+    """
+    from sqlalchemy import create_engine
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from backend.app.db import db_postgres
+    from backend.app.db.models_user import User
+    from backend.app.core.jwt_handler import create_access_token
+
+    connect_args = {"check_same_thread": False, "timeout": 30} if url.startswith("sqlite") else {}
+    engine = create_engine(url, connect_args=connect_args)
+    db_postgres.engine = engine
+    db_postgres.SessionLocal.configure(bind=engine)
+
+    # route dùng AsyncSession; engine async tạo lazy, connect khi có request đầu tiên
+    async_connect_args = {"timeout": 30} if url.startswith("sqlite") else {}
+    async_engine = create_async_engine(db_postgres.to_async_url(url), connect_args=async_connect_args)
+    db_postgres.async_engine = async_engine
+    db_postgres.AsyncSessionLocal.configure(bind=async_engine)
+    db_postgres.Base.metadata.create_all(engine)
+
+    db = db_postgres.SessionLocal()
+    try:
+        user = db.query(User).filter(User.username == "loadtest").first()
+        if user is None:
+            user = User(username="loadtest", password="loadtest", password_hash="loadtest", role="user")
+            db.add(user)
+            db.commit()
+            db.refresh(user)
+        return create_access_token(user.id, user.role)
+    finally:
+        db.close()
+
+
+# ==========================
+# Client ASGI tối giản (ghi thời điểm từng chunk → đo được token đầu tiên của SSE)
+# ==========================
+class AsgiResponse:
+    def __init__(self):
+        self.status = None
+        self.chunks = []  # (thời điểm, bytes)
+
+    @property
+    def body(self):
+        return b"".join(chunk for _, chunk in self.chunks)
+
+
+async def asgi_request(app, method, path, body=b"", headers=()):
+    response = AsgiResponse()
+    finished = asyncio.Event()
+    request_sent = False
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        # StreamingResponse chờ client ngắt kết nối song song với việc gửi body
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response.status = message["status"]
+        elif message["type"] == "http.response.body":
+            if message.get("body"):
+                response.chunks.append((time.perf_counter(), message["body"]))
+            if not message.get("more_body", False):
+                finished.set()
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"loadtest"), (b"content-length", str(len(body)).encode()), *headers],
+        "client": ("127.0.0.1", 50000),
+        "server": ("loadtest", 80),
+    }
+    try:
+        await app(scope, receive, send)
+    finally:
+        finished.set()
+    return response
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    """
+    Chạy startup / shutdown của app như uvicorn (ASGI lifespan).
+    """
+    to_app = asyncio.Queue()
+    from_app = asyncio.Queue()
+
+    async def receive():
+        return await to_app.get()
+
+    async def send(message):
+        await from_app.put(message)
+
+    task = asyncio.create_task(app({"type": "lifespan", "asgi": {"version": "3.0"}, "state": {}}, receive, send))
+    await to_app.put({"type": "lifespan.startup"})
+    message = await from_app.get()
+    if message["type"] != "lifespan.startup.complete":
+        raise RuntimeError(f"Startup lỗi: {message.get('message')}")
+    try:
+        yield
+    finally:
+        await to_app.put({"type": "lifespan.shutdown"})
+        await from_app.get()
+        await task
+
+
+# ==========================
+# Sinh tải
+# ==========================
+def _parse_sse(body):
+    events = []
+    for block in body.decode("utf-8").split("\n\n"):
+        event, data = None, None
+        for line in block.splitlines():
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                data = json.loads(line[len("data: "):])
+        if event:
+            events.append((event, data))
+    return events
+
+
+async def send_question(app, token, intent, question, stream):
+    body = json.dumps({"message": question}).encode()
+    headers = [(b"content-type", b"application/json"), (b"authorization", f"Bearer {token}".encode())]
+
+    started = time.perf_counter()
+    response = await asgi_request(app, "POST", "/chat/stream" if stream else "/chat", body, headers)
+    elapsed = time.perf_counter() - started
+
+    sample = {"intent": intent, "seconds": elapsed, "ttft": None, "ok": response.status == 200}
+    if stream and sample["ok"]:
+        # thời điểm chunk chứa event token đầu tiên; intent thật lấy từ event "intent"
+        for at, chunk in response.chunks:
+            if b"event: token" in chunk:
+                sample["ttft"] = at - started
+                break
+        events = _parse_sse(response.body)
+        for event, data in events:
+            if event == "intent":
+                sample["intent"] = data["intent"]
+        sample["ok"] = any(event == "done" for event, _ in events)
+    return sample
+
+
+async def run_load(app, token, questions, concurrency, stream):
+    pending = list(reversed(questions))
+    samples = []
+
+    async def worker():
+        while pending:
+            intent, question = pending.pop()
+            try:
+                samples.append(await send_question(app, token, intent, question, stream))
+            except Exception as e:
+                print("❌ Lỗi request:", e, file=sys.stderr)
+                samples.append({"intent": intent, "seconds": 0.0, "ttft": None, "ok": False})
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return samples, time.perf_counter() - started
+
+
+# ==========================
+# Báo cáo
+# ==========================
+def percentile(values, p):
+    # nearest-rank
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def summarize(samples, elapsed):
+    groups = defaultdict(list)
+    for s in samples:
+        groups[s["intent"]].append(s)
+    groups["TỔNG"] = samples
+
+    rows = {}
+    for intent, group in groups.items():
+        latencies = [s["seconds"] for s in group if s["ok"]]
+        ttfts = [s["ttft"] for s in group if s["ok"] and s["ttft"] is not None]
+        rows[intent] = {
+            "requests": len(group),
+            "errors": sum(1 for s in group if not s["ok"]),
+            **{f"p{p}_ms": _ms(percentile(latencies, p)) for p in PERCENTILES},
+            "ttft_p50_ms": _ms(percentile(ttfts, 50)),
+            "ttft_p95_ms": _ms(percentile(ttfts, 95)),
+        }
+    return {
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        "intents": rows,
+    }
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+def _cell(value):
+    return "-" if value is None else f"{value:.1f}"
+
+
+def print_report(summary, stream):
+    header = f"{'intent':<34}{'n':>6}{'lỗi':>6}" + "".join(f"{f'p{p} ms':>10}" for p in PERCENTILES)
+    if stream:
+        header += f"{'ttft p50':>10}{'ttft p95':>10}"
+    print(header)
+    print("-" * len(header))
+    intents = summary["intents"]
+    for intent in sorted(k for k in intents if k != "TỔNG") + ["TỔNG"]:
+        row = intents[intent]
+        line = f"{intent:<34}{row['requests']:>6}{row['errors']:>6}" + "".join(
+            f"{_cell(row[f'p{p}_ms']):>10}" for p in PERCENTILES
+        )
+        if stream:
+            line += f"{_cell(row['ttft_p50_ms']):>10}{_cell(row['ttft_p95_ms']):>10}"
+        print(line)
+    print(f"\n🚀 Thông lượng: {summary['throughput_rps']} request/s ({summary['elapsed_seconds']} s)")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load test offline cho /chat")
+    parser.add_argument("--requests", type=int, default=300, help="số request đo")
+    parser.add_argument("--warmup", type=int, default=30, help="số request chạy trước, không tính")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--stream", action="store_true", help="gọi /chat/stream (đo thêm token đầu tiên)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--llm-latency", type=float, default=0.8, help="giây / lần gọi OpenAI")
+    parser.add_argument("--llm-ttft", type=float, default=0.3, help="giây tới token đầu tiên khi stream")
+    parser.add_argument("--jitter", type=float, default=0.0, help="dao động độ trễ LLM (tỉ lệ, vd 0.2)")
+    parser.add_argument("--neo4j-latency", type=float, default=0.01, help="giây / truy vấn đồ thị giả")
+    parser.add_argument("--neo4j-uri", default=None, help="dùng Neo4j thật (vd bolt://localhost:7687)")
+    parser.add_argument("--extra-courses", type=int, default=20, help="số học phần tự chọn thêm / CTĐT")
+    parser.add_argument("--database-url", default=None, help="mặc định SQLite file tạm")
+    parser.add_argument("--persistence", choices=["transaction", "write_behind"], default=None,
+                        help="CHAT_PERSISTENCE_MODE cho lần chạy")
+    parser.add_argument("--answer-cache", action="store_true", help="giữ answer cache (mặc định tắt)")
+    parser.add_argument("--shared-cache", default=None,
+                        help="SHARED_CACHE_URL (redis://...) hoặc 'local' = RESP server trong process")
+    parser.add_argument("--json", default=None, help="ghi kết quả ra file JSON")
+    parser.add_argument("--verbose", action="store_true", help="hiện log / print của pipeline")
+    return parser.parse_args(argv)
+
+
+async def _main(args, settings, store):
+    from backend.app.main import app
+
+    database_url = args.database_url or f"sqlite:///{tempfile.mkdtemp(prefix='chat_loadtest_')}/chat.db"
+    token = install_database(database_url)
+
+    rng = random.Random(args.seed)
+    warmup = rng.choices(WORKLOAD, k=args.warmup)
+    questions = rng.choices(WORKLOAD, k=args.requests)
+
+    async with lifespan(app):
+        quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+        with quiet:
+            await run_load(app, token, warmup, args.concurrency, args.stream)
+            llm_calls = settings.calls
+            graph_queries = store.queries if store else None
+            samples, elapsed = await run_load(app, token, questions, args.concurrency, args.stream)
+
+    summary = summarize(samples, elapsed)
+    summary["config"] = {k: v for k, v in vars(args).items() if k not in ("json", "verbose")}
+    summary["llm_calls_per_request"] = round((settings.calls - llm_calls) / len(samples), 2)
+    if store:
+        summary["graph_queries_per_request"] = round((store.queries - graph_queries) / len(samples), 2)
+    if args.shared_cache:
+        from backend import chatbot_logic
+        summary["shared_cache"] = {
+            "answer_shared_hits": chatbot_logic.answer_cache.stats()["shared_hits"],
+            "program_shared_hits": chatbot_logic.neo4j_handler.program_cache.stats()["shared_hits"],
+        }
+    return summary
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not args.verbose:
+        logging.disable(logging.WARNING)
+
+    settings, store = install_offline_stack(args)
+    summary = asyncio.run(_main(args, settings, store))
+
+    print_report(summary, args.stream)
+    print(f"🤖 {summary['llm_calls_per_request']} lần gọi LLM / request", end="")
+    if "graph_queries_per_request" in summary:
+        print(f", 🕸️ {summary['graph_queries_per_request']} truy vấn đồ thị / request", end="")
+    print()
+    if "shared_cache" in summary:
+        shared = summary["shared_cache"]
+        print(f"🗄️ Shared cache: {shared['answer_shared_hits']} câu trả lời, "
+              f"{shared['program_shared_hits']} payload CTĐT đọc từ Redis")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        print(f"💾 Đã ghi {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+# backend/benchmarks/fake_openai.py
+"""
+Client OpenAI giả cho benchmark offline: trả câu trả lời soạn sẵn sau 1 độ trễ cấu hình được,
+không gọi mạng, không tốn token.
+
+Hỗ trợ đúng phần API mà chatbot dùng:
+- chat.completions.create(...)            (cả stream=True, kèm chunk usage cuối khi include_usage)
+- beta.chat.completions.parse(...)        (structured output: QuestionEntities / QuestionUnderstanding)
+- models.list()                            (lifespan làm nóng kết nối)
+- thuộc tính api_key, organization, base_url, timeout, max_retries (openai_handler đọc để tạo client async)
+
+Độ trễ: latency (giây) cho 1 lần gọi không stream; stream thì token đầu tiên sau ttft,
+phần còn lại chia đều cho các chunk trong khoảng latency. jitter (tỉ lệ) + seed → lặp lại được.
+"""
+import asyncio
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+from backend.prompt_serializer import count_message_tokens, count_tokens
+
+DEFAULT_REPLY = (
+    "Theo dữ liệu của chương trình đào tạo, sinh viên cần hoàn thành đủ số tín chỉ bắt buộc và tự chọn, "
+    "đạt chuẩn ngoại ngữ đầu ra theo quy định của từng hệ (Cử nhân / Kỹ sư) và không bị kỷ luật ở mức "
+    "đình chỉ học tập. Với các học phần có học phần tiên quyết, sinh viên phải học và đạt học phần tiên "
+    "quyết trước khi đăng ký. Bạn có thể hỏi thêm về học phần theo từng học kỳ nếu cần."
+)
+
+# Intent trả về cho bước understand khi không cấu hình parsed_values
+DEFAULT_PARSED = {"intent": "hoi_thong_tin_ctdt"}
+
+
+class FakeLLMSettings:
+    def __init__(self, latency=0.8, ttft=0.3, jitter=0.0, chunks=24,
+                 reply=DEFAULT_REPLY, parsed_values=None, seed=0):
+        self.latency = latency
+        self.ttft = ttft
+        self.jitter = jitter
+        self.chunks = chunks
+        self.reply = reply
+        self.parsed_values = dict(DEFAULT_PARSED if parsed_values is None else parsed_values)
+
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _jittered(self, seconds):
+        with self._lock:
+            self.calls += 1
+            if not self.jitter:
+                return seconds
+            return max(0.0, seconds * (1 + self._random.uniform(-self.jitter, self.jitter)))
+
+    def delay(self):
+        return self._jittered(self.latency)
+
+    def stream_delays(self):
+        # (trễ trước chunk đầu, trễ giữa các chunk sau)
+        ttft = self._jittered(self.ttft)
+        rest = max(0.0, self.latency - self.ttft) / max(1, self.chunks - 1)
+        return ttft, rest
+
+
+def _usage(messages, model, completion):
+    return SimpleNamespace(
+        prompt_tokens=count_message_tokens(messages, model),
+        completion_tokens=count_tokens(completion, model)
+    )
+
+
+def _completion(messages, model, content):
+    message = SimpleNamespace(role="assistant", content=content, parsed=None, refusal=None)
+    return SimpleNamespace(
+        model=model,
+        choices=[SimpleNamespace(index=0, message=message, finish_reason="stop")],
+        usage=_usage(messages, model, content)
+    )
+
+
+def _parsed_completion(messages, model, response_format, values):
+    fields = getattr(response_format, "model_fields", {})
+    parsed = response_format(**{name: values.get(name) for name in fields})
+    response = _completion(messages, model, parsed.model_dump_json())
+    response.choices[0].message.parsed = parsed
+    return response
+
+
+def _split_reply(reply, chunks):
+    words = reply.split(" ")
+    size = max(1, -(-len(words) // max(1, chunks)))
+    parts = [" ".join(words[i:i + size]) for i in range(0, len(words), size)]
+    return [p if i == 0 else " " + p for i, p in enumerate(parts)]
+
+
+def _chunk(content=None, usage=None):
+    if usage is not None:
+        return SimpleNamespace(choices=[], usage=usage)
+    delta = SimpleNamespace(role="assistant", content=content)
+    return SimpleNamespace(choices=[SimpleNamespace(index=0, delta=delta, finish_reason=None)], usage=None)
+
+
+class _Base:
+    def __init__(self, settings=None, **client_kwargs):
+        self.settings = settings or FakeLLMSettings()
+        # openai_handler tạo AsyncOpenAI(api_key=client.api_key, ...) từ client sync
+        self.api_key = client_kwargs.get("api_key", "sk-fake")
+        self.organization = client_kwargs.get("organization")
+        self.base_url = client_kwargs.get("base_url", "http://fake-openai.local/v1")
+        self.timeout = client_kwargs.get("timeout", 60)
+        self.max_retries = client_kwargs.get("max_retries", 0)
+
+
+# ---------- sync ----------
+class _Completions:
+    def __init__(self, settings):
+        self.settings = settings
+
+    def create(self, model, messages, stream=False, stream_options=None, **kwargs):
+        if stream:
+            return self._stream(model, messages, stream_options)
+        time.sleep(self.settings.delay())
+        return _completion(messages, model, self.settings.reply)
+
+    def _stream(self, model, messages, stream_options):
+        first, rest = self.settings.stream_delays()
+        for i, part in enumerate(_split_reply(self.settings.reply, self.settings.chunks)):
+            time.sleep(first if i == 0 else rest)
+            yield _chunk(part)
+        if (stream_options or {}).get("include_usage"):
+            yield _chunk(usage=_usage(messages, model, self.settings.reply))
+
+    def parse(self, model, messages, response_format, **kwargs):
+        time.sleep(self.settings.delay())
+        return _parsed_completion(messages, model, response_format, self.settings.parsed_values)
+
+
+class FakeOpenAI(_Base):
+    def __init__(self, settings=None, **client_kwargs):
+        super().__init__(settings, **client_kwargs)
+        completions = _Completions(self.settings)
+        self.chat = SimpleNamespace(completions=completions)
+        self.beta = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+        self.models = SimpleNamespace(list=lambda: SimpleNamespace(data=[]))
+
+
+# ---------- async ----------
+class _AsyncCompletions:
+    def __init__(self, settings):
+        self.settings = settings
+
+    async def create(self, model, messages, stream=False, stream_options=None, **kwargs):
+        if stream:
+            return self._stream(model, messages, stream_options)
+        await asyncio.sleep(self.settings.delay())
+        return _completion(messages, model, self.settings.reply)
+
+    async def _stream(self, model, messages, stream_options):
+        first, rest = self.settings.stream_delays()
+        for i, part in enumerate(_split_reply(self.settings.reply, self.settings.chunks)):
+            await asyncio.sleep(first if i == 0 else rest)
+            yield _chunk(part)
+        if (stream_options or {}).get("include_usage"):
+            yield _chunk(usage=_usage(messages, model, self.settings.reply))
+
+    async def parse(self, model, messages, response_format, **kwargs):
+        await asyncio.sleep(self.settings.delay())
+        return _parsed_completion(messages, model, response_format, self.settings.parsed_values)
+
+
+async def _async_model_list():
+    return SimpleNamespace(data=[])
+
+
+class FakeAsyncOpenAI(_Base):
+    def __init__(self, settings=None, **client_kwargs):
+        super().__init__(settings, **client_kwargs)
+        completions = _AsyncCompletions(self.settings)
+        self.chat = SimpleNamespace(completions=completions)
+        self.beta = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+        self.models = SimpleNamespace(list=_async_model_list)
@@ -0,0 +1,129 @@
+# backend/benchmarks/graduation_roundtrip_bench.py
+"""
+Benchmark điều kiện tốt nghiệp của 1 CTĐT: 2 round trip cũ (bm25_search → truy vấn
+full-text lần 2 theo tên) so với truy vấn gộp DIEU_KIEN_TOT_NGHIEP_CTDT_QUERY.
+
+Cần Neo4j thật (đọc NEO4J_URI / NEO4J_USERNAME / NEO4J_PASSWORD từ backend.config).
+Chạy từ thư mục gốc repo:
+    python -m backend.benchmarks.graduation_roundtrip_bench
+"""
+import statistics
+import time
+
+from backend.config import NEO4J_URI, NEO4J_USERNAME, NEO4J_PASSWORD
+from backend.graph_store import GraphStore
+from backend.cypher_registry import BM25_SEARCH_QUERY, DIEU_KIEN_TOT_NGHIEP_CTDT_QUERY
+
+QUESTIONS = [
+    "Điều kiện tốt nghiệp của Công nghệ thông tin là gì?",
+    "Điều kiện tốt nghiệp của Công nghệ thông tin Nhật là gì?",
+    "Điều kiện tốt nghiệp của Kỹ thuật phần mềm?",
+    "Điều kiện tốt nghiệp của Khoa học dữ liệu",
+    "Điều kiện tốt nghiệp của Hệ thống thông tin là gì?",
+    "Điều kiện tốt nghiệp của Trí tuệ nhân tạo",
+]
+
+# Bản cũ của truy vấn chi tiết (chạy sau bm25_search, tham số là tên CTĐT)
+LEGACY_DIEU_KIEN_TOT_NGHIEP_CTDT_QUERY = """
+        CALL db.index.fulltext.queryNodes('ChuongTrinhDaoTao_full_text', $ten_ctdt)
+        YIELD node AS ctdt, score
+        WHERE toLower(ctdt.ten_chuong_trinh) CONTAINS toLower($ten_ctdt)
+
+        OPTIONAL MATCH (dk:DieuKienTotNghiep)-[r:ĐOI_VOI]->(ctdt)
+
+        OPTIONAL MATCH (ctdt)-[rel:CO_CHUAN_NGOAI_NGU_DAU_RA_LA]->(lang)
+
+        WITH
+            ctdt, dk, r, score,
+            collect({
+                he: rel.he,
+                lang_type: HEAD(labels(lang)),
+                thong_tin_ngoai_ngu: CASE HEAD(labels(lang))
+                    WHEN 'TiengAnh' THEN {
+                        bac: lang.bac,
+                        Cambridge: lang.Cambridge,
+                        chung_chi: lang.chung_chi,
+                        IELTS: lang.IELTS,
+                        TOEFL_iBT: lang.TOEFL_iBT,
+                        TOEFL_ITP: lang.TOEFL_ITP,
+                        TOEIC: lang.TOEIC
+                    }
+                    WHEN 'TiengNhat' THEN {
+                        bac: lang.bac,
+                        chung_chi: lang.chung_chi,
+                        JLPT: lang.JLPT,
+                        NAT_TEST: lang.NAT_TEST,
+                        TOP_J: lang.TOP_J
+                    }
+                    WHEN 'TiengPhap' THEN {
+                        bac: lang.bac,
+                        chung_chi: lang.chung_chi,
+                        DELF_va_DALF: lang.DELF_va_DALF,
+                        TCF: lang.TCF
+                    }
+                    ELSE null
+                END
+            }) AS ngoai_ngu_list
+
+        RETURN
+            ctdt.ten_chuong_trinh AS ten_chuong_trinh,
+            dk.quyet_dinh AS quyet_dinh,
+            dk.dieu_kien_chung AS dieu_kien_chung,
+            coalesce(r.dieu_kien_rieng, "Không có yêu cầu riêng.") AS dieu_kien_rieng,
+
+            [x IN ngoai_ngu_list WHERE x.he = "Cử nhân"] AS chuan_ngoai_ngu_cu_nhan,
+
+            [x IN ngoai_ngu_list WHERE x.he = "Kỹ sư"] AS chuan_ngoai_ngu_ky_su,
+
+            score
+        ORDER BY score DESC
+        LIMIT 1;
+        """
+
+
+def legacy_lookup(store, question):
+    bm25_results = store.read(BM25_SEARCH_QUERY, {"query": question, "limit": 1})
+    if not bm25_results:
+        return None
+    ten_ctdt = bm25_results[0]["ten_chuong_trinh"]
+    records = store.read(LEGACY_DIEU_KIEN_TOT_NGHIEP_CTDT_QUERY, {"ten_ctdt": ten_ctdt})
+    return records[0]["ten_chuong_trinh"] if records else None
+
+
+def fused_lookup(store, question):
+    records = store.read(DIEU_KIEN_TOT_NGHIEP_CTDT_QUERY, {"query": question})
+    return records[0]["ten_chuong_trinh"] if records else None
+
+
+def measure(store, fn, repeat):
+    latencies = []
+    queries_before = store.stats()["queries"]
+    for _ in range(repeat):
+        for question in QUESTIONS:
+            started = time.perf_counter()
+            fn(store, question)
+            latencies.append((time.perf_counter() - started) * 1000)
+    round_trips = (store.stats()["queries"] - queries_before) / len(latencies)
+    return round_trips, statistics.mean(latencies), statistics.median(latencies)
+
+
+def main(repeat=10):
+    store = GraphStore(NEO4J_URI, (NEO4J_USERNAME, NEO4J_PASSWORD))
+    try:
+        mismatches = [
+            q for q in QUESTIONS
+            if legacy_lookup(store, q) != fused_lookup(store, q)
+        ]
+        if mismatches:
+            print(f"⚠️ CTĐT khác bản cũ: {mismatches}")
+
+        for name, fn in [("legacy 2 bước", legacy_lookup), ("gộp 1 truy vấn", fused_lookup)]:
+            round_trips, mean_ms, median_ms = measure(store, fn, repeat)
+            print(f"{name:>15}: {round_trips:.1f} round trip, "
+                  f"TB {mean_ms:7.1f} ms, trung vị {median_ms:7.1f} ms / câu hỏi")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
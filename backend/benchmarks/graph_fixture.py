@@ -0,0 +1,433 @@
+# backend/benchmarks/graph_fixture.py
+"""
+Đồ thị tri thức trong bộ nhớ cho benchmark offline: thay GraphStore (Neo4j) bằng InMemoryGraphStore
+trả về đúng các cột mà Neo4jHandler đọc, theo tên câu lệnh trong CYPHER registry.
+
+- GraphFixture: dữ liệu giả lập cố định (CTĐT, học phần, học kỳ, tiên quyết, song hành, ngoại ngữ),
+  sinh tất định từ tham số → mỗi lần chạy benchmark cùng dữ liệu.
+- InMemoryGraphStore: cùng giao diện GraphStore (read / read_async / stats / close...),
+  mỗi truy vấn chờ `latency` giây (mô phỏng round trip tới AuraDB).
+- Full-text search (BM25) được mô phỏng bằng khớp chuỗi con / số từ trùng với tên CTĐT.
+"""
+import asyncio
+import threading
+import time
+
+from backend.cypher_registry import CYPHER
+
+PROGRAMS = [
+    # (tên, mã, khoa, khóa)
+    ("Công nghệ thông tin", "7480201", "Khoa Công nghệ thông tin", "K2023"),
+    ("Kỹ thuật phần mềm", "7480103", "Khoa Công nghệ thông tin", "K2023"),
+    ("Khoa học dữ liệu", "7460108", "Khoa Toán - Tin", "K2023"),
+    ("Hệ thống thông tin", "7480104", "Khoa Công nghệ thông tin", "K2023"),
+    ("Trí tuệ nhân tạo", "7480107", "Khoa Công nghệ thông tin", "K2024"),
+]
+
+COURSES = [
+    # (tên, số tín chỉ, nhãn)
+    ("Giải tích 1", 4, "HocPhanDaiCuong"),
+    ("Giải tích 2", 4, "HocPhanDaiCuong"),
+    ("Đại số tuyến tính", 3, "HocPhanDaiCuong"),
+    ("Vật lý đại cương", 3, "HocPhanDaiCuong"),
+    ("Xác suất thống kê", 3, "HocPhanDaiCuong"),
+    ("Nhập môn lập trình", 4, "HocPhanDaiCuong"),
+    ("Kỹ thuật lập trình", 4, "HocPhanKeTiep"),
+    ("Cấu trúc dữ liệu và giải thuật", 4, "HocPhanKeTiep"),
+    ("Lập trình hướng đối tượng", 4, "HocPhanKeTiep"),
+    ("Cơ sở dữ liệu", 4, "HocPhanKeTiep"),
+    ("Hệ điều hành", 3, "HocPhanKeTiep"),
+    ("Mạng máy tính", 3, "HocPhanKeTiep"),
+    ("Công nghệ phần mềm", 3, "HocPhanKeTiep"),
+    ("Nhập môn trí tuệ nhân tạo", 3, "HocPhanKeTiep"),
+    ("Học máy", 3, "HocPhanKeTiep"),
+    ("Phân tích thiết kế hệ thống", 3, "HocPhanKeTiep"),
+    ("Đồ án 1", 2, "HocPhanKeTiep"),
+    ("Đồ án 2", 2, "HocPhanKeTiep"),
+    ("Thực tập tốt nghiệp", 4, "HocPhanKeTiep"),
+    ("Khóa luận tốt nghiệp", 10, "HocPhanKeTiep"),
+]
+
+# (tiên quyết, học phần bị tiên quyết)
+PREREQUISITES = [
+    ("Giải tích 1", "Giải tích 2"),
+    ("Nhập môn lập trình", "Kỹ thuật lập trình"),
+    ("Kỹ thuật lập trình", "Cấu trúc dữ liệu và giải thuật"),
+    ("Kỹ thuật lập trình", "Lập trình hướng đối tượng"),
+    ("Cấu trúc dữ liệu và giải thuật", "Cơ sở dữ liệu"),
+    ("Cấu trúc dữ liệu và giải thuật", "Nhập môn trí tuệ nhân tạo"),
+    ("Xác suất thống kê", "Học máy"),
+    ("Nhập môn trí tuệ nhân tạo", "Học máy"),
+    ("Lập trình hướng đối tượng", "Công nghệ phần mềm"),
+    ("Cơ sở dữ liệu", "Phân tích thiết kế hệ thống"),
+    ("Đồ án 1", "Đồ án 2"),
+    ("Đồ án 2", "Khóa luận tốt nghiệp"),
+]
+
+COREQUISITES = [
+    ("Vật lý đại cương", "Giải tích 1"),
+    ("Hệ điều hành", "Mạng máy tính"),
+]
+
+SEMESTER_COUNT = 8
+
+ENGLISH_LEVELS = {
+    # he → chuẩn tiếng Anh đầu ra
+    "Cử nhân": {"bac": "Bậc 3", "IELTS": "5.0", "TOEIC": "450", "TOEFL_iBT": "45",
+                "TOEFL_ITP": "450", "Cambridge": "PET", "chung_chi": "VSTEP B1"},
+    "Kỹ sư": {"bac": "Bậc 4", "IELTS": "5.5", "TOEIC": "600", "TOEFL_iBT": "61",
+              "TOEFL_ITP": "500", "Cambridge": "FCE", "chung_chi": "VSTEP B2"},
+}
+
+DIEU_KIEN_CHUNG = (
+    "Tích lũy đủ số tín chỉ của chương trình đào tạo; điểm trung bình tích lũy từ 2.0 trở lên; "
+    "đạt chuẩn ngoại ngữ đầu ra; hoàn thành Giáo dục quốc phòng - an ninh và Giáo dục thể chất; "
+    "không bị truy cứu trách nhiệm hình sự hoặc đang bị kỷ luật đình chỉ học tập."
+)
+
+
+def _words(text):
+    return set((text or "").lower().split())
+
+
+class GraphFixture:
+    """
+    Dữ liệu đồ thị giả lập. extra_courses: số học phần tự chọn thêm cho mỗi CTĐT
+    (tăng để prompt / kết quả truy vấn lớn hơn).
+    """
+
+    def __init__(self, extra_courses=20):
+        self.programs = [
+            {"ten_chuong_trinh": name, "ma_chuong_trinh": code, "ten_khoa": faculty, "khoa": cohort}
+            for name, code, faculty, cohort in PROGRAMS
+        ]
+        courses = list(COURSES) + [(f"Học phần tự chọn {i}", 3, "HocPhanKeTiep") for i in range(1, extra_courses + 1)]
+        self.courses = [
+            {
+                "ten_mon": name,
+                "ma_hoc_phan": f"HP{100 + i:03d}",
+                "so_tin_chi": credits,
+                "label": label,
+                "ten_hoc_ky": f"Học kỳ {i % SEMESTER_COUNT + 1}",
+            }
+            for i, (name, credits, label) in enumerate(courses)
+        ]
+        self._course_by_name = {c["ten_mon"]: c for c in self.courses}
+        self.semesters = [f"Học kỳ {i}" for i in range(1, SEMESTER_COUNT + 1)]
+
+    # ---------- tra cứu ----------
+    def search_programs(self, text):
+        """
+        Mô phỏng full-text index ChuongTrinhDaoTao: tên nằm trong câu hỏi → điểm cao nhất,
+        không thì theo số từ trùng. Trả về [(score, program)] giảm dần.
+        """
+        q = (text or "").lower()
+        q_words = _words(q)
+        scored = []
+        for p in self.programs:
+            name = p["ten_chuong_trinh"].lower()
+            if name in q:
+                score = 10.0 + len(name)
+            else:
+                name_words = _words(name)
+                score = len(q_words & name_words) / len(name_words)
+            if score > 0:
+                scored.append((round(score, 3), p))
+        scored.sort(key=lambda x: -x[0])
+        return scored
+
+    def program(self, name):
+        for p in self.programs:
+            if p["ten_chuong_trinh"].lower() == (name or "").lower():
+                return p
+        results = self.search_programs(name)
+        return results[0][1] if results else None
+
+    def _credits(self):
+        total = sum(c["so_tin_chi"] for c in self.courses)
+        return {
+            "tong_so_tin_chi_yeu_cau_doi_voi_ky_su": total + 30,
+            "so_tin_chi_bat_buoc_doi_voi_ky_su": total,
+            "so_tin_chi_tu_chon_doi_voi_ky_su": 30,
+            "tong_so_tin_chi_yeu_cau_doi_voi_cu_nhan": total,
+            "so_tin_chi_bat_buoc_doi_voi_cu_nhan": total - 20,
+            "so_tin_chi_tu_chon_doi_voi_cu_nhan": 20,
+        }
+
+    def _language(self, he):
+        return {"he": he, "lang_type": "TiengAnh", "thong_tin_ngoai_ngu": dict(ENGLISH_LEVELS[he])}
+
+    def _graduation(self, program):
+        return {
+            "ten_chuong_trinh": program["ten_chuong_trinh"],
+            "dieu_kien_chung": DIEU_KIEN_CHUNG,
+            "dieu_kien_rieng": "Không có yêu cầu riêng.",
+        }
+
+    # ---------- các câu lệnh trong CYPHER registry (tên hàm = tên câu lệnh) ----------
+    def ctdt_name(self, q):
+        return [{"ten": p["ten_chuong_trinh"], "score": s} for s, p in self.search_programs(q)[:1]]
+
+    def bm25_search(self, query, limit=5):
+        return [
+            {"ten_chuong_trinh": p["ten_chuong_trinh"], "noi_dung": f"Chương trình {p['ten_chuong_trinh']}", "score": s}
+            for s, p in self.search_programs(query)[:limit]
+        ]
+
+    def entity_names(self):
+        return (
+            [{"name": c["ten_mon"], "kind": "course"} for c in self.courses]
+            + [{"name": p["ten_chuong_trinh"], "kind": "program"} for p in self.programs]
+            + [{"name": s, "kind": "semester"} for s in self.semesters]
+        )
+
+    def graph_version(self):
+        nodes = len(self.programs) + len(self.courses) + len(self.semesters)
+        rels = len(self.programs) * (len(self.courses) + len(PREREQUISITES) + len(COREQUISITES))
+        return [{"version": 1, "nodes": nodes, "rels": rels}]
+
+    def dieu_kien_tot_nghiep_chung(self):
+        return [
+            {
+                **self._graduation(p),
+                "Quyet_dinh": "Quyết định 1234/QĐ-ĐHBK",
+                "ngoai_ngu_list": [self._language("Cử nhân"), self._language("Kỹ sư")],
+            }
+            for p in self.programs
+        ]
+
+    def dieu_kien_tot_nghiep_ctdt(self, query):
+        return [
+            {
+                **self._graduation(p),
+                "quyet_dinh": "Quyết định 1234/QĐ-ĐHBK",
+                "chuan_ngoai_ngu_cu_nhan": [self._language("Cử nhân")],
+                "chuan_ngoai_ngu_ky_su": [self._language("Kỹ sư")],
+                "score": s,
+            }
+            for s, p in self.search_programs(query)[:1]
+        ]
+
+    def chuan_ngoai_ngu_dau_ra_chung(self):
+        return [
+            {
+                "ten_chuong_trinh": p["ten_chuong_trinh"],
+                "chuan_ngoai_ngu_cu_nhan": [self._language("Cử nhân")],
+                "chuan_ngoai_ngu_ky_su": [self._language("Kỹ sư")],
+            }
+            for p in self.programs
+        ]
+
+    def chuan_ngoai_ngu_ctdt(self, program_name):
+        return [
+            {
+                "ten_chuong_trinh": p["ten_chuong_trinh"],
+                "chuan_ngoai_ngu_cu_nhan": [self._language("Cử nhân")],
+                "chuan_ngoai_ngu_ky_su": [self._language("Kỹ sư")],
+                "score": s,
+            }
+            for s, p in self.search_programs(program_name)[:1]
+        ]
+
+    def language_requirement(self, query):
+        return [
+            {
+                "thuoc_chuong_trinh": p["ten_chuong_trinh"],
+                "he": he,
+                "score": 1.0,
+                "lang_type": "TiengAnh",
+                "thong_tin": {k: [v] for k, v in levels.items()},
+            }
+            for p in self.programs
+            for he, levels in ENGLISH_LEVELS.items()
+        ]
+
+    def khung_nang_luc_ngoai_ngu(self):
+        levels = list(ENGLISH_LEVELS.values())
+        thong_tin = {k: [lv[k] for lv in levels] for k in levels[0]}
+        return [{
+            "info": {
+                "khung": {"khai_niem": "Khung năng lực ngoại ngữ 6 bậc dùng cho Việt Nam"},
+                "cac_ngon_ngu": [{"lang_type": "TiengAnh", "thong_tin": thong_tin}],
+                "score": 1.0,
+            }
+        }]
+
+    def course(self, program_name):
+        p = self.program(program_name)
+        if p is None:
+            return []
+        hoc_phan = [
+            {"loai": c["label"], "ten": c["ten_mon"], "ma_hoc_phan": c["ma_hoc_phan"], "he": None,
+             "so_tin_chi": c["so_tin_chi"]}
+            for c in self.courses
+        ]
+        return [
+            {
+                "ten_chuong_trinh": p["ten_chuong_trinh"],
+                "ten_khoa": p["ten_khoa"],
+                "khoa": p["khoa"],
+                "noi_dung": f"Chương trình đào tạo {p['ten_chuong_trinh']}",
+                **self._credits(),
+                "he": he,
+                "danh_sach_hoc_phan": hoc_phan,
+                "tong_so_hoc_phan": len(hoc_phan),
+            }
+            for he in ("Cử nhân", "Kỹ sư")
+        ]
+
+    def hoc_phan_theo_hoc_ky(self, program_name):
+        p = self.program(program_name)
+        if p is None:
+            return []
+        return [
+            {
+                "ten_mon": c["ten_mon"],
+                "ma_hoc_phan": c["ma_hoc_phan"],
+                "so_tin_chi": c["so_tin_chi"],
+                "ten_hoc_ky": c["ten_hoc_ky"],
+                "ten_chuong_trinh": p["ten_chuong_trinh"],
+            }
+            for c in self.courses
+        ]
+
+    def list_course(self):
+        return [
+            {
+                "ten_chuong_trinh": p["ten_chuong_trinh"],
+                "Khoa": p["khoa"],
+                "ma_chuong_trinh": p["ma_chuong_trinh"],
+                **self._credits(),
+            }
+            for p in self.programs
+        ]
+
+    def tien_quyet(self, program_name):
+        p = self.program(program_name)
+        if p is None:
+            return []
+        rows = []
+        for src, dst in PREREQUISITES:
+            tq, hp = self._course_by_name[src], self._course_by_name[dst]
+            rows.append({
+                "ten_chuong_trinh": p["ten_chuong_trinh"],
+                "ten_hoc_phan_tien_quyet": tq["ten_mon"],
+                "labels_tq": [tq["label"], "HocPhanTienQuyet"],
+                "ma_hoc_phan_tien_quyet": tq["ma_hoc_phan"],
+                "so_tin_chi_tien_quyet": tq["so_tin_chi"],
+                "ten_hoc_phan_bi_tien_quyet": hp["ten_mon"],
+                "ma_hoc_phan_bi_tien_quyet": hp["ma_hoc_phan"],
+                "labels_hp": [hp["label"]],
+            })
+        return rows
+
+    def song_hanh(self, program_name):
+        p = self.program(program_name)
+        if p is None:
+            return []
+        rows = []
+        for a, b in COREQUISITES:
+            hp1, hp2 = self._course_by_name[a], self._course_by_name[b]
+            rows.append({
+                "ten_chuong_trinh": p["ten_chuong_trinh"],
+                "hoc_phan_1": hp1["ten_mon"],
+                "labels_hp1": [hp1["label"], "HocPhanSongHanh"],
+                "ma_hoc_hoc_phan_1": hp1["ma_hoc_phan"],
+                "so_tin_chi_hoc_phan_1": hp1["so_tin_chi"],
+                "hoc_phan_2": hp2["ten_mon"],
+                "labels_hp2": [hp2["label"], "HocPhanSongHanh"],
+                "ma_hoc_hoc_phan_2": hp2["ma_hoc_phan"],
+                "so_tin_chi_hoc_phan_2": hp2["so_tin_chi"],
+                "tien_quyet_hp1": [s for s, d in PREREQUISITES if d == a],
+                "tien_quyet_hp2": [s for s, d in PREREQUISITES if d == b],
+            })
+        return rows
+
+
+class InMemoryGraphStore:
+    """
+    Thay GraphStore khi chạy benchmark offline. Câu lệnh không có trong registry → lỗi
+    (để phát hiện truy vấn mới chưa được mô phỏng), EXPLAIN (warm up plan) → [].
+    """
+
+    def __init__(self, fixture=None, latency=0.0):
+        self.fixture = fixture or GraphFixture()
+        self.latency = latency
+        self.database = "fixture"
+        self.driver = None
+
+        self._lock = threading.Lock()
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.queries = 0
+        self.failures = 0
+
+    @property
+    def async_driver(self):
+        return None
+
+    def verify_connectivity(self):
+        pass
+
+    def _execute(self, query, params):
+        if query.lstrip().upper().startswith("EXPLAIN "):
+            return []
+        name = CYPHER.name_of(query)
+        handler = getattr(self.fixture, name, None)
+        if handler is None:
+            raise NotImplementedError(f"GraphFixture chưa mô phỏng câu lệnh: {name}")
+        return handler(**(params or {}))
+
+    def _checkout(self):
+        with self._lock:
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+            self.queries += 1
+
+    def _checkin(self, failed=False):
+        with self._lock:
+            self.in_use -= 1
+            if failed:
+                self.failures += 1
+
+    def read(self, query, params=None):
+        self._checkout()
+        try:
+            time.sleep(self.latency)
+            records = self._execute(query, params)
+        except Exception:
+            self._checkin(failed=True)
+            raise
+        self._checkin()
+        return records
+
+    async def read_async(self, query, params=None):
+        self._checkout()
+        try:
+            await asyncio.sleep(self.latency)
+            records = self._execute(query, params)
+        except Exception:
+            self._checkin(failed=True)
+            raise
+        self._checkin()
+        return records
+
+    def stats(self):
+        with self._lock:
+            return {
+                "database": self.database,
+                "max_pool_size": None,
+                "in_use": self.in_use,
+                "peak_in_use": self.peak_in_use,
+                "queries": self.queries,
+                "retries": 0,
+                "failures": self.failures,
+                "acquire_wait_avg_ms": 0.0,
+                "acquire_wait_max_ms": 0.0,
+            }
+
+    def close(self):
+        pass
+
+    async def close_async(self):
+        pass
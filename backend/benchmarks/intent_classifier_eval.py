@@ -0,0 +1,105 @@
+# backend/benchmarks/intent_classifier_eval.py
+"""
+Đánh giá held-out IntentClassifier: cross-validation trên file câu hỏi mẫu (mỗi câu chỉ được dự đoán
+bởi model không thấy nó) + bộ câu ngoài phạm vi không có trong file mẫu.
+
+In ra: accuracy, sharpness đã hiệu chỉnh, precision / coverage theo ngưỡng, các câu bị nhận sai
+ở ngưỡng đã chọn, và intent model đã lưu trả về cho câu ngoài phạm vi.
+
+Chạy từ thư mục gốc repo:
+    python -m backend.benchmarks.intent_classifier_eval
+    python -m backend.benchmarks.intent_classifier_eval --samples backend/data/intent_questions.tsv --folds 10
+"""
+import argparse
+
+from backend.intent_classifier import (
+    CV_FOLDS,
+    DEFAULT_MODEL_PATH,
+    OUT_OF_DOMAIN,
+    TARGET_PRECISION,
+    IntentClassifier,
+    choose_threshold,
+    confidence,
+    cross_validate,
+    fit_sharpness,
+    load_samples,
+    precision_curve,
+)
+
+DEFAULT_SAMPLES_PATH = DEFAULT_MODEL_PATH.replace("intent_model.json", "intent_questions.tsv")
+
+# Câu ngoài phạm vi KHÔNG có trong file mẫu: model không được nhận (phải về understand() / GPT)
+OUT_OF_DOMAIN_PROBES = [
+    "học phí bao nhiêu",
+    "Giải tích 1 là môn gì",
+    "Ngành Công nghệ thông tin học phí một năm bao nhiêu?",
+    "Môn Xác suất thống kê dạy những gì?",
+    "Lịch nghỉ Tết năm nay thế nào?",
+    "Làm sao để đăng ký ở ký túc xá?",
+    "Cho mình số điện thoại phòng công tác sinh viên",
+    "Điểm chuẩn ngành Khoa học máy tính năm ngoái là bao nhiêu?",
+    "Thi TOEIC ở đâu rẻ?",
+    "Mạng máy tính là gì?",
+    "Kể chuyện cười đi",
+    "Trường có bãi giữ xe không?",
+]
+
+THRESHOLDS = [0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95, 0.99]
+
+
+def _at(accepted, in_domain, threshold):
+    kept = [ok for conf, ok in accepted if conf >= threshold]
+    precision = sum(kept) / len(kept) if kept else float("nan")
+    return len(kept), precision, len(kept) / in_domain
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Đánh giá held-out IntentClassifier")
+    parser.add_argument("--samples", default=DEFAULT_SAMPLES_PATH)
+    parser.add_argument("--model", default=DEFAULT_MODEL_PATH)
+    parser.add_argument("--folds", type=int, default=CV_FOLDS)
+    parser.add_argument("--target-precision", type=float, default=TARGET_PRECISION)
+    args = parser.parse_args(argv)
+
+    samples = load_samples(args.samples)
+    held_out = cross_validate(samples, args.folds)
+    sharpness = fit_sharpness(held_out)
+    threshold, precision, coverage = choose_threshold(held_out, sharpness, args.target_precision)
+    accuracy = sum(confidence(scores, sharpness)[0] == intent for intent, _, scores in held_out) / len(held_out)
+
+    print(f"📚 {len(samples)} câu hỏi mẫu, {args.folds}-fold cross-validation")
+    print(f"   accuracy held-out: {accuracy:.3f}")
+    print(f"   sharpness (log-loss nhỏ nhất): {sharpness:.3f}")
+    if threshold is None:
+        print(f"   ❌ Không ngưỡng nào đạt precision >= {args.target_precision:.2f} → model tắt")
+    else:
+        print(f"   ngưỡng: {threshold:.3f} → precision {precision:.3f}, coverage {coverage:.3f}")
+
+    accepted, in_domain = precision_curve(held_out, sharpness)
+    print("\n  ngưỡng   nhận   precision   coverage")
+    for t in THRESHOLDS + ([threshold] if threshold is not None else []):
+        kept, p, c = _at(accepted, in_domain, t)
+        print(f"  {t:6.3f}  {kept:5d}   {p:9.3f}   {c:8.3f}")
+
+    if threshold is not None:
+        print("\n❗ Nhận sai ở ngưỡng đã chọn:")
+        for intent, question, scores in held_out:
+            predicted, conf = confidence(scores, sharpness)
+            if predicted != OUT_OF_DOMAIN and predicted != intent and conf >= threshold:
+                print(f"   {conf:.3f}  {intent} → {predicted}: {question}")
+
+    model = IntentClassifier.load(args.model)
+    print(f"\n🧪 Câu ngoài phạm vi với model {args.model} (ngưỡng {model.threshold}):")
+    leaked = 0
+    for question in OUT_OF_DOMAIN_PROBES:
+        predicted, conf = model.predict(question)
+        accepted_here = (
+            model.threshold is not None and predicted != OUT_OF_DOMAIN and conf >= model.threshold
+        )
+        leaked += accepted_here
+        print(f"   {'❌' if accepted_here else '✅'} {conf:.3f} {predicted}: {question}")
+    print(f"   {leaked}/{len(OUT_OF_DOMAIN_PROBES)} câu ngoài phạm vi bị nhận vào 1 intent")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# backend/benchmarks/intent_rules_bench.py
+"""
+Microbenchmark luật xác định intent: chuỗi `any(k in q ...)` cũ so với KeywordRuleMatcher.
+
+Chạy từ thư mục gốc repo:
+    python -m backend.benchmarks.intent_rules_bench
+"""
+import timeit
+
+from backend.intent_rules import INTENT_RULES, KeywordRuleMatcher
+
+# Câu hỏi thực tế của sinh viên (gồm cả câu không khớp luật nào → GPT fallback)
+QUESTIONS = [
+    "Điều kiện tốt nghiệp là gì?",
+    "Điều kiện tốt nghiệp của Công nghệ thông tin Nhật là gì?",
+    "Chuẩn ngoại ngữ đầu ra là gì?",
+    "Chuẩn ngoại ngữ đầu ra của Công nghệ thông tin Nhật là gì?",
+    "Ra trường cần đạt chứng chỉ tiếng Anh nào?",
+    "IELTS bao nhiêu thì tốt nghiệp?",
+    "TOEIC bao nhiêu thì ra trường?",
+    "Cần đạt JLPT cấp mấy để tốt nghiệp?",
+    "Khung năng lực ngoại ngữ 6 bậc gồm những gì?",
+    "Ngoại ngữ gồm mấy bậc?",
+    "Có những chương trình đào tạo nào?",
+    "Chương trình Kỹ thuật phần mềm thuộc khoa nào?",
+    "Ngành Khoa học dữ liệu có bao nhiêu tín chỉ?",
+    "CTĐT Công nghệ thông tin học kỳ 5 học môn gì?",
+    "Công nghệ thông tin học những môn nào theo từng học kỳ?",
+    "HK3 của Hệ thống thông tin có những môn gì?",
+    "Các học phần đại cương của Công nghệ thông tin?",
+    "Danh sách học phần đồ án của Kỹ thuật máy tính",
+    "Trong chương trình đào tạo Công nghệ thông tin để học môn Cấu trúc dữ liệu cần học trước môn nào?",
+    "Trong chương trình đào tạo Công nghệ thông tin nếu rớt học phần Giải tích 1 thì không được học học phần nào?",
+    "Học phần Nhập môn lập trình là tiên quyết của học phần nào?",
+    "Học phần song hành của Công nghệ thông tin là gì?",
+    "Môn nào phải học cùng lúc với Vật lý đại cương?",
+    "Cho mình hỏi về chương trình Trí tuệ nhân tạo",
+]
+
+
+def legacy_detect_intent_by_rules(question: str):
+    # Bản cũ của IntentDetector.detect_intent_by_rules (để so sánh kết quả và tốc độ)
+    q = question.lower()
+
+    if any(k in q for k in [
+        "khung năng lực",
+        "khung 6 bậc",
+        "ngoại ngữ gồm mấy bậc",
+        "các bậc ngoại ngữ",
+        "khung năng lực tiếng anh"
+    ]):
+        return "hoi_khung_nang_luc_ngoai_ngu"
+
+    if any(k in q for k in ["bao nhiêu", "mức", "điểm"]) and any(
+        k in q for k in ["ielts", "toeic", "toefl", "jlpt", "nat", "top j"]
+    ):
+        return "hoi_chuan_ngoai_ngu_muc_diem"
+
+    if "điều kiện tốt nghiệp" in q and "của" in q:
+        return "hoi_dieu_kien_tot_nghiep_ctdt"
+
+    if "điều kiện tốt nghiệp" in q:
+        return "hoi_dieu_kien_tot_nghiep_chung"
+
+    if "chuẩn ngoại ngữ" in q and "của" in q:
+        return "chuan_ngoai_ngu_ctdt"
+
+    if "chuẩn ngoại ngữ" in q:
+        return "hoi_chuan_ngoai_ngu_dau_ra_chung"
+
+    if any(k in q for k in [
+        "học kỳ",
+        "hk ",
+        "hk1", "hk2", "hk3", "hk4", "hk5", "hk6", "hk7", "hk8", "hk9", "hk10",
+        "học trong kỳ",
+        "theo từng học kỳ",
+        "mỗi học kỳ"
+    ]):
+        return "hoi_hoc_phan_theo_hoc_ky_ctdt"
+
+    if any(k in q for k in ["đại cương", "tự do", "kế tiếp", "đồ án"]):
+        return "hoi_thong_tin_ctdt"
+
+    if any(k in q for k in ["tiên quyết", "học trước", "rớt", "không vượt qua"]):
+        return "hoi_tien_quyet_hoc_phan_ctdt"
+
+    if any(k in q for k in ["song hành", "học cùng", "cùng lúc", "đồng thời"]):
+        return "hoi_hoc_phan_song_hanh_ctdt"
+
+    return None
+
+
+def main(number=2000):
+    matcher = KeywordRuleMatcher(INTENT_RULES)
+
+    def compiled_detect(question):
+        return matcher.match(question.lower())
+
+    mismatches = [
+        q for q in QUESTIONS
+        if legacy_detect_intent_by_rules(q) != compiled_detect(q)
+    ]
+    if mismatches:
+        raise SystemExit(f"❌ Kết quả khác bản cũ: {mismatches}")
+
+    for name, fn in [("legacy any()", legacy_detect_intent_by_rules), ("compiled", compiled_detect)]:
+        seconds = min(timeit.repeat(lambda: [fn(q) for q in QUESTIONS], number=number, repeat=5))
+        per_call_us = seconds / (number * len(QUESTIONS)) * 1e6
+        print(f"{name:>14}: {per_call_us:6.2f} µs / câu hỏi")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# backend/benchmarks/principal_cache_check.py
+"""
+Kiểm tra invalidate của principal cache (backend/app/services/principal_cache.py) giữa nhiều worker:
+2 PrincipalCache dùng chung 1 shared store (Redis stand-in backend/benchmarks/resp_server.py)
+đóng vai 2 worker uvicorn, bảng users giả lập trong RAM.
+
+- Đổi role / xóa user rồi invalidate ở worker A → cả A và B thấy ngay (B qua epoch trên shared store).
+- Shared store lỗi → B xóa cache của mình thay vì giữ bản cũ.
+
+Chạy từ thư mục gốc repo (thoát mã khác 0 nếu sai):
+    python -m backend.benchmarks.principal_cache_check
+"""
+import asyncio
+import sys
+from datetime import datetime
+from types import SimpleNamespace
+
+from backend.app.services.principal_cache import PrincipalCache, load_principal
+from backend.benchmarks.resp_server import RespServer
+from backend.shared_cache import SharedStore
+
+
+class FakeUsers:
+    """
+    Thay AsyncSession: chỉ có get(User, id), đếm số lần đọc.
+    """
+
+    def __init__(self):
+        self.rows = {}
+        self.reads = 0
+
+    async def get(self, model, user_id):
+        self.reads += 1
+        return self.rows.get(user_id)
+
+
+def _check(ok, message):
+    print(f"   {'✅' if ok else '❌'} {message}")
+    return ok
+
+
+async def run():
+    server = RespServer()
+    url = server.start()
+    store = SharedStore(url, timeout=0.2, retry_seconds=5)
+
+    db = FakeUsers()
+    db.rows[1] = SimpleNamespace(id=1, username="sv", role="admin", create_at=datetime(2024, 1, 1))
+
+    # sync_seconds=0: mỗi request đều đọc epoch (bản chạy thật: PRINCIPAL_CACHE_SYNC_SECONDS)
+    worker_a = PrincipalCache(ttl_seconds=30, shared=store, sync_seconds=0)
+    worker_b = PrincipalCache(ttl_seconds=30, shared=store, sync_seconds=0)
+
+    ok = True
+    print("🧪 Principal cache: 2 worker, 1 shared store")
+
+    await load_principal(db, 1, worker_a)
+    await load_principal(db, 1, worker_b)
+    reads = db.reads
+    ok &= _check((await load_principal(db, 1, worker_b)).role == "admin" and db.reads == reads,
+                 "lần đọc sau trúng cache, không đọc DB")
+
+    # admin hạ quyền user trên worker A
+    db.rows[1].role = "user"
+    await worker_a.invalidate_async(1)
+    ok &= _check((await load_principal(db, 1, worker_a)).role == "user", "worker A thấy role mới sau invalidate")
+    ok &= _check((await load_principal(db, 1, worker_b)).role == "user", "worker B thấy role mới (epoch đổi)")
+
+    # admin xóa user trên worker B
+    del db.rows[1]
+    await worker_b.invalidate_async(1)
+    ok &= _check(await load_principal(db, 1, worker_b) is None, "worker B không còn user đã xóa")
+    ok &= _check(await load_principal(db, 1, worker_a) is None, "worker A không còn user đã xóa")
+
+    # shared store lỗi: không biết worker khác có invalidate không → bỏ cache
+    db.rows[2] = SimpleNamespace(id=2, username="sv2", role="user", create_at=datetime(2024, 1, 1))
+    await load_principal(db, 2, worker_b)
+    await store.close_async()
+    server.stop()
+    await asyncio.sleep(0.1)
+    await worker_b.sync_async()
+    ok &= _check(worker_b.get(2) is None, "shared store lỗi → worker B xóa cache")
+
+    await store.close_async()
+    print("✅ OK" if ok else "❌ FAIL")
+    return ok
+
+
+def main():
+    sys.exit(0 if asyncio.run(run()) else 1)
+
+
+if __name__ == "__main__":
+    main()
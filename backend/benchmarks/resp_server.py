@@ -0,0 +1,194 @@
+# backend/benchmarks/resp_server.py
+"""
+Server nói giao thức Redis (RESP2) tối giản, giữ dữ liệu trong RAM — thay Redis khi benchmark / chạy thử
+shared cache (backend/shared_cache.py) trên máy không cài Redis.
+
+Hỗ trợ đúng các lệnh SharedStore + redis-py cần: HELLO (RESP2 / RESP3, redis-py >= 6 mặc định gửi HELLO 3),
+PING, GET, SET (EX / PX / NX / XX), DEL, EXISTS, DBSIZE, FLUSHDB.
+Lệnh khác trả lỗi "-ERR unknown command" (redis-py bỏ qua lỗi CLIENT SETINFO lúc kết nối).
+
+Chạy riêng (nhiều process app cùng trỏ vào, vd 2 lần chat_loadtest --shared-cache redis://127.0.0.1:6390/0):
+    python -m backend.benchmarks.resp_server --port 6390
+Hoặc trong process: RespServer().start() chạy ở thread nền, trả về URL.
+"""
+import argparse
+import asyncio
+import threading
+import time
+
+
+class RespServer:
+    def __init__(self, host="127.0.0.1", port=0):
+        self.host = host
+        self.port = port
+        self._data = {}  # key → (value bytes, expires_at monotonic hoặc None)
+        self.commands = 0
+        self._loop = None
+        self._server = None
+
+    @property
+    def url(self):
+        return f"redis://{self.host}:{self.port}/0"
+
+    # ---------- dữ liệu ----------
+    def _get(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and time.monotonic() >= expires_at:
+            del self._data[key]
+            return None
+        return value
+
+    def _set(self, args):
+        key, value, options = args[0], args[1], [a.upper() for a in args[2:]]
+        expires_at = None
+        i = 0
+        while i < len(options):
+            option = options[i]
+            if option in (b"EX", b"PX"):
+                amount = float(options[i + 1])
+                expires_at = time.monotonic() + (amount if option == b"EX" else amount / 1000)
+                i += 2
+                continue
+            if option == b"NX" and self._get(key) is not None:
+                return None
+            if option == b"XX" and self._get(key) is None:
+                return None
+            i += 1
+        self._data[key] = (value, expires_at)
+        return b"+OK\r\n"
+
+    def execute(self, command, args):
+        self.commands += 1
+        if command == b"HELLO":
+            return _hello(int(args[0]) if args else 2)
+        if command == b"PING":
+            return b"+PONG\r\n"
+        if command == b"GET":
+            return _bulk(self._get(args[0]))
+        if command == b"SET":
+            return self._set(args) or _bulk(None)
+        if command == b"DEL":
+            return _integer(sum(self._data.pop(key, None) is not None for key in args))
+        if command == b"EXISTS":
+            return _integer(sum(self._get(key) is not None for key in args))
+        if command == b"DBSIZE":
+            return _integer(len(self._data))
+        if command == b"FLUSHDB":
+            self._data.clear()
+            return b"+OK\r\n"
+        return b"-ERR unknown command '" + command + b"'\r\n"
+
+    # ---------- mạng ----------
+    async def _handle(self, reader, writer):
+        protocol = 2
+        try:
+            while True:
+                parts = await _read_command(reader)
+                if parts is None:
+                    break
+                if not parts:
+                    continue
+                command = parts[0].upper()
+                reply = self.execute(command, parts[1:])
+                if command == b"HELLO" and not reply.startswith(b"-"):
+                    protocol = int(parts[1]) if len(parts) > 1 else protocol
+                if reply == NULL and protocol == 3:
+                    reply = b"_\r\n"
+                writer.write(reply)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self._server
+
+    def start(self):
+        """
+        Chạy trên event loop riêng ở thread nền (không dính event loop của app), trả về URL.
+        """
+        started = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self.serve())
+            started.set()
+            self._loop.run_forever()
+
+        threading.Thread(target=run, name="resp-server", daemon=True).start()
+        started.wait()
+        return self.url
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._server.close)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+NULL = b"$-1\r\n"  # RESP3: "_"
+
+
+def _bulk(value):
+    if value is None:
+        return NULL
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+def _integer(value):
+    return b":%d\r\n" % value
+
+
+def _hello(protocol):
+    # bulk / integer / simple string giống nhau ở RESP2 và RESP3 → chỉ khác reply HELLO và null
+    if protocol not in (2, 3):
+        return b"-NOPROTO unsupported protocol version\r\n"
+    fields = [_bulk(b"server"), _bulk(b"redis"), _bulk(b"version"), _bulk(b"7.0.0"),
+              _bulk(b"proto"), _integer(protocol), _bulk(b"mode"), _bulk(b"standalone")]
+    header = b"%%%d\r\n" % (len(fields) // 2) if protocol == 3 else b"*%d\r\n" % len(fields)
+    return header + b"".join(fields)
+
+
+async def _read_command(reader):
+    # client gửi lệnh dạng mảng bulk string: *<n>\r\n$<len>\r\n<arg>\r\n...
+    line = await reader.readline()
+    if not line:
+        return None
+    if not line.startswith(b"*"):
+        # inline command (vd gõ tay qua telnet)
+        return line.strip().split()
+
+    parts = []
+    for _ in range(int(line[1:])):
+        header = await reader.readline()
+        size = int(header[1:])
+        parts.append((await reader.readexactly(size + 2))[:-2])
+    return parts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Redis stand-in (RESP2, trong RAM) cho benchmark shared cache")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6390)
+    args = parser.parse_args(argv)
+
+    server = RespServer(args.host, args.port)
+
+    async def run():
+        await server.serve()
+        print(f"🗄️ RESP server: {server.url}")
+        await asyncio.Event().wait()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        print(f"👋 Dừng RESP server ({server.commands} lệnh)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,363 @@
 # backend/logic_chatbot.py
+import os
+import time
 from backend.neo4j_handle import Neo4jHandler
 from backend.openai_handler import OpenAIHandler
 from backend.intent_detector import IntentDetector
+from backend.answer_cache import AnswerCache
+from backend.shared_cache import shared_store
+from backend.single_flight import SingleFlight
+from backend import answer_templates
+from backend.metrics import ANSWER_MODE_TOTAL, REGISTRY, observe_request, set_intent, stage
 
-openai_handler = OpenAIHandler()
-neo4j_handler = Neo4jHandler(openai_handler)
+# Tạo lười ở init_handlers() (ChatbotLogic() / lifespan của app), import module không mở kết nối nào
+openai_handler = None
+neo4j_handler = None
+# tầng 1 trong process + Redis dùng chung giữa các worker khi đặt SHARED_CACHE_URL
+answer_cache = AnswerCache(max_entries=int(os.getenv("ANSWER_CACHE_SIZE", "1000")), shared=shared_store)
+# câu hỏi trùng khóa answer cache đang được trả lời → chờ chung, không truy vấn / gọi LLM lại
+in_flight = SingleFlight()
+
+# TTL (giây) cache câu trả lời cho intent không có pipeline (BM25 + reasoning)
+DEFAULT_ANSWER_CACHE_TTL = 600
+
+
+def _collect_runtime_stats():
+    """
+    Gauge cho /metrics: pool Neo4j, answer cache, single-flight, cache payload CTĐT, entity cache, plan cache Cypher.
+    """
+    if neo4j_handler is None:
+        return []
+    pool = neo4j_handler.pool_stats()
+    answers = answer_cache.stats()
+    flights = in_flight.stats()
+    programs = neo4j_handler.program_cache.stats()
+    entities = neo4j_handler.entity_cache.stats()
+    plans = neo4j_handler.query_plan_stats()
+    return [
+        ("chatbot_neo4j_pool_max_size", "Số kết nối tối đa của pool Neo4j (mỗi driver)", {}, pool["max_pool_size"]),
+        ("chatbot_neo4j_sessions_in_use", "Phiên Neo4j đang chạy truy vấn", {}, pool["in_use"]),
+        ("chatbot_neo4j_sessions_peak", "Số phiên Neo4j đồng thời cao nhất", {}, pool["peak_in_use"]),
+        ("chatbot_neo4j_retries_total", "Số lần driver retry transaction", {}, pool["retries"]),
+        ("chatbot_neo4j_failures_total", "Số truy vấn Neo4j lỗi sau khi hết retry", {}, pool["failures"]),
+        ("chatbot_neo4j_acquire_wait_avg_seconds", "Thời gian chờ lấy kết nối trung bình", {},
+         pool["acquire_wait_avg_ms"] / 1000),
+        ("chatbot_neo4j_acquire_wait_max_seconds", "Thời gian chờ lấy kết nối lâu nhất", {},
+         pool["acquire_wait_max_ms"] / 1000),
+        ("chatbot_answer_cache_hits_total", "Số lần trúng answer cache", {}, answers.get("hits")),
+        ("chatbot_answer_cache_shared_hits_total", "Số lần trượt answer cache trong process, trúng shared cache", {},
+         answers.get("shared_hits")),
+        ("chatbot_answer_cache_misses_total", "Số lần trượt answer cache", {}, answers.get("misses")),
+        ("chatbot_answer_cache_size", "Số câu trả lời đang cache", {}, answers.get("size")),
+        ("chatbot_program_cache_hit_ratio", "Tỉ lệ trúng cache payload CTĐT (trong process + shared)", {},
+         programs.get("hit_ratio")),
+        ("chatbot_single_flight_started_total", "Số lần tính câu trả lời (Neo4j + LLM) sau khi trượt answer cache", {},
+         flights["started"]),
+        ("chatbot_single_flight_joined_total", "Số request dùng chung lần tính đang chạy của request khác", {},
+         flights["joined"]),
+        ("chatbot_single_flight_in_flight", "Số lần tính câu trả lời đang chạy", {}, flights["in_flight"]),
+        ("chatbot_entity_cache_hit_ratio", "Tỉ lệ trúng entity cache", {}, entities.get("hit_ratio")),
+        ("chatbot_cypher_plan_cache_hit_ratio", "Tỉ lệ trúng plan cache (ước lượng phía client)", {},
+         plans.get("plan_cache_hit_ratio")),
+    ]
+
+
+REGISTRY.add_collector(_collect_runtime_stats)
+
+
+# ==========================
+# Pipeline theo intent
+# - fetch: hàm Neo4jHandler lấy dữ liệu (bản async có hậu tố _async)
+# - fetch_question: câu hỏi truyền cho fetch ("goc", "transformed" hoặc None)
+# - fetch_entities: fetch nhận thêm understood=(program, course, semester) từ bước understand
+# - summarize: hàm OpenAIHandler tóm tắt (dùng bản *_request để chạy sync/async)
+# - summarize_question: câu hỏi truyền cho summarize
+# - empty_message: câu trả lời khi Neo4j không có dữ liệu (None → vẫn gọi summarize)
+# - cache_ttl: thời gian (giây) giữ câu trả lời trong answer cache (0 → không cache)
+# - template: hàm trong answer_templates dựng câu trả lời thẳng từ dữ liệu (không gọi LLM)
+# - answer_mode: "llm" (mặc định), "template" hoặc "template_polish" (template rồi nhờ LLM diễn đạt lại);
+#   ghi đè bằng biến môi trường ANSWER_MODES="intent:mode,intent:mode"
+# ==========================
+INTENT_PIPELINES = {
+    "hoi_dieu_kien_tot_nghiep_chung": {
+        "fetch": "get_dieu_kien_tot_nghiep_chung",
+        "fetch_question": None,
+        "summarize": "summarize_graduation_conditions_chung",
+        "summarize_question": "transformed",
+        "empty_message": None,
+        "cache_ttl": 3600,
+    },
+    "hoi_dieu_kien_tot_nghiep_ctdt": {
+        # question gốc để BM25 tìm đúng CTĐT
+        "fetch": "get_dieu_kien_tot_nghiep_ctdt",
+        "fetch_question": "goc",
+        "summarize": "summarize_graduation_conditions_ctdt",
+        "summarize_question": "goc",
+        "empty_message": "Xin lỗi, tôi không tìm thấy thông tin về điều kiện tốt nghiệp của chương trình này.",
+        "cache_ttl": 1800,
+    },
+    "chuan_ngoai_ngu_ctdt": {
+        # question gốc để BM25 tìm đúng CTĐT
+        "fetch": "get_chuan_ngoai_ngu_dau_ra_cua_ctdt",
+        "fetch_question": "goc",
+        "fetch_entities": True,
+        "summarize": "summarize_language_requirements_ctdt",
+        "summarize_question": "goc",
+        "empty_message": "Xin lỗi, tôi không tìm thấy thông tin về chuẩn ngoại ngữ đầu ra của chương trình này.",
+        "cache_ttl": 1800,
+    },
+    "hoi_chuan_ngoai_ngu_dau_ra_chung": {
+        "fetch": "get_chuan_ngoai_ngu_dau_ra_chung",
+        "fetch_question": None,
+        "summarize": "summarize_language_requirements",
+        "summarize_question": "transformed",
+        "empty_message": None,
+        "cache_ttl": 3600,
+    },
+    # 🆕 Intent: hỏi mức điểm/chứng chỉ ngoại ngữ (ví dụ: "IELTS bao nhiêu thì tốt nghiệp?")
+    # Gửi toàn bộ dữ liệu raw cho OpenAI để nó:
+    # - nếu câu hỏi có tên CTĐT: ghép đúng CTĐT và trả chi tiết cho CTĐT đó
+    # - nếu câu hỏi chung: tổng hợp mức điểm/chứng chỉ chung
+    "hoi_chuan_ngoai_ngu_muc_diem": {
+        "fetch": "query_language_requirement",
+        "fetch_question": "goc",
+        "summarize": "summarize_language_score_requirement_properties",
+        "summarize_question": "goc",
+        "empty_message": "Mình không tìm thấy thông tin về mức điểm/chứng chỉ ngoại ngữ phù hợp cho câu hỏi này.",
+        "cache_ttl": 1800,
+    },
+    "hoi_khung_nang_luc_ngoai_ngu": {
+        "fetch": "get_khung_nang_luc_ngoai_ngu",
+        "fetch_question": None,
+        "summarize": "summarize_language_framework",
+        "summarize_question": "goc",
+        "empty_message": "Mình không tìm thấy thông tin về khung năng lực ngoại ngữ.",
+        "cache_ttl": 3600,
+        "template": "render_language_framework",
+        "answer_mode": "template",
+    },
+    "hoi_thong_tin_ctdt": {
+        # question gốc để BM25 tìm đúng CTĐT
+        "fetch": "get_course",
+        "fetch_question": "goc",
+        "fetch_entities": True,
+        "summarize": "get_course",
+        "summarize_question": "goc",
+        "empty_message": "Xin lỗi, tôi không tìm thấy thông tin về  chương trình đào tạo này.",
+        "cache_ttl": 1800,
+        # chỉ câu hỏi số tín chỉ, còn lại vẫn gọi LLM
+        "template": "render_course_credits",
+        "answer_mode": "template",
+    },
+    "hoi_danh_sach_ctdt": {
+        # Gửi toàn bộ danh sách sang OpenAI để format/trả lời có logic
+        "fetch": "get_list_course",
+        "fetch_question": None,
+        "summarize": "get_list_course",
+        "summarize_question": "transformed",
+        "empty_message": "Xin lỗi, tôi không tìm thấy danh sách chương trình đào tạo nào.",
+        "cache_ttl": 3600,
+        "template": "render_list_course",
+        "answer_mode": "template",
+    },
+    "hoi_hoc_phan_theo_hoc_ky_ctdt": {
+        "fetch": "get_hoc_phan_theo_hoc_ky_ctdt",
+        "fetch_question": "goc",
+        "fetch_entities": True,
+        "summarize": "get_hoc_phan_theo_hoc_ky_ctdt",
+        "summarize_question": "goc",
+        "empty_message": "Xin lỗi, tôi không tìm thấy học phần cho chương trình đào tạo này.",
+        "cache_ttl": 1800,
+    },
+    # gửi sang OpenAI để suy luận + trả đúng dạng (4): "Nếu trượt X thì không học được môn nào?"
+    "hoi_tien_quyet_hoc_phan_ctdt": {
+        "fetch": "get_tien_quyet",
+        "fetch_question": "goc",
+        "fetch_entities": True,
+        "summarize": "get_tien_quyet",
+        "summarize_question": "goc",
+        "empty_message": (
+            "Mình không tìm thấy quan hệ tiên quyết nào phù hợp với câu hỏi của bạn. "
+            "Có thể tên học phần hoặc chương trình đào tạo chưa chính xác."
+        ),
+        "cache_ttl": 1800,
+    },
+    "hoi_hoc_phan_song_hanh_ctdt": {
+        "fetch": "get_song_hanh",
+        "fetch_question": "goc",
+        "fetch_entities": True,
+        "summarize": "get_song_hanh",
+        "summarize_question": "goc",
+        "empty_message": (
+            "Mình không tìm thấy quan hệ học phần song hành phù hợp với câu hỏi của bạn. "
+            "Có thể tên học phần hoặc chương trình đào tạo chưa chính xác."
+        ),
+        "cache_ttl": 1800,
+    },
+}
+
+ANSWER_MODES = ("llm", "template", "template_polish")
+
+
+def _answer_mode_overrides(value):
+    overrides = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        intent, _, mode = item.partition(":")
+        if mode.strip() not in ANSWER_MODES:
+            print(f"⚠️ ANSWER_MODES: bỏ qua '{item}' (mode phải là {', '.join(ANSWER_MODES)})")
+            continue
+        overrides[intent.strip()] = mode.strip()
+    return overrides
+
+
+ANSWER_MODE_OVERRIDES = _answer_mode_overrides(os.getenv("ANSWER_MODES", ""))
+
+
+def init_handlers():
+    """
+    OpenAIHandler + Neo4jHandler dùng chung cho process, tạo ở lần gọi đầu.
+    Chỉ tạo đối tượng; kết nối Neo4j + nạp cache: neo4j_handler.connect().
+    """
+    global openai_handler, neo4j_handler
+    if neo4j_handler is None:
+        openai_handler = OpenAIHandler()
+        neo4j_handler = Neo4jHandler(openai_handler)
+    return openai_handler, neo4j_handler
 
 
 class ChatbotLogic:
     def __init__(self):
+        openai_handler, neo4j_handler = init_handlers()
         self.neo4j_handle = neo4j_handler
         self.openai_handler =openai_handler
         self.intent_detector = IntentDetector()
-        
+        self.answer_cache = answer_cache
+        self.in_flight = in_flight
+
+    def _pick_question(self, which, question, question_transformed):
+        if which == "goc":
+            return question
+        if which == "transformed":
+            return question_transformed
+        return None
+
+    def _fetch_args(self, pipeline, question, question_transformed):
+        q = self._pick_question(pipeline["fetch_question"], question, question_transformed)
+        return (q,) if q is not None else ()
+
+    def _fetch_kwargs(self, pipeline, understood):
+        if understood is not None and pipeline.get("fetch_entities"):
+            return {"understood": understood}
+        return {}
+
+    def _fetch_data(self, intent, question, question_transformed, understood=None):
+        pipeline = INTENT_PIPELINES.get(intent)
+        if pipeline is None:
+            return self.neo4j_handle.bm25_search(question_transformed)
+
+        fetch = getattr(self.neo4j_handle, pipeline["fetch"])
+        return fetch(
+            *self._fetch_args(pipeline, question, question_transformed),
+            **self._fetch_kwargs(pipeline, understood)
+        )
+
+    def _entity_names(self, entities):
+        return [e["name"] for e in entities]
+
+    def _understand(self, question, question_transformed):
+        """
+        Intent (+ thực thể nếu phải hỏi LLM):
+        - luật / model local → (intent, None), thực thể để Neo4jHandler tự tách
+        - không chắc chắn → 1 lần gọi LLM trả về cả intent lẫn thực thể
+        """
+        intent = self.intent_detector.detect_intent_locally(question_transformed)
+        if intent:
+            return intent, None
+
+        entity_list = self._entity_names(self.neo4j_handle.get_entities())
+        return self.intent_detector.understand(question, entity_list)
+
+    async def _understand_async(self, question, question_transformed):
+        intent = self.intent_detector.detect_intent_locally(question_transformed)
+        if intent:
+            return intent, None
+
+        entity_list = self._entity_names(await self.neo4j_handle.get_entities_async())
+        return await self.intent_detector.understand_async(question, entity_list)
+
+    def _answer_request(self, intent, data, question, question_transformed):
+        """
+        Tạo request LLM (hoặc câu trả lời sẵn) từ dữ liệu Neo4j đã lấy.
+        Dùng chung cho handle_user_query và handle_user_query_async.
+        """
+        pipeline = INTENT_PIPELINES.get(intent)
+
+        if pipeline is None:
+            return self.openai_handler.reason_over_results_request(data, question_transformed)
+
+        if not data and pipeline["empty_message"]:
+            return pipeline["empty_message"]
+
+        q = self._pick_question(pipeline["summarize_question"], question, question_transformed)
+
+        template_request = self._template_request(intent, pipeline, data, q)
+        if template_request is not None:
+            return template_request
+
+        build_request = getattr(self.openai_handler, pipeline["summarize"] + "_request")
+        request = build_request(data=data, question=q)
+        # *_request có thể tự trả lời sẵn (vd câu hỏi tiên quyết dạng liệt kê)
+        ANSWER_MODE_TOTAL.inc(intent=intent, mode="llm" if isinstance(request, dict) else "template")
+        return request
+
+    def _answer_mode(self, intent, pipeline):
+        return ANSWER_MODE_OVERRIDES.get(intent, pipeline.get("answer_mode", "llm"))
+
+    def _template_request(self, intent, pipeline, data, question):
+        """
+        Câu trả lời dựng sẵn (chuỗi) hoặc request LLM chỉ để diễn đạt lại câu trả lời đó.
+        None → intent không dùng template / template không trả lời được câu hỏi này.
+        """
+        mode = self._answer_mode(intent, pipeline)
+        if mode == "llm" or not pipeline.get("template"):
+            return None
+
+        answer = getattr(answer_templates, pipeline["template"])(data, question)
+        if answer is None:
+            return None
+
+        ANSWER_MODE_TOTAL.inc(intent=intent, mode=mode)
+        if mode == "template_polish":
+            return self.openai_handler.polish_answer_request(answer, question)
+        return answer
+
+    def _cache_key(self, intent, entities, question_transformed):
+        return intent, entities, self.intent_detector.normalize_question(question_transformed)
+
+    def _cache_ttl(self, intent):
+        pipeline = INTENT_PIPELINES.get(intent)
+        return pipeline["cache_ttl"] if pipeline else DEFAULT_ANSWER_CACHE_TTL
+
+    def _watch_errors(self, request):
+        """
+        Ghi nhận khi request rơi vào on_error (câu trả lời lỗi) để không đưa vào answer cache.
+        """
+        failed = []
+        if isinstance(request, dict) and request.get("on_error"):
+            on_error = request["on_error"]
+
+            def _on_error(e):
+                failed.append(e)
+                return on_error(e)
+
+            request = {**request, "on_error": _on_error}
+        return request, failed
+
+    def _log_intent(self, intent, question_transformed):
+        # ---- LOG DEBUG để kiểm tra ----
+        print(f"[DEBUG] Intent detected: {intent}")
+        print(f"[DEBUG] Transformed question: {question_transformed}")
+
     def handle_user_query(self, question):
         """
         Phân loại câu hỏi và chọn truy vấn phù hợp.
@@ -21,110 +366,151 @@ class ChatbotLogic:
         2️⃣ BM25 search trên Neo4j
         3️⃣ LLM/NLP reasoning trên kết quả BM25
         """
+        started = time.perf_counter()
+        set_intent(None)
+
         # 1️⃣ Biến đổi câu hỏi nếu cần
-        question_transformed = self.intent_detector.transform_question(question)
-        
-        # 2️⃣ Xác định intent
-        intent = self.intent_detector.detect_intent(question_transformed)
-        
-        # ---- LOG DEBUG để kiểm tra ----
-        print(f"[DEBUG] Intent detected: {intent}")
-        print(f"[DEBUG] Transformed question: {question_transformed}")
+        with stage("transform"):
+            question_transformed = self.intent_detector.transform_question(question)
+
+        # 2️⃣ Xác định intent (+ thực thể nếu phải gọi LLM)
+        with stage("intent"):
+            intent, understood = self._understand(question, question_transformed)
+        set_intent(intent)
+        self._log_intent(intent, question_transformed)
+
+        # Câu hỏi lặp lại → trả lời ngay từ answer cache
+        with stage("entities"):
+            entities = self.neo4j_handle.resolve_entities(question)
+        key = self._cache_key(intent, entities, question_transformed)
+        version = self.neo4j_handle.graph_version
+        answer = self.answer_cache.get(key, version)
+        if answer is not None:
+            print(f"[DEBUG] Answer cache hit: {intent}")
+            observe_request(time.perf_counter() - started, intent, "sync", cached=True)
+            return answer
 
         # ---- 3️⃣ Xử lý theo intent ----
-        if intent == "hoi_dieu_kien_tot_nghiep_chung":
-            data = self.neo4j_handle.get_dieu_kien_tot_nghiep_chung()
-            return self.openai_handler.summarize_graduation_conditions_chung(data, question_transformed)
-        
-        elif intent == "hoi_dieu_kien_tot_nghiep_ctdt":
-            # question gốc để BM25 tìm đúng CTĐT
-            data = self.neo4j_handle.get_dieu_kien_tot_nghiep_ctdt(question)
-            if not data:
-                return "Xin lỗi, tôi không tìm thấy thông tin về điều kiện tốt nghiệp của chương trình này."
-            summarized = self.openai_handler.summarize_graduation_conditions_ctdt(data, question)
-            return summarized
-        
-        elif intent == "chuan_ngoai_ngu_ctdt":
-            # question gốc để BM25 tìm đúng CTĐT
-            data = self.neo4j_handle.get_chuan_ngoai_ngu_dau_ra_cua_ctdt(question)
-            if not data:
-                return "Xin lỗi, tôi không tìm thấy thông tin về chuẩn ngoại ngữ đầu ra của chương trình này."
-            summarized = self.openai_handler.summarize_language_requirements_ctdt(data, question)
-            return summarized
-
-        elif intent == "hoi_chuan_ngoai_ngu_dau_ra_chung":
-            data = self.neo4j_handle.get_chuan_ngoai_ngu_dau_ra_chung()
-            return self.openai_handler.summarize_language_requirements(data, question_transformed)
-        # 🆕 Intent: hỏi mức điểm/chứng chỉ ngoại ngữ (ví dụ: "IELTS bao nhiêu thì tốt nghiệp?")
-        elif intent == "hoi_chuan_ngoai_ngu_muc_diem":
-            # Lấy dữ liệu từ Neo4j (dùng fulltext NgoaiNgu_fulltext)
-            data = self.neo4j_handle.query_language_requirement(question)
-
-            if not data:
-                return "Mình không tìm thấy thông tin về mức điểm/chứng chỉ ngoại ngữ phù hợp cho câu hỏi này."
-
-            # Gửi toàn bộ dữ liệu raw cho OpenAI để nó:
-            # - nếu câu hỏi có tên CTĐT: ghép đúng CTĐT và trả chi tiết cho CTĐT đó
-            # - nếu câu hỏi chung: tổng hợp mức điểm/chứng chỉ chung
-            return self.openai_handler.summarize_language_score_requirement_properties(data, question)
-        elif intent == "hoi_khung_nang_luc_ngoai_ngu":
-            # 1) Lấy dữ liệu từ Neo4j
-            data = self.neo4j_handle.get_khung_nang_luc_ngoai_ngu()
-
-            if not data:
-                return "Mình không tìm thấy thông tin về khung năng lực ngoại ngữ."
-
-            # 2) Gửi cho OpenAI để tóm tắt trả lời
-            return self.openai_handler.summarize_language_framework(data, question)
-        elif intent == "hoi_thong_tin_ctdt":
-            # question gốc để BM25 tìm đúng CTĐT
-            data = self.neo4j_handle.get_course(question)
-            if not data:
-                return "Xin lỗi, tôi không tìm thấy thông tin về  chương trình đào tạo này."
-            return self.openai_handler.get_course(data,question)
-        elif intent == "hoi_danh_sach_ctdt":
-            # Lấy danh sách tất cả CTĐT từ Neo4j
-            data = self.neo4j_handle.get_list_course()
-
-            if not data:
-                return "Xin lỗi, tôi không tìm thấy danh sách chương trình đào tạo nào."
-
-            # Gửi toàn bộ danh sách sang OpenAI để format/trả lời có logic
-            return self.openai_handler.get_list_course(data, question_transformed)
-      
-        elif intent == "hoi_hoc_phan_theo_hoc_ky_ctdt":
-            data = self.neo4j_handle.get_hoc_phan_theo_hoc_ky_ctdt(question)
-
-            if not data:
-                return "Xin lỗi, tôi không tìm thấy học phần cho chương trình đào tạo này."
-
-            return self.openai_handler.get_hoc_phan_theo_hoc_ky_ctdt(question, data)
-
-        
-        elif intent == "hoi_tien_quyet_hoc_phan_ctdt":
-            data = self.neo4j_handle.get_tien_quyet(question)
-
-            if not data:
-                return (
-                    "Mình không tìm thấy quan hệ tiên quyết nào phù hợp với câu hỏi của bạn. "
-                    "Có thể tên học phần hoặc chương trình đào tạo chưa chính xác."
-                )
-
-            # gửi sang OpenAI để suy luận + trả đúng dạng (4): "Nếu trượt X thì không học được môn nào?"
-            return self.openai_handler.get_tien_quyet(question,data)
-
-        elif intent == "hoi_hoc_phan_song_hanh_ctdt":
-                    # 1) Lấy dữ liệu song hành từ Neo4j (neo4j_handle.get_song_hanh)
-                    data = self.neo4j_handle.get_song_hanh(question)
-
-                    # 2) Nếu không có kết quả → trả thông báo rõ ràng
-                    if not data:
-                        return (
-                            "Mình không tìm thấy quan hệ học phần song hành phù hợp với câu hỏi của bạn. "
-                            "Có thể tên học phần hoặc chương trình đào tạo chưa chính xác."
-                        )
-                    return self.openai_handler.get_song_hanh( question,data)
+        with stage("fetch"):
+            data = self._fetch_data(intent, question, question_transformed, understood)
+
+        request, failed = self._watch_errors(self._answer_request(intent, data, question, question_transformed))
+        with stage("llm"):
+            answer = self.openai_handler.complete(request)
+
+        if not failed:
+            self.answer_cache.set(key, answer, self._cache_ttl(intent), version)
+        observe_request(time.perf_counter() - started, intent, "sync", cached=False)
+        return answer
+
+    async def _fetch_data_async(self, intent, question, question_transformed, understood=None):
+        pipeline = INTENT_PIPELINES.get(intent)
+        if pipeline is None:
+            return await self.neo4j_handle.bm25_search_async(question_transformed)
 
+        fetch = getattr(self.neo4j_handle, pipeline["fetch"] + "_async")
+        return await fetch(
+            *self._fetch_args(pipeline, question, question_transformed),
+            **self._fetch_kwargs(pipeline, understood)
+        )
+
+    async def _answer_async(self, flight, intent, understood, question, question_transformed, key, version,
+                            stream=False):
+        """
+        Neo4j + LLM cho 1 câu hỏi trượt answer cache, chạy trong Flight (backend/single_flight.py):
+        các request đồng thời cùng khóa chờ chung kết quả / lỗi thay vì mỗi request tự truy vấn và gọi LLM.
+        stream=True: gọi LLM dạng stream, từng đoạn đẩy vào flight cho mọi request /chat/stream đang chờ.
+        """
+        with stage("fetch"):
+            data = await self._fetch_data_async(intent, question, question_transformed, understood)
+        flight.set_data(bool(data))
+
+        request, failed = self._watch_errors(self._answer_request(intent, data, question, question_transformed))
+        if stream:
+            async for token in self.openai_handler.stream_async(request):
+                flight.publish(token)
+            answer = "".join(flight.tokens)
         else:
-            bm25_results = self.neo4j_handle.bm25_search(question_transformed)
-            return self.openai_handler.reason_over_results(bm25_results, question_transformed)
+            with stage("llm"):
+                answer = await self.openai_handler.complete_async(request)
+            # request stream gộp vào lần tính không stream → nhận cả câu trả lời 1 lần
+            flight.publish(answer)
+
+        if not failed:
+            await self.answer_cache.set_async(key, answer, self._cache_ttl(intent), version)
+        return answer
+
+    async def handle_user_query_async(self, question):
+        """
+        Bản async của handle_user_query: Neo4j (driver async) và OpenAI (client async)
+        không chặn event loop, 1 worker phục vụ được nhiều câu hỏi cùng lúc.
+        """
+        started = time.perf_counter()
+        set_intent(None)
+
+        with stage("transform"):
+            question_transformed = self.intent_detector.transform_question(question)
+
+        with stage("intent"):
+            intent, understood = await self._understand_async(question, question_transformed)
+        set_intent(intent)
+        self._log_intent(intent, question_transformed)
+
+        with stage("entities"):
+            entities = await self.neo4j_handle.resolve_entities_async(question)
+        key = self._cache_key(intent, entities, question_transformed)
+        version = self.neo4j_handle.graph_version
+        answer = await self.answer_cache.get_async(key, version)
+        if answer is not None:
+            print(f"[DEBUG] Answer cache hit: {intent}")
+            observe_request(time.perf_counter() - started, intent, "async", cached=True)
+            return answer
+
+        flight, leader = self.in_flight.join(
+            (key, version),
+            lambda f: self._answer_async(f, intent, understood, question, question_transformed, key, version)
+        )
+        answer = await flight.result()
+        observe_request(time.perf_counter() - started, intent, "async", cached=not leader)
+        return answer
+
+    async def stream_user_query_async(self, question):
+        """
+        Giống handle_user_query_async nhưng trả về từng sự kiện (event, payload):
+        - ("intent", {...}): đã xác định intent
+        - ("data", {...}): đã lấy xong dữ liệu Neo4j
+        - ("token", "..."): từng đoạn câu trả lời do LLM sinh ra
+        """
+        started = time.perf_counter()
+        set_intent(None)
+
+        with stage("transform"):
+            question_transformed = self.intent_detector.transform_question(question)
+
+        with stage("intent"):
+            intent, understood = await self._understand_async(question, question_transformed)
+        set_intent(intent)
+        self._log_intent(intent, question_transformed)
+        yield "intent", {"intent": intent}
+
+        with stage("entities"):
+            entities = await self.neo4j_handle.resolve_entities_async(question)
+        key = self._cache_key(intent, entities, question_transformed)
+        version = self.neo4j_handle.graph_version
+        answer = await self.answer_cache.get_async(key, version)
+        if answer is not None:
+            yield "data", {"intent": intent, "has_data": True, "cached": True}
+            yield "token", answer
+            observe_request(time.perf_counter() - started, intent, "stream", cached=True)
+            return
+
+        flight, leader = self.in_flight.join(
+            (key, version),
+            lambda f: self._answer_async(f, intent, understood, question, question_transformed, key, version, stream=True)
+        )
+        has_data = await flight.data()
+        yield "data", {"intent": intent, "has_data": has_data, "cached": False}
+
+        async for token in flight.stream():
+            yield "token", token
+        observe_request(time.perf_counter() - started, intent, "stream", cached=not leader)
@@ -0,0 +1,638 @@
+# backend/cypher_registry.py
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class CypherRegistry:
+    """
+    Danh mục tập trung mọi câu lệnh Cypher (đều tham số hóa) của Neo4jHandler.
+
+    - Câu lệnh cố định → Neo4j parse/plan 1 lần rồi dùng lại plan từ query cache.
+    - warm_up(): chạy EXPLAIN từng câu lệnh lúc khởi động để plan có sẵn trước
+      request đầu tiên (EXPLAIN chỉ lập plan, không thực thi).
+    - record(): đếm số lần chạy; lần chạy 1 câu lệnh đã được plan (warm hoặc đã chạy)
+      tính là hit. Đây là ước lượng phía client: không thấy plan bị server loại khỏi cache.
+      Câu lệnh không đăng ký (ghép chuỗi) luôn tính là miss.
+    """
+
+    def __init__(self):
+        self._statements = {}
+        self._names = {}
+        self._warm_params = {}
+        self._planned = set()
+
+        self._lock = threading.Lock()
+        self.executions = {}
+        self.hits = {}
+        self.unregistered = 0
+
+    def register(self, name, query, warm_params=None):
+        """
+        Đăng ký câu lệnh; trả về chính chuỗi Cypher để dùng như hằng số.
+        warm_params: giá trị mẫu (đúng kiểu) cho các tham số khi chạy EXPLAIN.
+        """
+        if name in self._statements:
+            raise ValueError(f"Câu lệnh Cypher '{name}' đã được đăng ký")
+        self._statements[name] = query
+        self._names[query] = name
+        self._warm_params[name] = warm_params or {}
+        self.executions[name] = 0
+        self.hits[name] = 0
+        return query
+
+    def get(self, name):
+        return self._statements[name]
+
+    def name_of(self, query):
+        # tên câu lệnh (nhãn metrics); câu lệnh không đăng ký → "unregistered"
+        return self._names.get(query, "unregistered")
+
+    @property
+    def names(self):
+        return list(self._statements)
+
+    # ---------- warm-up ----------
+    def warm_up(self, read):
+        """
+        read: hàm (query, params) → records, vd GraphStore.read.
+        Lỗi 1 câu lệnh chỉ ghi log, không chặn khởi động.
+        """
+        warmed = 0
+        for name, query in self._statements.items():
+            try:
+                read("EXPLAIN " + query, self._warm_params[name])
+            except Exception as e:
+                logger.warning(f"⚠️ Không warm được plan Cypher '{name}': {e}")
+                continue
+            with self._lock:
+                self._planned.add(query)
+            warmed += 1
+
+        logger.info(f"🔥 Warm plan {warmed}/{len(self._statements)} câu lệnh Cypher.")
+        return warmed
+
+    # ---------- thống kê ----------
+    def record(self, query):
+        name = self._names.get(query)
+        with self._lock:
+            if name is None:
+                self.unregistered += 1
+                return
+            self.executions[name] += 1
+            if query in self._planned:
+                self.hits[name] += 1
+            else:
+                self._planned.add(query)
+
+    @staticmethod
+    def _ratio(hits, executions):
+        return round(hits / executions, 4) if executions else None
+
+    def stats(self):
+        with self._lock:
+            executions = sum(self.executions.values())
+            hits = sum(self.hits.values())
+            return {
+                "statements": len(self._statements),
+                "planned": sum(1 for q in self._statements.values() if q in self._planned),
+                "executions": executions,
+                "plan_cache_hits": hits,
+                "plan_cache_hit_ratio": self._ratio(hits, executions + self.unregistered),
+                "unregistered_executions": self.unregistered,
+                "by_statement": {
+                    name: {
+                        "executions": self.executions[name],
+                        "hits": self.hits[name],
+                        "hit_ratio": self._ratio(self.hits[name], self.executions[name]),
+                    }
+                    for name in self._statements
+                },
+            }
+
+
+CYPHER = CypherRegistry()
+
+
+# ==========================
+# Cypher dùng chung cho cả API sync và async
+# ==========================
+CTDT_NAME_QUERY = CYPHER.register("ctdt_name", """
+        CALL db.index.fulltext.queryNodes(
+            'ChuongTrinhDaoTao_full_text',
+            $q
+        ) YIELD node, score
+        RETURN node.ten_chuong_trinh AS ten, score
+        ORDER BY score DESC
+        LIMIT 1
+        """, {"q": "x"})
+
+BM25_SEARCH_QUERY = CYPHER.register("bm25_search", """
+        CALL db.index.fulltext.queryNodes('ChuongTrinhDaoTao_full_text', $query)
+        YIELD node, score
+        RETURN node.ten_chuong_trinh AS ten_chuong_trinh,
+               node.noi_dung AS noi_dung,
+               score
+        ORDER BY score DESC
+        LIMIT $limit
+        """, {"query": "x", "limit": 1})
+
+ENTITY_NAMES_QUERY = CYPHER.register("entity_names", """
+            MATCH (c:HocPhanTienQuyet) RETURN c.ten_mon AS name, 'course' AS kind
+            UNION
+            MATCH (c:HocPhanDaiCuong) RETURN c.ten_mon AS name, 'course' AS kind
+            UNION
+            MATCH (c:HocPhanKeTiep) RETURN c.ten_mon AS name, 'course' AS kind
+            UNION
+            MATCH (c:HocPhanSongHanh) RETURN c.ten_mon AS name, 'course' AS kind
+            UNION
+            MATCH (p:ChuongTrinhDaoTao) RETURN p.ten_chuong_trinh AS name, 'program' AS kind
+            UNION
+            MATCH (s:HocKy) RETURN s.ten_hoc_ky AS name, 'semester' AS kind
+            """)
+
+# Phiên bản đồ thị: node (:GraphMeta {version}) do script nạp dữ liệu cập nhật,
+# kèm số node/quan hệ (đọc từ count store, rất nhẹ) để tự nhận biết khi dữ liệu đổi.
+GRAPH_VERSION_QUERY = CYPHER.register("graph_version", """
+        CALL { MATCH (n) RETURN count(n) AS nodes }
+        CALL { MATCH ()-[r]->() RETURN count(r) AS rels }
+        OPTIONAL MATCH (m:GraphMeta)
+        RETURN max(m.version) AS version, nodes, rels
+        """)
+
+# Duyệt thẳng mọi CTĐT (trước đây full-text '*' chỉ để liệt kê tất cả);
+# kết quả được Neo4jHandler giữ trong bộ nhớ theo phiên bản đồ thị
+DIEU_KIEN_TOT_NGHIEP_CHUNG_QUERY = CYPHER.register("dieu_kien_tot_nghiep_chung", """
+        MATCH (ctdt:ChuongTrinhDaoTao)
+
+        OPTIONAL MATCH (dk:DieuKienTotNghiep)-[r:ĐOI_VOI]->(ctdt)
+
+        OPTIONAL MATCH (ctdt)-[rel:CO_CHUAN_NGOAI_NGU_DAU_RA_LA|CO_CHUAN_NGOAI_NGU_DAU_RA_TOI_THIEU_LA]->(lang)
+        WHERE lang IS NOT NULL
+
+        WITH 
+            ctdt, dk, r,
+            collect({
+                he: rel.he,
+                lang_type: HEAD(labels(lang)),
+                thong_tin_ngoai_ngu: CASE HEAD(labels(lang))
+                    WHEN 'TiengAnh' THEN {
+                        bac: lang.bac,
+                        Cambridge: lang.Cambridge,
+                        chung_chi: lang.chung_chi,
+                        IELTS: lang.IELTS,
+                        TOEFL_iBT: lang.TOEFL_iBT,
+                        TOEFL_ITP: lang.TOEFL_ITP,
+                        TOEIC: lang.TOEIC
+                    }
+                    WHEN 'TiengNhat' THEN {
+                        bac: lang.bac,
+                        chung_chi: lang.chung_chi,
+                        JLPT: lang.JLPT,
+                        NAT_TEST: lang.NAT_TEST,
+                        TOP_J: lang.TOP_J
+                    }
+                    WHEN 'TiengPhap' THEN {
+                        bac: lang.bac,
+                        chung_chi: lang.chung_chi,
+                        DELF_va_DALF: lang.DELF_va_DALF,
+                        TCF: lang.TCF
+                    }
+                    ELSE NULL
+                END
+            }) AS ngoai_ngu_list
+
+        RETURN 
+            ctdt.ten_chuong_trinh AS ten_chuong_trinh,
+            dk.quyet_dinh AS Quyet_dinh,
+            dk.dieu_kien_chung AS dieu_kien_chung,
+            coalesce(r.dieu_kien_rieng, "Không có yêu cầu riêng.") AS dieu_kien_rieng,
+            [x IN ngoai_ngu_list WHERE x.lang_type IS NOT NULL] AS ngoai_ngu_list
+
+        ORDER BY ten_chuong_trinh
+        """)
+
+# 1 round trip: BM25 tìm CTĐT khớp nhất với câu hỏi rồi lấy luôn điều kiện tốt nghiệp
+# + chuẩn ngoại ngữ (trước đây: bm25_search → lấy tên → full-text lần 2 theo tên).
+DIEU_KIEN_TOT_NGHIEP_CTDT_QUERY = CYPHER.register("dieu_kien_tot_nghiep_ctdt", """
+        CALL db.index.fulltext.queryNodes('ChuongTrinhDaoTao_full_text', $query)
+        YIELD node AS ctdt, score
+        WITH ctdt, score
+        ORDER BY score DESC
+        LIMIT 1
+
+        OPTIONAL MATCH (dk:DieuKienTotNghiep)-[r:ĐOI_VOI]->(ctdt)
+
+        OPTIONAL MATCH (ctdt)-[rel:CO_CHUAN_NGOAI_NGU_DAU_RA_LA]->(lang)
+
+        WITH 
+            ctdt, dk, r, score,
+            collect({
+                he: rel.he,
+                lang_type: HEAD(labels(lang)),
+                thong_tin_ngoai_ngu: CASE HEAD(labels(lang))
+                    WHEN 'TiengAnh' THEN {
+                        bac: lang.bac,
+                        Cambridge: lang.Cambridge,
+                        chung_chi: lang.chung_chi,
+                        IELTS: lang.IELTS,
+                        TOEFL_iBT: lang.TOEFL_iBT,
+                        TOEFL_ITP: lang.TOEFL_ITP,
+                        TOEIC: lang.TOEIC
+                    }
+                    WHEN 'TiengNhat' THEN {
+                        bac: lang.bac,
+                        chung_chi: lang.chung_chi,
+                        JLPT: lang.JLPT,
+                        NAT_TEST: lang.NAT_TEST,
+                        TOP_J: lang.TOP_J
+                    }
+                    WHEN 'TiengPhap' THEN {
+                        bac: lang.bac,
+                        chung_chi: lang.chung_chi,
+                        DELF_va_DALF: lang.DELF_va_DALF,
+                        TCF: lang.TCF
+                    }
+                    ELSE null
+                END
+            }) AS ngoai_ngu_list
+
+        RETURN 
+            ctdt.ten_chuong_trinh AS ten_chuong_trinh,
+            dk.quyet_dinh AS quyet_dinh,
+            dk.dieu_kien_chung AS dieu_kien_chung,
+            coalesce(r.dieu_kien_rieng, "Không có yêu cầu riêng.") AS dieu_kien_rieng,
+
+            [x IN ngoai_ngu_list WHERE x.he = "Cử nhân"] AS chuan_ngoai_ngu_cu_nhan,
+
+            [x IN ngoai_ngu_list WHERE x.he = "Kỹ sư"] AS chuan_ngoai_ngu_ky_su,
+
+            score
+        ORDER BY score DESC
+        LIMIT 1;
+        """, {"query": "x"})
+
+CHUAN_NGOAI_NGU_DAU_RA_CHUNG_QUERY = CYPHER.register("chuan_ngoai_ngu_dau_ra_chung", """
+        MATCH (ctdt:ChuongTrinhDaoTao)
+
+        OPTIONAL MATCH (ctdt)-[rel:CO_CHUAN_NGOAI_NGU_DAU_RA_LA|CO_CHUAN_NGOAI_NGU_DAU_RA_TOI_THIEU_LA]->(lang)
+        WHERE lang IS NOT NULL
+
+        WITH 
+            ctdt,
+            collect({
+                he: rel.he,
+                lang_type: HEAD(labels(lang)),
+                thong_tin_ngoai_ngu: CASE HEAD(labels(lang))
+                    WHEN 'TiengAnh' THEN {
+                        bac: lang.bac,
+                        Cambridge: lang.Cambridge,
+                        chung_chi: lang.chung_chi,
+                        IELTS: lang.IELTS,
+                        TOEFL_iBT: lang.TOEFL_iBT,
+                        TOEFL_ITP: lang.TOEFL_ITP,
+                        TOEIC: lang.TOEIC
+                    }
+                    WHEN 'TiengNhat' THEN {
+                        bac: lang.bac,
+                        chung_chi: lang.chung_chi,
+                        JLPT: lang.JLPT,
+                        NAT_TEST: lang.NAT_TEST,
+                        TOP_J: lang.TOP_J
+                    }
+                    WHEN 'TiengPhap' THEN {
+                        bac: lang.bac,
+                        chung_chi: lang.chung_chi,
+                        DELF_va_DALF: lang.DELF_va_DALF,
+                        TCF: lang.TCF
+                    }
+                    ELSE NULL
+                END
+            }) AS ngoai_ngu_list
+
+        RETURN 
+            ctdt.ten_chuong_trinh AS ten_chuong_trinh,
+
+            [x IN ngoai_ngu_list 
+                WHERE x.lang_type IS NOT NULL AND x.he = "Cử nhân"] 
+                AS chuan_ngoai_ngu_cu_nhan,
+
+            [x IN ngoai_ngu_list 
+                WHERE x.lang_type IS NOT NULL AND x.he = "Kỹ sư"] 
+                AS chuan_ngoai_ngu_ky_su
+
+        ORDER BY ten_chuong_trinh;
+        """)
+
+# Tham số hóa $program_name (trước đây ghép chuỗi f-string → mỗi tên CTĐT 1 câu lệnh mới,
+# không dùng lại được plan, tên có dấu nháy làm hỏng truy vấn)
+CHUAN_NGOAI_NGU_CTDT_QUERY = CYPHER.register("chuan_ngoai_ngu_ctdt", """
+        CALL db.index.fulltext.queryNodes('ChuongTrinhDaoTao_full_text', $program_name)
+        YIELD node AS ctdt, score
+        WHERE toLower(ctdt.ten_chuong_trinh) CONTAINS toLower($program_name)
+
+        OPTIONAL MATCH (ctdt)-[rel:CO_CHUAN_NGOAI_NGU_DAU_RA_LA|CO_CHUAN_NGOAI_NGU_DAU_RA_TOI_THIEU_LA]->(lang)
+
+        WITH 
+            ctdt, score,
+            collect({
+                he: rel.he,
+                lang_type: HEAD(labels(lang)),
+                thong_tin_ngoai_ngu: CASE HEAD(labels(lang))
+                    WHEN 'TiengAnh' THEN {
+                        bac: lang.bac,
+                        Cambridge: lang.Cambridge,
+                        chung_chi: lang.chung_chi,
+                        IELTS: lang.IELTS,
+                        TOEFL_iBT: lang.TOEFL_iBT,
+                        TOEFL_ITP: lang.TOEFL_ITP,
+                        TOEIC: lang.TOEIC
+                    }
+                    WHEN 'TiengNhat' THEN {
+                        bac: lang.bac,
+                        chung_chi: lang.chung_chi,
+                        JLPT: lang.JLPT,
+                        NAT_TEST: lang.NAT_TEST,
+                        TOP_J: lang.TOP_J
+                    }
+                    WHEN 'TiengPhap' THEN {
+                        bac: lang.bac,
+                        chung_chi: lang.chung_chi,
+                        DELF_va_DALF: lang.DELF_va_DALF,
+                        TCF: lang.TCF
+                    }
+                    ELSE NULL
+                END
+            }) AS ngoai_ngu_list
+
+        RETURN
+            ctdt.ten_chuong_trinh AS ten_chuong_trinh,
+
+            [x IN ngoai_ngu_list 
+                WHERE x.he = "Cử nhân" AND x.lang_type IS NOT NULL] 
+                AS chuan_ngoai_ngu_cu_nhan,
+
+            [x IN ngoai_ngu_list 
+                WHERE x.he = "Kỹ sư" AND x.lang_type IS NOT NULL] 
+                AS chuan_ngoai_ngu_ky_su,
+
+            score
+        ORDER BY score DESC
+        LIMIT 1
+        """, {"program_name": "x"})
+
+LANGUAGE_REQUIREMENT_QUERY = CYPHER.register("language_requirement", """
+        CALL db.index.fulltext.queryNodes('NgoaiNgu_fulltext', $query)
+        YIELD node AS lang, score
+
+        OPTIONAL MATCH (ctdt:ChuongTrinhDaoTao)
+            -[rel:CO_CHUAN_NGOAI_NGU_DAU_RA_LA|CO_CHUAN_NGOAI_NGU_DAU_RA_TOI_THIEU_LA]->(lang)
+
+        WITH lang, ctdt, rel, score,
+            HEAD(labels(lang)) AS lang_type,
+            ctdt.ten_chuong_trinh AS thuoc_chuong_trinh,
+            rel.he AS he
+        WHERE thuoc_chuong_trinh IS NOT NULL
+
+        WITH thuoc_chuong_trinh, he, score, lang_type, COLLECT(lang) AS langs
+
+        WITH thuoc_chuong_trinh, he, score, lang_type,
+            CASE lang_type
+                WHEN 'TiengAnh' THEN {
+                    bac: [l IN langs | l.bac],
+                    Cambridge: [l IN langs | l.Cambridge],
+                    chung_chi: [l IN langs | l.chung_chi],
+                    IELTS: [l IN langs | l.IELTS],
+                    TOEFL_iBT: [l IN langs | l.TOEFL_iBT],
+                    TOEFL_ITP: [l IN langs | l.TOEFL_ITP],
+                    TOEIC: [l IN langs | l.TOEIC]
+                }
+                WHEN 'TiengNhat' THEN {
+                    bac: [l IN langs | l.bac],
+                    chung_chi: [l IN langs | l.chung_chi],
+                    JLPT: [l IN langs | l.JLPT],
+                    NAT_TEST: [l IN langs | l.NAT_TEST],
+                    TOP_J: [l IN langs | l.TOP_J]
+                }
+                WHEN 'TiengPhap' THEN {
+                    bac: [l IN langs | l.bac],
+                    chung_chi: [l IN langs | l.chung_chi],
+                    DELF_va_DALF: [l IN langs | l.DELF_va_DALF],
+                    TCF: [l IN langs | l.TCF]
+                }
+                ELSE NULL
+            END AS thong_tin
+
+        RETURN 
+            thuoc_chuong_trinh,
+            he,
+            score,
+            lang_type,
+            thong_tin
+        ORDER BY score DESC;
+
+        """, {"query": "x"})
+
+KHUNG_NANG_LUC_NGOAI_NGU_QUERY = CYPHER.register("khung_nang_luc_ngoai_ngu", """
+        CALL db.index.fulltext.queryNodes("ft_khung_nang_luc", "khung năng lực ngoại ngữ")
+        YIELD node AS khung, score
+        OPTIONAL MATCH (khung)-[:BAO_GOM]->(lang)
+        WITH khung, score, collect(lang) AS langs
+
+        UNWIND langs AS l
+        WITH khung, score, HEAD(labels(l)) AS lang_type, l
+        WITH khung, score, lang_type, collect(l) AS group_langs
+
+        WITH khung, score, collect(
+        CASE lang_type
+            WHEN 'TiengAnh' THEN {
+            lang_type: lang_type,
+            thong_tin: {
+                bac: [x IN group_langs | x.bac],
+                Cambridge: [x IN group_langs | x.Cambridge],
+                chung_chi: [x IN group_langs | x.chung_chi],
+                IELTS: [x IN group_langs | x.IELTS],
+                TOEFL_iBT: [x IN group_langs | x.TOEFL_iBT],
+                TOEFL_ITP: [x IN group_langs | x.TOEFL_ITP],
+                TOEIC: [x IN group_langs | x.TOEIC]
+            }
+            }
+            WHEN 'TiengNhat' THEN {
+            lang_type: lang_type,
+            thong_tin: {
+                bac: [x IN group_langs | x.bac],
+                chung_chi: [x IN group_langs | x.chung_chi],
+                JLPT: [x IN group_langs | x.JLPT],
+                NAT_TEST: [x IN group_langs | x.NAT_TEST],
+                TOP_J: [x IN group_langs | x.TOP_J]
+            }
+            }
+            WHEN 'TiengPhap' THEN {
+            lang_type: lang_type,
+            thong_tin: {
+                bac: [x IN group_langs | x.bac],
+                chung_chi: [x IN group_langs | x.chung_chi],
+                DELF_va_DALF: [x IN group_langs | x.DELF_va_DALF],
+                TCF: [x IN group_langs | x.TCF]
+            }
+            }
+            WHEN 'TiengTrung' THEN {
+            lang_type: lang_type,
+            thong_tin: {
+                bac: [x IN group_langs | x.bac],
+                chung_chi: [x IN group_langs | x.chung_chi],
+                HSK: [x IN group_langs | x.HSK],
+                TOCFL: [x IN group_langs | x.TOCFL]
+            }
+            }
+            ELSE {
+            lang_type: lang_type,
+            thong_tin: {
+                bac: [x IN group_langs | x.bac],
+                chung_chi: [x IN group_langs | x.chung_chi]
+            }
+            }
+        END
+        ) AS cac_ngon_ngu
+
+        RETURN {
+        khung: {khai_niem: khung.khai_niem},
+        cac_ngon_ngu: [nn IN cac_ngon_ngu WHERE nn IS NOT NULL],
+        score: score
+        } AS info
+        ORDER BY score DESC;
+        """)
+
+COURSE_QUERY = CYPHER.register("course", """
+        MATCH (hp)-[r:THUOC]->(ctdt:ChuongTrinhDaoTao {ten_chuong_trinh: $program_name})
+        OPTIONAL MATCH (ctdt)-[:THUOC]->(k:Khoa)
+
+        WITH
+            ctdt,
+            k,
+            CASE
+                WHEN r.he = 'Kỹ sư' THEN 'Kỹ sư'
+                ELSE 'Cử nhân'
+            END AS he,
+            hp,
+            r
+
+        WITH
+            ctdt,
+            k,
+            he,
+            COLLECT({
+                loai: labels(hp)[0],
+                ten: hp.ten_mon,
+                ma_hoc_phan: hp.ma_hoc_phan,
+                he: r.he,
+                so_tin_chi: hp.so_tin_chi
+            }) AS danh_sach_hoc_phan
+
+        RETURN
+            ctdt.ten_chuong_trinh AS ten_chuong_trinh,
+
+            k.ten_khoa AS ten_khoa,
+            ctdt.khoa AS khoa,
+            ctdt.noi_dung AS noi_dung,
+
+            ctdt.tong_so_tin_chi_yeu_cau_doi_voi_ky_su AS tong_so_tin_chi_yeu_cau_doi_voi_ky_su,
+            ctdt.so_tin_chi_bat_buoc_doi_voi_ky_su AS so_tin_chi_bat_buoc_doi_voi_ky_su,
+            ctdt.so_tin_chi_tu_chon_doi_voi_ky_su AS so_tin_chi_tu_chon_doi_voi_ky_su,
+
+            ctdt.tong_so_tin_chi_yeu_cau_doi_voi_cu_nhan AS tong_so_tin_chi_yeu_cau_doi_voi_cu_nhan,
+            ctdt.so_tin_chi_bat_buoc_doi_voi_cu_nhan AS so_tin_chi_bat_buoc_doi_voi_cu_nhan,
+            ctdt.so_tin_chi_tu_chon_doi_voi_cu_nhan AS so_tin_chi_tu_chon_doi_voi_cu_nhan,
+
+            he,
+            size(danh_sach_hoc_phan) AS tong_so_hoc_phan,
+            danh_sach_hoc_phan
+
+        ORDER BY he
+        """, {"program_name": "x"})
+
+HOC_PHAN_THEO_HOC_KY_QUERY = CYPHER.register("hoc_phan_theo_hoc_ky", """
+        MATCH (c:ChuongTrinhDaoTao {ten_chuong_trinh: $program_name})
+        <-[:THUOC]-(hp)
+        -[:SE_HOC_TRONG]->(hk:HocKy)
+        WHERE
+            hp:HocPhanDaiCuong
+        OR hp:HocPhanTienQuyet
+        OR hp:HocPhanSongHanh
+        OR hp:HocPhanKeTiep
+        OR hp:HocPhanTuDo
+        RETURN DISTINCT
+            hp.ten_mon AS ten_mon,
+            hp.ma_hoc_phan AS ma_hoc_phan,
+            hp.so_tin_chi AS so_tin_chi,
+            hk.ten_hoc_ky AS ten_hoc_ky,
+            c.ten_chuong_trinh AS ten_chuong_trinh
+        ORDER BY hk.ten_hoc_ky, hp.ten_mon
+        """, {"program_name": "x"})
+
+LIST_COURSE_QUERY = CYPHER.register("list_course", """
+            MATCH (ct:ChuongTrinhDaoTao)
+            RETURN 
+                ct.ten_chuong_trinh AS ten_chuong_trinh,
+                ct.khoa AS Khoa,
+                ct.ma_chuong_trinh AS ma_chuong_trinh,
+                ct.tong_so_tin_chi_yeu_cau_doi_voi_ky_su AS tong_so_tin_chi_yeu_cau_doi_voi_ky_su,
+                ct.so_tin_chi_bat_buoc_doi_voi_ky_su AS so_tin_chi_bat_buoc_doi_voi_ky_su,
+                ct.so_tin_chi_tu_chon_doi_voi_ky_su AS so_tin_chi_tu_chon_doi_voi_ky_su,
+                ct.tong_so_tin_chi_yeu_cau_doi_voi_cu_nhan AS tong_so_tin_chi_yeu_cau_doi_voi_cu_nhan,
+                ct.so_tin_chi_bat_buoc_doi_voi_cu_nhan AS so_tin_chi_bat_buoc_doi_voi_cu_nhan,
+                ct.so_tin_chi_tu_chon_doi_voi_cu_nhan AS so_tin_chi_tu_chon_doi_voi_cu_nhan
+        """)
+
+TIEN_QUYET_QUERY = CYPHER.register("tien_quyet", """
+        MATCH (c:ChuongTrinhDaoTao {ten_chuong_trinh: $program_name})
+        <-[:THUOC]-(tq)
+        -[:LA_HOC_PHAN_TIEN_QUYET_CUA]->(hp)-[:THUOC]->(c)
+        WHERE
+            tq:HocPhanDaiCuong
+            OR tq:HocPhanTienQuyet
+            OR tq:HocPhanSongHanh
+            OR tq:HocPhanKeTiep
+            OR tq:HocPhanTuDo
+        RETURN DISTINCT
+            c.ten_chuong_trinh AS ten_chuong_trinh,
+            tq.ten_mon AS ten_hoc_phan_tien_quyet,
+            labels(tq) AS labels_tq,
+            tq.ma_hoc_phan AS ma_hoc_phan_tien_quyet,
+            tq.so_tin_chi AS so_tin_chi_tien_quyet,
+            hp.ten_mon AS ten_hoc_phan_bi_tien_quyet,
+            hp.ma_hoc_phan AS ma_hoc_phan_bi_tien_quyet,
+            labels(hp) AS labels_hp
+        ORDER BY tq.ten_mon, hp.ten_mon
+        """, {"program_name": "x"})
+
+# Tên mọi học phần thuộc CTĐT (kể cả học phần không có quan hệ tiên quyết nào,
+# vốn không xuất hiện trong TIEN_QUYET_QUERY) → kiểm tra học phần có trong CTĐT hay không
+HOC_PHAN_CTDT_QUERY = CYPHER.register("hoc_phan_ctdt", """
+        MATCH (c:ChuongTrinhDaoTao {ten_chuong_trinh: $program_name})<-[:THUOC]-(hp)
+        WHERE hp.ten_mon IS NOT NULL
+        RETURN DISTINCT hp.ten_mon AS ten_mon
+        """, {"program_name": "x"})
+
+SONG_HANH_QUERY = CYPHER.register("song_hanh", """
+        MATCH (c:ChuongTrinhDaoTao {ten_chuong_trinh: $program_name})
+            <-[:THUOC]-(hp1)-[:LA_HOC_PHAN_SONG_HANH_VOI]->(hp2)-[:THUOC]->(c)
+
+        OPTIONAL MATCH (c)<-[:THUOC]-(tq1)-[:LA_HOC_PHAN_TIEN_QUYET_CUA]->(hp1)
+        OPTIONAL MATCH (c)<-[:THUOC]-(tq2)-[:LA_HOC_PHAN_TIEN_QUYET_CUA]->(hp2)
+
+        RETURN
+            c.ten_chuong_trinh AS ten_chuong_trinh,
+            hp1.ten_mon AS hoc_phan_1,
+            labels(hp1) AS labels_hp1,
+            hp1.ma_hoc_phan AS ma_hoc_hoc_phan_1,
+            hp1.so_tin_chi AS so_tin_chi_hoc_phan_1,
+            hp2.ten_mon AS hoc_phan_2,
+            labels(hp2) AS labels_hp2,
+            hp2.ma_hoc_phan AS ma_hoc_hoc_phan_2,
+            hp2.so_tin_chi AS so_tin_chi_hoc_phan_2,
+            collect(DISTINCT tq1.ten_mon) AS tien_quyet_hp1,
+            collect(DISTINCT tq2.ten_mon) AS tien_quyet_hp2
+        ORDER BY hoc_phan_1, hoc_phan_2
+        """, {"program_name": "x"})
@@ -0,0 +1,134 @@
+# backend/entity_cache.py
+import asyncio
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class EntityCache:
+    """
+    Bộ nhớ đệm trong process cho danh sách thực thể của đồ thị
+    (tên CTĐT, tên học phần, tên học kỳ).
+
+    - Nạp 1 lần lúc khởi động (warm), sau đó dùng lại cho mọi request.
+    - Làm mới khi quá TTL hoặc khi phiên bản đồ thị thay đổi
+      (phiên bản chỉ được kiểm tra tối đa 1 lần mỗi version_check_seconds).
+    - Đếm hits / misses / refreshes để theo dõi hiệu quả.
+    """
+
+    def __init__(self, ttl_seconds=600, version_check_seconds=30):
+        self.ttl_seconds = ttl_seconds
+        self.version_check_seconds = version_check_seconds
+
+        self._entities = None
+        self._version = None
+        self._loaded_at = 0.0
+        self._version_checked_at = 0.0
+
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+
+        self._lock = threading.Lock()
+        self._async_lock = None
+
+    # ---------- trạng thái ----------
+    def _is_fresh(self, now):
+        return self._entities is not None and now - self._loaded_at < self.ttl_seconds
+
+    def _should_check_version(self, now):
+        return now - self._version_checked_at >= self.version_check_seconds
+
+    def _store(self, entities, version, now):
+        if self._entities is not None:
+            self.refreshes += 1
+            logger.info(f"🔄 Làm mới entity cache (version {self._version} → {version}).")
+        self._entities = entities
+        self._version = version
+        self._loaded_at = now
+        self._version_checked_at = now
+
+    def invalidate(self):
+        self._entities = None
+
+    @property
+    def version(self):
+        return self._version
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "size": len(self._entities) if self._entities is not None else 0,
+            "version": self._version,
+            "age_seconds": round(time.monotonic() - self._loaded_at, 1) if self._entities is not None else None,
+        }
+
+    # ---------- sync ----------
+    def get(self, load_entities, load_version=None):
+        """
+        - load_entities(): truy vấn Neo4j lấy danh sách thực thể
+        - load_version(): truy vấn phiên bản đồ thị (None → chỉ dùng TTL)
+        """
+        now = time.monotonic()
+        version = None
+
+        if self._is_fresh(now):
+            if load_version is None or not self._should_check_version(now):
+                self.hits += 1
+                return self._entities
+
+            self._version_checked_at = now
+            version = load_version()
+            if version == self._version:
+                self.hits += 1
+                return self._entities
+
+        with self._lock:
+            # thread khác có thể đã nạp xong trong lúc chờ lock
+            if self._is_fresh(time.monotonic()) and self._loaded_at >= now:
+                self.hits += 1
+                return self._entities
+
+            self.misses += 1
+            if version is None and load_version:
+                version = load_version()
+            entities = load_entities()
+            self._store(entities, version, time.monotonic())
+            return entities
+
+    # ---------- async ----------
+    async def get_async(self, load_entities, load_version=None):
+        now = time.monotonic()
+        version = None
+
+        if self._is_fresh(now):
+            if load_version is None or not self._should_check_version(now):
+                self.hits += 1
+                return self._entities
+
+            self._version_checked_at = now
+            version = await load_version()
+            if version == self._version:
+                self.hits += 1
+                return self._entities
+
+        if self._async_lock is None:
+            self._async_lock = asyncio.Lock()
+
+        async with self._async_lock:
+            if self._is_fresh(time.monotonic()) and self._loaded_at >= now:
+                self.hits += 1
+                return self._entities
+
+            self.misses += 1
+            if version is None and load_version:
+                version = await load_version()
+            entities = await load_entities()
+            self._store(entities, version, time.monotonic())
+            return entities
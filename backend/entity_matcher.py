@@ -0,0 +1,147 @@
+# backend/entity_matcher.py
+import re
+import unicodedata
+from collections import deque, namedtuple
+
+
+# Stopwords dùng khi làm sạch câu hỏi tìm tên CTĐT (xem Neo4jHandler.extract_ctdt_name)
+CTDT_STOPWORDS = [
+    "chương trình", "ctdt", "ctđt", "ngành",
+    "là gì", "giới thiệu", "thuộc khoa nào",
+    "học gì", "gồm những gì", "bao gồm",
+    "nội dung", "cho mình hỏi", "tư vấn"
+]
+
+# Loại thực thể (cột kind của ENTITY_NAMES_QUERY)
+PROGRAM = "program"
+COURSE = "course"
+SEMESTER = "semester"
+
+EntityMatch = namedtuple("EntityMatch", ["program_name", "course_name", "semester_name", "ambiguous"])
+
+_NON_WORD = re.compile(r"[^0-9a-z]+")
+
+
+def fold_vietnamese(text: str) -> str:
+    """
+    Chuẩn hóa tiếng Việt để so khớp: chữ thường, bỏ dấu, đ → d,
+    mọi ký tự không phải chữ/số thành 1 khoảng trắng.
+    """
+    text = unicodedata.normalize("NFD", text.lower())
+    text = "".join(ch for ch in text if unicodedata.category(ch) != "Mn")
+    text = text.replace("đ", "d")
+    return _NON_WORD.sub(" ", text).strip()
+
+
+_FOLDED_STOPWORDS = sorted({fold_vietnamese(sw) for sw in CTDT_STOPWORDS}, key=len, reverse=True)
+
+
+def normalize_tokens(text: str):
+    """
+    fold_vietnamese + bỏ stopwords → danh sách token.
+    """
+    padded = f" {fold_vietnamese(text)} "
+    for sw in _FOLDED_STOPWORDS:
+        while f" {sw} " in padded:
+            padded = padded.replace(f" {sw} ", " ")
+    return padded.split()
+
+
+class EntityMatcher:
+    """
+    So khớp tên thực thể (CTĐT / học phần / học kỳ) trong câu hỏi bằng
+    automaton Aho-Corasick trên chuỗi token đã chuẩn hóa.
+
+    - Xây 1 lần cho mỗi danh sách thực thể (Neo4jHandler giữ cùng entity cache).
+    - extract() chạy 1 lượt qua câu hỏi, chọn các match dài nhất không chồng nhau.
+    - ambiguous=True khi cùng 1 loại có nhiều tên khác nhau → để LLM quyết định.
+    """
+
+    def __init__(self, entities):
+        # mỗi state: dict token → state con; fail link; danh sách (độ dài, tên, loại)
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+
+        for e in entities:
+            name, kind = e["name"], e["kind"]
+            tokens = normalize_tokens(name)
+            if not name or not tokens:
+                continue
+            self._add(tokens, name, kind)
+
+        self._build_fail_links()
+
+    def _add(self, tokens, name, kind):
+        state = 0
+        for tok in tokens:
+            nxt = self._goto[state].get(tok)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+                self._goto[state][tok] = nxt
+            state = nxt
+        self._out[state].append((len(tokens), name, kind))
+
+    def _build_fail_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for tok, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and tok not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(tok, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find_all(self, question: str):
+        """
+        Trả về mọi match dạng (start, end, tên, loại) theo vị trí token.
+        """
+        matches = []
+        state = 0
+        for i, tok in enumerate(normalize_tokens(question)):
+            while state and tok not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(tok, 0)
+            for length, name, kind in self._out[state]:
+                matches.append((i - length + 1, i + 1, name, kind))
+        return matches
+
+    def extract(self, question: str) -> EntityMatch:
+        # ưu tiên match dài nhất, sau đó match bên trái
+        matches = sorted(self.find_all(question), key=lambda m: (-(m[1] - m[0]), m[0]))
+
+        taken = set()
+        found = {PROGRAM: set(), COURSE: set(), SEMESTER: set()}
+        names_by_span = {}
+
+        for start, end, name, kind in matches:
+            span = range(start, end)
+            if (start, end) in names_by_span:
+                # cùng 1 đoạn văn bản khớp nhiều thực thể (vd: tên vừa là CTĐT vừa là học phần)
+                names_by_span[(start, end)].append((name, kind))
+                continue
+            if any(i in taken for i in span):
+                continue
+            taken.update(span)
+            names_by_span[(start, end)] = [(name, kind)]
+
+        for candidates in names_by_span.values():
+            kinds = {kind for _, kind in candidates}
+            # Tên đã là CTĐT thì không gán vào học phần
+            for kind in (PROGRAM, SEMESTER, COURSE):
+                if kind in kinds:
+                    found[kind].update(name for name, k in candidates if k == kind)
+                    break
+
+        ambiguous = any(len(names) > 1 for names in found.values())
+
+        def pick(kind):
+            names = found[kind]
+            return next(iter(names)) if len(names) == 1 else None
+
+        return EntityMatch(pick(PROGRAM), pick(COURSE), pick(SEMESTER), ambiguous)
@@ -0,0 +1,165 @@
+# backend/graph_store.py
+import logging
+import os
+import threading
+import time
+
+from neo4j import GraphDatabase, AsyncGraphDatabase
+
+logger = logging.getLogger(__name__)
+
+
+def _env_int(name, default):
+    return int(os.getenv(name, str(default)))
+
+
+def _env_float(name, default):
+    return float(os.getenv(name, str(default)))
+
+
+class GraphStore:
+    """
+    Lớp truy cập Neo4j dùng chung cho Neo4jHandler.
+
+    - 1 driver sync + 1 driver async (tạo lười), pool cấu hình qua biến môi trường:
+      NEO4J_DATABASE, NEO4J_MAX_POOL_SIZE, NEO4J_MAX_CONNECTION_LIFETIME,
+      NEO4J_CONNECTION_ACQUISITION_TIMEOUT, NEO4J_FETCH_SIZE, NEO4J_MAX_RETRY_TIME.
+    - Mọi truy vấn đọc chạy trong managed transaction (execute_read):
+      driver tự retry lỗi tạm thời (AuraDB ngắt kết nối, leader đổi...) thay vì trả 500.
+    - Ghi nhận số phiên đang dùng, thời gian chờ lấy kết nối, số lần retry (xem stats()).
+      Driver không có API công khai cho trạng thái pool (kết nối rảnh / đang mở) → chỉ báo số liệu
+      tự đếm quanh session + cấu hình pool, không đọc thuộc tính nội bộ của driver.
+    """
+
+    def __init__(self, uri, auth):
+        self.uri = uri
+        self.auth = auth
+
+        self.database = os.getenv("NEO4J_DATABASE", "neo4j")
+        self.fetch_size = _env_int("NEO4J_FETCH_SIZE", 1000)
+        self.driver_config = {
+            "max_connection_pool_size": _env_int("NEO4J_MAX_POOL_SIZE", 50),
+            # AuraDB đóng kết nối rảnh sau ~1 giờ → làm mới sớm hơn
+            "max_connection_lifetime": _env_int("NEO4J_MAX_CONNECTION_LIFETIME", 1800),
+            "connection_acquisition_timeout": _env_float("NEO4J_CONNECTION_ACQUISITION_TIMEOUT", 30),
+            "max_transaction_retry_time": _env_float("NEO4J_MAX_RETRY_TIME", 15),
+            "liveness_check_timeout": _env_float("NEO4J_LIVENESS_CHECK_TIMEOUT", 60),
+        }
+
+        self.driver = GraphDatabase.driver(uri, auth=auth, **self.driver_config)
+        self._async_driver = None
+
+        self._lock = threading.Lock()
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.queries = 0
+        self.acquired = 0
+        self.retries = 0
+        self.failures = 0
+        self.acquire_wait_total = 0.0
+        self.acquire_wait_max = 0.0
+
+    @property
+    def async_driver(self):
+        # cần event loop đang chạy → tạo ở lần dùng đầu tiên
+        if self._async_driver is None:
+            self._async_driver = AsyncGraphDatabase.driver(self.uri, auth=self.auth, **self.driver_config)
+        return self._async_driver
+
+    def verify_connectivity(self):
+        self.driver.verify_connectivity()
+
+    def _session_config(self):
+        return {"database": self.database, "fetch_size": self.fetch_size}
+
+    # ---------- thống kê ----------
+    def _checkout(self):
+        with self._lock:
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+            self.queries += 1
+        return time.perf_counter()
+
+    def _checkin(self, failed=False):
+        with self._lock:
+            self.in_use -= 1
+            if failed:
+                self.failures += 1
+
+    def _record_attempt(self, started, attempt):
+        # lần gọi đầu của transaction function = đã lấy được kết nối + BEGIN xong
+        if attempt == 1:
+            waited = time.perf_counter() - started
+            with self._lock:
+                self.acquired += 1
+                self.acquire_wait_total += waited
+                self.acquire_wait_max = max(self.acquire_wait_max, waited)
+        else:
+            with self._lock:
+                self.retries += 1
+
+    def stats(self):
+        with self._lock:
+            acquired = self.acquired
+            return {
+                "database": self.database,
+                "max_pool_size": self.driver_config["max_connection_pool_size"],
+                "in_use": self.in_use,
+                "peak_in_use": self.peak_in_use,
+                "queries": self.queries,
+                "retries": self.retries,
+                "failures": self.failures,
+                "acquire_wait_avg_ms": round(self.acquire_wait_total / acquired * 1000, 2) if acquired else 0.0,
+                "acquire_wait_max_ms": round(self.acquire_wait_max * 1000, 2),
+            }
+
+    # ---------- truy vấn đọc ----------
+    def read(self, query, params=None):
+        started = self._checkout()
+        attempts = 0
+
+        def work(tx):
+            nonlocal attempts
+            attempts += 1
+            self._record_attempt(started, attempts)
+            return tx.run(query, params or {}).data()
+
+        try:
+            with self.driver.session(**self._session_config()) as session:
+                records = session.execute_read(work)
+        except Exception:
+            self._checkin(failed=True)
+            raise
+
+        self._checkin()
+        return records
+
+    async def read_async(self, query, params=None):
+        started = self._checkout()
+        attempts = 0
+
+        async def work(tx):
+            nonlocal attempts
+            attempts += 1
+            self._record_attempt(started, attempts)
+            result = await tx.run(query, params or {})
+            return await result.data()
+
+        try:
+            async with self.async_driver.session(**self._session_config()) as session:
+                records = await session.execute_read(work)
+        except Exception:
+            self._checkin(failed=True)
+            raise
+
+        self._checkin()
+        return records
+
+    # ---------- đóng ----------
+    def close(self):
+        self.driver.close()
+
+    async def close_async(self):
+        if self._async_driver is not None:
+            await self._async_driver.close()
+            self._async_driver = None
@@ -0,0 +1,292 @@
+# backend/intent_classifier.py
+"""
+Bộ phân loại intent chạy local (Naive Bayes trên n-gram ký tự), thay cho GPT fallback.
+
+Huấn luyện lại sau khi sửa file câu hỏi mẫu:
+    python -m backend.intent_classifier backend/data/intent_questions.tsv backend/data/intent_model.json
+
+Lúc huấn luyện, độ dốc softmax (sharpness) và ngưỡng tin cậy được hiệu chỉnh bằng
+cross-validation trên chính file câu hỏi mẫu (mỗi câu chỉ được dự đoán bởi model không thấy nó):
+- sharpness: cực tiểu log-loss trên dự đoán held-out.
+- threshold: ngưỡng thấp nhất mà mọi ngưỡng từ đó trở lên đạt precision >= TARGET_PRECISION
+  (câu ngoài phạm vi bị nhận vào 1 intent tính là sai). Không đạt → threshold null, model tắt.
+Báo cáo chi tiết: python -m backend.benchmarks.intent_classifier_eval
+"""
+import json
+import logging
+import math
+import os
+import sys
+from collections import Counter, defaultdict
+
+from backend.entity_matcher import fold_vietnamese
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_PATH = os.path.join(os.path.dirname(__file__), "data", "intent_model.json")
+
+# Nhãn câu hỏi mẫu ngoài phạm vi chatbot (học phí, hỏi môn học chung chung...):
+# model dự đoán nhãn này → không nhận, để understand() / GPT quyết định
+OUT_OF_DOMAIN = "ngoai_pham_vi"
+
+# Độ dốc softmax mặc định (model chưa hiệu chỉnh)
+CONFIDENCE_SHARPNESS = 10
+
+# Hiệu chỉnh lúc huấn luyện
+CV_FOLDS = 5
+TARGET_PRECISION = 0.95
+# ngưỡng chỉ xét khi có ít nhất chừng này câu held-out được nhận (precision trên vài câu không có nghĩa)
+MIN_ACCEPTED = 30
+SHARPNESS_GRID = [0.5 * 1.25 ** i for i in range(30)]
+
+
+def char_ngrams(text: str, sizes=(2, 3, 4)):
+    """
+    Tập n-gram ký tự (mỗi n-gram đếm 1 lần) trên câu hỏi đã bỏ dấu
+    (sinh viên hay gõ không dấu), có đệm khoảng trắng 2 đầu.
+    """
+    padded = f" {fold_vietnamese(text)} "
+    return Counter({
+        padded[i:i + n]
+        for n in sizes
+        for i in range(len(padded) - n + 1)
+    })
+
+
+class IntentClassifier:
+    """
+    Naive Bayes (làm mịn Lidstone, alpha=0.1) trên tập n-gram ký tự 2-4.
+
+    - predict() trả về (intent, độ tin cậy 0..1).
+    - Độ tin cậy = softmax (độ dốc sharpness) của log-likelihood chia cho số n-gram của câu
+      (tránh xác suất luôn ≈ 1 như NB thuần).
+    - threshold: ngưỡng tin cậy đã hiệu chỉnh (None → chưa hiệu chỉnh / không đạt precision, không dùng).
+    - Model lưu dạng JSON (đếm n-gram theo intent), không dùng pickle.
+    """
+
+    def __init__(self, class_counts, feature_counts, sizes=(2, 3, 4), alpha=0.1,
+                 sharpness=CONFIDENCE_SHARPNESS, threshold=None, calibration=None):
+        self.sizes = tuple(sizes)
+        self.alpha = alpha
+        self.sharpness = sharpness
+        self.threshold = threshold
+        self.calibration = calibration or {}
+        self.class_counts = dict(class_counts)
+        self.feature_counts = {c: dict(f) for c, f in feature_counts.items()}
+
+        vocabulary = set()
+        for counts in self.feature_counts.values():
+            vocabulary.update(counts)
+        vocab_size = len(vocabulary)
+
+        total_docs = sum(self.class_counts.values())
+        self._log_prior = {c: math.log(n / total_docs) for c, n in self.class_counts.items()}
+
+        # log P(ngram | intent) tính sẵn; ngram chưa gặp dùng _log_unseen
+        self._log_likelihood = {}
+        self._log_unseen = {}
+        for c, counts in self.feature_counts.items():
+            denominator = math.log(sum(counts.values()) + alpha * vocab_size)
+            self._log_likelihood[c] = {f: math.log(n + alpha) - denominator for f, n in counts.items()}
+            self._log_unseen[c] = math.log(alpha) - denominator
+
+    @property
+    def intents(self):
+        return list(self.class_counts)
+
+    # ---------- huấn luyện / lưu ----------
+    @classmethod
+    def train(cls, samples, sizes=(2, 3, 4), alpha=0.1):
+        """
+        samples: [(intent, question), ...]
+        """
+        class_counts = Counter()
+        feature_counts = defaultdict(Counter)
+        for intent, question in samples:
+            class_counts[intent] += 1
+            feature_counts[intent].update(char_ngrams(question, sizes))
+        return cls(class_counts, feature_counts, sizes, alpha)
+
+    def to_dict(self):
+        return {
+            "sizes": list(self.sizes),
+            "alpha": self.alpha,
+            "sharpness": self.sharpness,
+            "threshold": self.threshold,
+            "calibration": self.calibration,
+            "class_counts": self.class_counts,
+            "feature_counts": self.feature_counts,
+        }
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        # model cũ không có threshold → None → không dùng
+        return cls(data["class_counts"], data["feature_counts"], data["sizes"], data["alpha"],
+                   data.get("sharpness", CONFIDENCE_SHARPNESS), data.get("threshold"), data.get("calibration"))
+
+    # ---------- dự đoán ----------
+    def scores(self, question: str):
+        features = char_ngrams(question, self.sizes)
+        total = sum(features.values()) or 1
+
+        scores = {}
+        for c, log_prior in self._log_prior.items():
+            likelihood = self._log_likelihood[c]
+            unseen = self._log_unseen[c]
+            log_prob = sum(n * likelihood.get(f, unseen) for f, n in features.items())
+            # chia cho số n-gram: câu dài / ngắn có thang điểm như nhau
+            scores[c] = (log_prior + log_prob) / total
+        return scores
+
+    def predict(self, question: str):
+        return confidence(self.scores(question), self.sharpness)
+
+
+def confidence(scores, sharpness):
+    """
+    (intent điểm cao nhất, softmax của nó) trên điểm đã chuẩn hóa theo độ dài.
+    """
+    best = max(scores, key=scores.get)
+    top = scores[best]
+    z = sum(math.exp((s - top) * sharpness) for s in scores.values())
+    return best, 1.0 / z
+
+
+# ---------- hiệu chỉnh ----------
+def cross_validate(samples, folds=CV_FOLDS, sizes=(2, 3, 4), alpha=0.1):
+    """
+    Cross-validation phân tầng theo intent (câu thứ i của mỗi intent vào fold i % folds, cố định).
+    Trả về [(intent đúng, câu hỏi, scores của model không thấy câu đó), ...].
+    """
+    seen = Counter()
+    assigned = []
+    for intent, question in samples:
+        assigned.append((seen[intent] % folds, intent, question))
+        seen[intent] += 1
+
+    held_out = []
+    for fold in range(folds):
+        model = IntentClassifier.train([(i, q) for f, i, q in assigned if f != fold], sizes, alpha)
+        held_out.extend((i, q, model.scores(q)) for f, i, q in assigned if f == fold)
+    return held_out
+
+
+def fit_sharpness(held_out, grid=SHARPNESS_GRID):
+    # log-loss của intent đúng trên dự đoán held-out
+    def log_loss(sharpness):
+        total = 0.0
+        for intent, _, scores in held_out:
+            top = max(scores.values())
+            log_z = math.log(sum(math.exp((s - top) * sharpness) for s in scores.values()))
+            total += log_z - (scores[intent] - top) * sharpness
+        return total / len(held_out)
+
+    return min(grid, key=log_loss)
+
+
+def precision_curve(held_out, sharpness):
+    """
+    Dự đoán held-out được nhận (intent khác OUT_OF_DOMAIN), sắp theo độ tin cậy giảm dần:
+    [(độ tin cậy, đúng?), ...] và số câu trong phạm vi (mẫu số của coverage).
+    """
+    accepted = []
+    in_domain = 0
+    for intent, _, scores in held_out:
+        in_domain += intent != OUT_OF_DOMAIN
+        predicted, conf = confidence(scores, sharpness)
+        if predicted != OUT_OF_DOMAIN:
+            accepted.append((conf, predicted == intent))
+    accepted.sort(key=lambda a: -a[0])
+    return accepted, in_domain
+
+
+def choose_threshold(held_out, sharpness, target_precision=TARGET_PRECISION, min_accepted=MIN_ACCEPTED):
+    """
+    Ngưỡng thấp nhất mà precision ở mọi ngưỡng cao hơn (đủ min_accepted câu) đều >= target_precision.
+    Trả về (threshold hoặc None, precision, coverage) tại ngưỡng đó.
+    """
+    accepted, in_domain = precision_curve(held_out, sharpness)
+
+    best = (None, None, 0.0)
+    correct = 0
+    for n, (conf, ok) in enumerate(accepted, 1):
+        correct += ok
+        # nhiều câu cùng độ tin cậy → chỉ xét ở câu cuối cùng của nhóm
+        if n < len(accepted) and accepted[n][0] == conf:
+            continue
+        if n < min_accepted:
+            continue
+        precision = correct / n
+        if precision < target_precision:
+            break
+        best = (conf, precision, n / in_domain)
+    return best
+
+
+def calibrate(samples, folds=CV_FOLDS, target_precision=TARGET_PRECISION):
+    held_out = cross_validate(samples, folds)
+    sharpness = fit_sharpness(held_out)
+    threshold, precision, coverage = choose_threshold(held_out, sharpness, target_precision)
+    accuracy = sum(confidence(scores, sharpness)[0] == intent for intent, _, scores in held_out) / len(held_out)
+    return sharpness, threshold, {
+        "folds": folds,
+        "target_precision": target_precision,
+        "cv_accuracy": round(accuracy, 4),
+        "precision": round(precision, 4) if precision is not None else None,
+        "coverage": round(coverage, 4),
+    }
+
+
+def train_calibrated(samples):
+    sharpness, threshold, report = calibrate(samples)
+    classifier = IntentClassifier.train(samples)
+    classifier.sharpness, classifier.threshold, classifier.calibration = sharpness, threshold, report
+    return classifier
+
+
+def load_samples(path):
+    """
+    File câu hỏi mẫu: mỗi dòng "intent<TAB>câu hỏi", dòng trống / bắt đầu bằng # bị bỏ qua.
+    """
+    samples = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            intent, question = line.split("\t", 1)
+            samples.append((intent.strip(), question.strip()))
+    return samples
+
+
+def load_classifier(path=None):
+    """
+    Nạp model đã huấn luyện; trả về None nếu không có file (→ dùng GPT fallback như cũ).
+    """
+    path = path or os.getenv("INTENT_MODEL_PATH", DEFAULT_MODEL_PATH)
+    try:
+        classifier = IntentClassifier.load(path)
+    except FileNotFoundError:
+        logger.warning(f"⚠️ Không tìm thấy model intent {path}, dùng GPT fallback.")
+        return None
+    if classifier.threshold is None:
+        logger.warning(f"⚠️ Model intent {path} chưa hiệu chỉnh / không đạt precision, dùng GPT fallback.")
+    else:
+        logger.info(f"📚 Nạp model intent {path}: {len(classifier.intents)} intent, "
+                    f"ngưỡng {classifier.threshold:.3f} ({classifier.calibration}).")
+    return classifier
+
+
+if __name__ == "__main__":
+    samples_path, model_path = sys.argv[1], sys.argv[2]
+    samples = load_samples(samples_path)
+    classifier = train_calibrated(samples)
+    classifier.save(model_path)
+    print(f"✅ Huấn luyện {len(samples)} câu hỏi → {model_path}")
+    print(f"   sharpness={classifier.sharpness:.3f} threshold={classifier.threshold} {classifier.calibration}")
@@ -1,5 +1,13 @@
 # backend/intent_detector.py
+import os
+import re
+from typing import Literal
 from backend.config import client
+from backend.openai_handler import async_client
+from backend.intent_rules import INTENT_RULES, KeywordRuleMatcher
+from backend.intent_classifier import load_classifier
+from backend.llm_schemas import QuestionEntities
+from backend.metrics import INTENT_SOURCE_TOTAL, llm_call, stage
 
 # 🎯 Danh sách intent
  
@@ -18,87 +26,206 @@ INTENTS = {
     "hoi_dieu_kien_tot_nghiep_chung": "Khi có từ khóa điều kiện tốt nghiệp là gì"
 }
 
+
+
+class QuestionUnderstanding(QuestionEntities):
+    """
+    Kết quả bước understand: intent + thực thể trong 1 lần gọi LLM.
+    """
+    intent: Literal[tuple(INTENTS)]
+
+
+_RULE_MATCHER = KeywordRuleMatcher(INTENT_RULES)
+
+# Model phân loại local, nạp 1 lần lúc khởi động (None → luôn dùng GPT fallback)
+_CLASSIFIER = load_classifier()
+
+
 class IntentDetector:
     def __init__(self):
         self.model = "gpt-4o-mini"
+        self.classifier = _CLASSIFIER
+        # dưới ngưỡng này mới gọi GPT; mặc định ngưỡng hiệu chỉnh lúc huấn luyện (precision >= 95% held-out),
+        # model không có ngưỡng (chưa hiệu chỉnh / không đạt) → không dùng model
+        threshold = os.getenv("INTENT_CLASSIFIER_THRESHOLD")
+        if threshold:
+            self.classifier_threshold = float(threshold)
+        else:
+            self.classifier_threshold = _CLASSIFIER.threshold if _CLASSIFIER is not None else None
 
     # ========================
     # 1️⃣ Detect intent
     # ========================
     def detect_intent(self, question: str) -> str:
 
-        q = question.lower()
+        intent = self.detect_intent_locally(question)
+        if intent:
+            return intent
 
         # ======================
-        # RULE BASED ƯU TIÊN
+        # GPT fallback
         # ======================
+        try:
+            INTENT_SOURCE_TOTAL.inc(source="llm")
+            with llm_call("intent", self.model) as call:
+                response = client.chat.completions.create(
+                    model=self.model,
+                    messages=[{"role": "user", "content": self._fallback_prompt(question)}],
+                    temperature=0
+                )
+                call.record_usage(response.usage)
+            return self._parse_intent(response.choices[0].message.content)
 
-        if any(k in q for k in [
-            "khung năng lực",
-            "khung 6 bậc",
-            "ngoại ngữ gồm mấy bậc",
-            "các bậc ngoại ngữ",
-            "khung năng lực tiếng anh"
-        ]):
-            return "hoi_khung_nang_luc_ngoai_ngu"
-
-        # Mức điểm chứng chỉ
-        if any(k in q for k in ["bao nhiêu", "mức", "điểm"]) and any(
-            k in q for k in ["ielts", "toeic", "toefl", "jlpt", "nat", "top j"]
-        ):
-            return "hoi_chuan_ngoai_ngu_muc_diem"
-
-        # Điều kiện tốt nghiệp
-        if "điều kiện tốt nghiệp" in q and "của" in q:
-            return "hoi_dieu_kien_tot_nghiep_ctdt"
-
-        if "điều kiện tốt nghiệp" in q:
-            return "hoi_dieu_kien_tot_nghiep_chung"
-
-        #  Chuẩn ngoại ngữ
-        if "chuẩn ngoại ngữ" in q and "của" in q:
-            return "chuan_ngoai_ngu_ctdt"
-
-        if "chuẩn ngoại ngữ" in q:
-            return "hoi_chuan_ngoai_ngu_dau_ra_chung"
-        # Học phần theo học kỳ
-        if any(k in q for k in [
-            "học kỳ",
-            "hk ",
-            "hk1","hk2","hk3","hk4","hk5","hk6","hk7","hk8","hk9","hk10",
-            "học trong kỳ",
-            "theo từng học kỳ",
-            "mỗi học kỳ"
-        ]):
-            return "hoi_hoc_phan_theo_hoc_ky_ctdt"
-
-        # Học phần theo loại (đại cương, tự do, kế tiếp, đồ án...)
-        if any(k in q for k in [
-            "đại cương",
-            "tự do",
-            "kế tiếp",
-            "đồ án",
-        ]):
+        except Exception as e:
+            print("❌ Lỗi khi xác định intent:", e)
             return "hoi_thong_tin_ctdt"
-        if any(k in q for k in [
-                    "tiên quyết",
-                    "học trước",
-                    "rớt",
-                    "không vượt qua"
-                ]):
-            return "hoi_tien_quyet_hoc_phan_ctdt"
-        if any(k in q for k in [
-                    "song hành",
-                    "học cùng",
-                    "cùng lúc",
-                    "đồng thời"
-                ]):
-            return "hoi_hoc_phan_song_hanh_ctdt"
-        # ======================
-        # GPT fallback
-        # ======================
 
-        prompt = f"""
+    async def detect_intent_async(self, question: str) -> str:
+
+        intent = self.detect_intent_locally(question)
+        if intent:
+            return intent
+
+        try:
+            INTENT_SOURCE_TOTAL.inc(source="llm")
+            with llm_call("intent", self.model) as call:
+                response = await async_client.chat.completions.create(
+                    model=self.model,
+                    messages=[{"role": "user", "content": self._fallback_prompt(question)}],
+                    temperature=0
+                )
+                call.record_usage(response.usage)
+            return self._parse_intent(response.choices[0].message.content)
+
+        except Exception as e:
+            print("❌ Lỗi khi xác định intent:", e)
+            return "hoi_thong_tin_ctdt"
+
+    def detect_intent_locally(self, question: str):
+        """
+        Luật từ khóa rồi tới model local, không gọi LLM. None nếu cả 2 đều không chắc chắn.
+        """
+        with stage("intent_rules"):
+            intent = self.detect_intent_by_rules(question)
+        if intent:
+            INTENT_SOURCE_TOTAL.inc(source="rules")
+            return intent
+
+        with stage("intent_classifier"):
+            intent = self.detect_intent_by_classifier(question)
+        if intent:
+            INTENT_SOURCE_TOTAL.inc(source="classifier")
+        return intent
+
+    # ========================
+    # Understand: intent + thực thể trong 1 lần gọi LLM
+    # ========================
+    def understand(self, question: str, entity_list):
+        """
+        Dùng khi detect_intent_locally trả về None: thay vì gọi GPT lấy intent rồi
+        gọi tiếp để tách thực thể, hỏi 1 lần với output ràng buộc bằng JSON schema.
+        Trả về (intent, (program_name, course_name, semester_name));
+        lỗi → (intent mặc định, None) để các bước sau tự tách thực thể như cũ.
+        """
+        try:
+            INTENT_SOURCE_TOTAL.inc(source="llm")
+            with llm_call("understand", self.model) as call:
+                response = client.beta.chat.completions.parse(
+                    model=self.model,
+                    messages=[{"role": "user", "content": self._understand_prompt(question, entity_list)}],
+                    response_format=QuestionUnderstanding,
+                    temperature=0
+                )
+                call.record_usage(response.usage)
+            return self._parse_understanding(response.choices[0].message.parsed)
+
+        except Exception as e:
+            print("❌ Lỗi khi phân tích câu hỏi:", e)
+            return "hoi_thong_tin_ctdt", None
+
+    async def understand_async(self, question: str, entity_list):
+        try:
+            INTENT_SOURCE_TOTAL.inc(source="llm")
+            with llm_call("understand", self.model) as call:
+                response = await async_client.beta.chat.completions.parse(
+                    model=self.model,
+                    messages=[{"role": "user", "content": self._understand_prompt(question, entity_list)}],
+                    response_format=QuestionUnderstanding,
+                    temperature=0
+                )
+                call.record_usage(response.usage)
+            return self._parse_understanding(response.choices[0].message.parsed)
+
+        except Exception as e:
+            print("❌ Lỗi khi phân tích câu hỏi:", e)
+            return "hoi_thong_tin_ctdt", None
+
+    def _parse_understanding(self, parsed: QuestionUnderstanding):
+        if parsed is None:
+            # model từ chối trả lời (refusal)
+            return "hoi_thong_tin_ctdt", None
+
+        print(f"[DEBUG] Understand: {parsed.intent} {parsed.as_tuple()}")
+        return parsed.intent, parsed.as_tuple()
+
+    def _understand_prompt(self, question: str, entity_list) -> str:
+        intents = "\n".join(f"    - {key}: {desc}" for key, desc in INTENTS.items())
+        return f"""
+    Bạn là hệ thống phân tích câu hỏi học vụ đại học.
+
+    1. Phân loại intent vào đúng 1 trong các intent sau:
+{intents}
+
+    2. Trích xuất thực thể, chỉ lấy tên có trong danh sách thực thể (ghi đúng như trong danh sách):
+    - program_name: tên CHƯƠNG TRÌNH ĐÀO TẠO
+    - course_name: tên HỌC PHẦN
+    - semester_name: tên HỌC KỲ
+
+    QUY TẮC:
+    - Nếu câu hỏi liên quan đến khoa, tín chỉ, chương trình, điều kiện tốt nghiệp → tên đó là program_name.
+    - Tên chương trình đào tạo KHÔNG được gán vào course_name.
+    - Không gán 1 tên cho 2 trường; không có thì để null.
+
+    Danh sách thực thể:
+    {entity_list}
+
+    Câu hỏi: "{question}"
+    """
+
+    def _parse_intent(self, content: str) -> str:
+        intent = content.strip().lower()
+
+        for key in INTENTS.keys():
+            if key == intent:
+                return key
+
+        return "hoi_thong_tin_ctdt"
+
+    def detect_intent_by_rules(self, question: str):
+        """
+        Xác định intent bằng luật từ khóa. Trả về None nếu không luật nào khớp.
+        """
+        # Bảng luật được biên dịch 1 lần thành 1 regex (xem backend/intent_rules.py)
+        return _RULE_MATCHER.match(question.lower())
+
+    def detect_intent_by_classifier(self, question: str):
+        """
+        Xác định intent bằng model local. Trả về None nếu không có model / ngưỡng,
+        độ tin cậy dưới ngưỡng hoặc câu hỏi ngoài phạm vi (→ GPT fallback).
+        """
+        if self.classifier is None or self.classifier_threshold is None:
+            return None
+
+        intent, confidence = self.classifier.predict(question)
+        if confidence < self.classifier_threshold or intent not in INTENTS:
+            print(f"[DEBUG] Classifier không chắc chắn ({intent}, {confidence:.2f}) → GPT")
+            return None
+
+        print(f"[DEBUG] Classifier: {intent} ({confidence:.2f})")
+        return intent
+
+    def _fallback_prompt(self, question: str) -> str:
+        return f"""
     Phân loại intent câu hỏi học vụ vào 1 trong các intent sau:
 
     1 hoi_chuan_ngoai_ngu_dau_ra_chung → hỏi về chuẩn ngoại ngữ đầu ra của trường, ví dụ:
@@ -141,25 +268,6 @@ class IntentDetector:
     Câu hỏi: "{question}"
     """
 
-        try:
-            response = client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0
-            )
-
-            intent = response.choices[0].message.content.strip().lower()
-
-            for key in INTENTS.keys():
-                if key == intent:
-                    return key
-
-            return "hoi_thong_tin_ctdt"
-
-        except Exception as e:
-            print("❌ Lỗi khi xác định intent:", e)
-            return "hoi_thong_tin_ctdt"
-
     def transform_question(self, question: str) -> str:
         q = question.lower().strip()
 
@@ -174,4 +282,11 @@ class IntentDetector:
 
         return q
 
+    def normalize_question(self, question_transformed: str) -> str:
+        """
+        Chuẩn hóa câu hỏi đã qua transform_question để làm khóa answer cache:
+        bỏ dấu câu, gộp khoảng trắng ("Điều kiện tốt nghiệp là gì ?" ≡ "điều kiện  tốt nghiệp là gì").
+        """
+        return " ".join(re.sub(r"[^\w]+", " ", question_transformed.lower()).split())
+
 
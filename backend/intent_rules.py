@@ -0,0 +1,143 @@
+# backend/intent_rules.py
+import re
+
+
+# ==========================
+# Luật từ khóa xác định intent, xét theo đúng thứ tự (luật trước ưu tiên hơn).
+# Mỗi luật: (intent, [nhóm từ khóa, ...])
+# → khớp khi MỌI nhóm đều có ít nhất 1 từ khóa xuất hiện trong câu hỏi (đã lowercase).
+# Thêm luật mới: chỉ cần thêm 1 dòng, không phải viết thêm vòng lặp.
+# ==========================
+INTENT_RULES = [
+    ("hoi_khung_nang_luc_ngoai_ngu", [[
+        "khung năng lực",
+        "khung 6 bậc",
+        "ngoại ngữ gồm mấy bậc",
+        "các bậc ngoại ngữ",
+        "khung năng lực tiếng anh"
+    ]]),
+
+    # Mức điểm chứng chỉ
+    ("hoi_chuan_ngoai_ngu_muc_diem", [
+        ["bao nhiêu", "mức", "điểm"],
+        ["ielts", "toeic", "toefl", "jlpt", "nat", "top j"]
+    ]),
+
+    # Điều kiện tốt nghiệp
+    ("hoi_dieu_kien_tot_nghiep_ctdt", [["điều kiện tốt nghiệp"], ["của"]]),
+    ("hoi_dieu_kien_tot_nghiep_chung", [["điều kiện tốt nghiệp"]]),
+
+    # Chuẩn ngoại ngữ
+    ("chuan_ngoai_ngu_ctdt", [["chuẩn ngoại ngữ"], ["của"]]),
+    ("hoi_chuan_ngoai_ngu_dau_ra_chung", [["chuẩn ngoại ngữ"]]),
+
+    # Học phần theo học kỳ
+    ("hoi_hoc_phan_theo_hoc_ky_ctdt", [[
+        "học kỳ",
+        "hk ",
+        "hk1", "hk2", "hk3", "hk4", "hk5", "hk6", "hk7", "hk8", "hk9", "hk10",
+        "học trong kỳ",
+        "theo từng học kỳ",
+        "mỗi học kỳ"
+    ]]),
+
+    # Học phần theo loại (đại cương, tự do, kế tiếp, đồ án...)
+    ("hoi_thong_tin_ctdt", [["đại cương", "tự do", "kế tiếp", "đồ án"]]),
+
+    ("hoi_tien_quyet_hoc_phan_ctdt", [["tiên quyết", "học trước", "rớt", "không vượt qua"]]),
+
+    ("hoi_hoc_phan_song_hanh_ctdt", [["song hành", "học cùng", "cùng lúc", "đồng thời"]]),
+]
+
+
+def _trie_pattern(keywords):
+    """
+    Regex dạng cây tiền tố từ danh sách từ khóa: "học kỳ|học trước" → "học (?:kỳ|trước)".
+    Regex greedy nên tại mỗi vị trí luôn khớp từ khóa dài nhất.
+    """
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for ch in keyword:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def build(node):
+        alternatives = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not alternatives:
+            return ""
+        body = alternatives[0] if len(alternatives) == 1 else "(?:" + "|".join(alternatives) + ")"
+        return "(?:" + body + ")?" if "" in node else body
+
+    return build(trie)
+
+
+class KeywordRuleMatcher:
+    """
+    Biên dịch bảng luật 1 lần, quét câu hỏi bằng 1 regex duy nhất.
+
+    - Mỗi nhóm từ khóa được gán 1 bit; mỗi từ khóa mang mask các nhóm chứa nó.
+    - Regex dạng cây tiền tố, quét 1 lượt, tại mỗi vị trí lấy từ khóa dài nhất.
+      Từ khóa nằm gọn trong từ khóa khác được gộp sẵn vào mask của từ khóa đó;
+      từ khóa có thể bắt đầu giữa 1 match và tràn ra sau (vd "chuẩn ngoại ngữ" /
+      "ngoại ngữ gồm mấy bậc") được kiểm tra thêm bằng `in`
+      → kết quả giống hệt kiểm tra `k in q` cho từng từ khóa.
+    - Luật khớp khi mask của câu hỏi chứa đủ các bit của luật; trả về luật đầu tiên.
+    """
+
+    def __init__(self, rules):
+        keyword_masks = {}
+        self._rules = []
+
+        bit = 0
+        for intent, groups in rules:
+            rule_mask = 0
+            for group in groups:
+                for keyword in group:
+                    keyword_masks[keyword] = keyword_masks.get(keyword, 0) | (1 << bit)
+                rule_mask |= 1 << bit
+                bit += 1
+            self._rules.append((intent, rule_mask))
+
+        self._masks = {}
+        self._overlaps = {}
+        for keyword in keyword_masks:
+            mask = 0
+            overlaps = []
+            for other, other_mask in keyword_masks.items():
+                if other in keyword:
+                    mask |= other_mask
+                elif self._overlap_tail(keyword, other):
+                    overlaps.append((other, other_mask))
+            self._masks[keyword] = mask
+            self._overlaps[keyword] = tuple((o, m) for o, m in overlaps if m & ~mask)
+
+        self._pattern = re.compile(_trie_pattern(keyword_masks))
+
+    @staticmethod
+    def _overlap_tail(keyword, other):
+        # other có thể bắt đầu bên trong keyword và kéo dài ra sau keyword
+        return any(other.startswith(keyword[i:]) for i in range(1, len(keyword)))
+
+    def groups_mask(self, text: str) -> int:
+        mask = 0
+        masks = self._masks
+        overlaps = self._overlaps
+        for keyword in self._pattern.findall(text):
+            mask |= masks[keyword]
+            for other, other_mask in overlaps[keyword]:
+                if other_mask & ~mask and other in text:
+                    mask |= other_mask
+        return mask
+
+    def match(self, text: str):
+        """
+        Intent của luật đầu tiên khớp với text (đã lowercase), None nếu không có.
+        """
+        mask = self.groups_mask(text)
+        if not mask:
+            return None
+        for intent, rule_mask in self._rules:
+            if mask & rule_mask == rule_mask:
+                return intent
+        return None
@@ -0,0 +1,17 @@
+# backend/llm_schemas.py
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+# ==========================
+# Schema JSON cho structured output của OpenAI
+# (client.beta.chat.completions.parse → message.parsed, không cần tự làm sạch / json.loads)
+# ==========================
+class QuestionEntities(BaseModel):
+    program_name: Optional[str]
+    course_name: Optional[str]
+    semester_name: Optional[str]
+
+    def as_tuple(self):
+        return self.program_name, self.course_name, self.semester_name
@@ -0,0 +1,244 @@
+# backend/metrics.py
+"""
+Đo thời gian từng bước của pipeline chatbot + đếm token LLM, xuất theo định dạng text của Prometheus
+(route GET /metrics, xem backend/app/api/routes/metrics.py).
+
+- stage("tên"): đo 1 bước (transform, intent, entities, fetch, llm, persist...), gắn nhãn intent hiện tại.
+- llm_call(purpose, model): đo 1 lần gọi OpenAI; call.record_usage(response.usage) cộng token prompt/completion.
+- Intent của request đang xử lý giữ trong contextvar (set_intent) → các bước bên trong
+  (Neo4jHandler, OpenAIHandler) không cần truyền intent qua tham số.
+"""
+import math
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Giây; LLM có thể mất vài giây, truy vấn Neo4j / bước local chỉ vài ms
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_current_intent = ContextVar("chatbot_intent", default="unknown")
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in pairs) + "}"
+
+
+def _format_number(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._series = {}  # nhãn → [số đếm từng bucket..., tổng, số lần]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0
+                for i, bound in enumerate(self.buckets):
+                    cumulative += series[i]
+                    labels = _format_labels(self.labelnames, key, [("le", _format_number(bound))])
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {_format_number(series[-2])}")
+                lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Danh sách metric của process + collector (hàm trả về gauge đọc tại thời điểm scrape,
+    vd thống kê pool Neo4j, answer cache).
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, help_text, labelnames=()):
+        metric = Counter(name, help_text, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, help_text, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collect):
+        """
+        collect() → [(tên, help, {nhãn: giá trị}, số), ...], xuất dạng gauge
+        (tên kết thúc bằng _total → counter).
+        """
+        self._collectors.append(collect)
+
+    def _render_collected(self):
+        collected = {}
+        for collect in self._collectors:
+            try:
+                samples = collect()
+            except Exception as e:
+                print("❌ Lỗi thu thập metrics:", e)
+                continue
+            for name, help_text, labels, value in samples:
+                if value is None:
+                    continue
+                collected.setdefault(name, (help_text, []))[1].append((labels, value))
+
+        lines = []
+        for name, (help_text, samples) in collected.items():
+            kind = "counter" if name.endswith("_total") else "gauge"
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            for labels, value in samples:
+                lines.append(f"{name}{_format_labels(list(labels), list(labels.values()))} {_format_number(value)}")
+        return lines
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines += metric.render()
+        lines += self._render_collected()
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    "chatbot_request_duration_seconds",
+    "Thời gian xử lý 1 câu hỏi, theo intent",
+    ["intent", "mode", "cached"]
+)
+STAGE_SECONDS = REGISTRY.histogram(
+    "chatbot_stage_duration_seconds",
+    "Thời gian từng bước của pipeline",
+    ["stage", "intent"]
+)
+INTENT_SOURCE_TOTAL = REGISTRY.counter(
+    "chatbot_intent_source_total",
+    "Số câu hỏi theo cách xác định intent (rules / classifier / llm)",
+    ["source"]
+)
+ANSWER_MODE_TOTAL = REGISTRY.counter(
+    "chatbot_answer_mode_total",
+    "Số câu trả lời theo cách tạo (template / template_polish / llm)",
+    ["intent", "mode"]
+)
+NEO4J_QUERY_SECONDS = REGISTRY.histogram(
+    "chatbot_neo4j_query_duration_seconds",
+    "Thời gian 1 truy vấn Neo4j (kể cả retry), theo câu lệnh trong registry",
+    ["statement", "intent"]
+)
+LLM_CALL_SECONDS = REGISTRY.histogram(
+    "chatbot_llm_call_duration_seconds",
+    "Thời gian 1 lần gọi OpenAI",
+    ["purpose", "model", "intent"]
+)
+LLM_TOKENS_TOTAL = REGISTRY.counter(
+    "chatbot_llm_tokens_total",
+    "Số token OpenAI báo về (prompt / completion)",
+    ["purpose", "model", "intent", "kind"]
+)
+
+
+# ---------- ngữ cảnh request ----------
+def set_intent(intent):
+    _current_intent.set(intent or "unknown")
+
+
+def current_intent():
+    return _current_intent.get()
+
+
+@contextmanager
+def stage(name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage=name, intent=current_intent())
+
+
+def observe_neo4j_query(statement, seconds):
+    NEO4J_QUERY_SECONDS.observe(seconds, statement=statement, intent=current_intent())
+
+
+def observe_request(seconds, intent, mode, cached):
+    REQUEST_SECONDS.observe(seconds, intent=intent, mode=mode, cached=str(bool(cached)).lower())
+
+
+class LLMCall:
+    def __init__(self, purpose, model):
+        self.purpose = purpose
+        self.model = model
+        self.intent = current_intent()
+
+    def record_usage(self, usage):
+        if usage is None:
+            return
+        labels = {"purpose": self.purpose, "model": self.model, "intent": self.intent}
+        LLM_TOKENS_TOTAL.inc(getattr(usage, "prompt_tokens", 0) or 0, kind="prompt", **labels)
+        LLM_TOKENS_TOTAL.inc(getattr(usage, "completion_tokens", 0) or 0, kind="completion", **labels)
+
+
+@contextmanager
+def llm_call(purpose, model):
+    call = LLMCall(purpose, model)
+    started = time.perf_counter()
+    try:
+        yield call
+    finally:
+        LLM_CALL_SECONDS.observe(
+            time.perf_counter() - started, purpose=purpose, model=model, intent=call.intent
+        )
@@ -1,63 +1,159 @@
 # backend/neo4j_handler.py
-from neo4j import GraphDatabase
 from backend.config import NEO4J_URI, NEO4J_USERNAME, NEO4J_PASSWORD, client
 from backend.openai_handler import OpenAIHandler
+from backend.graph_store import GraphStore
+from backend.entity_cache import EntityCache
+from backend.shared_cache import TieredCache, shared_store
+from backend.entity_matcher import EntityMatcher, CTDT_STOPWORDS, fold_vietnamese
+from backend.prerequisite_graph import PrerequisiteGraph
+from backend.llm_schemas import QuestionEntities
+from backend.metrics import llm_call, observe_neo4j_query
+from backend.cypher_registry import (
+    CYPHER,
+    CTDT_NAME_QUERY,
+    BM25_SEARCH_QUERY,
+    ENTITY_NAMES_QUERY,
+    GRAPH_VERSION_QUERY,
+    DIEU_KIEN_TOT_NGHIEP_CHUNG_QUERY,
+    DIEU_KIEN_TOT_NGHIEP_CTDT_QUERY,
+    CHUAN_NGOAI_NGU_DAU_RA_CHUNG_QUERY,
+    CHUAN_NGOAI_NGU_CTDT_QUERY,
+    LANGUAGE_REQUIREMENT_QUERY,
+    KHUNG_NANG_LUC_NGOAI_NGU_QUERY,
+    COURSE_QUERY,
+    HOC_PHAN_THEO_HOC_KY_QUERY,
+    LIST_COURSE_QUERY,
+    TIEN_QUYET_QUERY,
+    HOC_PHAN_CTDT_QUERY,
+    SONG_HANH_QUERY,
+)
 import logging
-import json
+import os
 import re
+import time
 
 logger = logging.getLogger(__name__)
 
-     
+# Thời gian (giây) giữ payload CTĐT trong program_cache (khóa đã gắn phiên bản đồ thị)
+PROGRAM_CACHE_TTL = int(os.getenv("PROGRAM_CACHE_TTL", "3600"))
+
+
 class Neo4jHandler:
     def run_query(self, query, params=None):
-            with self.driver.session() as session:
-                result = session.run(query, params or {})
-                return [r.data() for r in result]
-            
-    def __init__(self, openai_handler: OpenAIHandler = None):
+        # managed read transaction: tự retry lỗi tạm thời (xem GraphStore)
+        CYPHER.record(query)
+        started = time.perf_counter()
         try:
-            self.driver = GraphDatabase.driver(
-                NEO4J_URI,
-                auth=(NEO4J_USERNAME, NEO4J_PASSWORD)
-            )
+            return self.graph.read(query, params)
+        finally:
+            observe_neo4j_query(CYPHER.name_of(query), time.perf_counter() - started)
 
-            with self.driver.session() as session:
-                session.run("RETURN 1")
-
-            self.openai_handler = openai_handler
-            self.llm_client = openai_handler.client if openai_handler else None
+    async def run_query_async(self, query, params=None):
+        CYPHER.record(query)
+        started = time.perf_counter()
+        try:
+            return await self.graph.read_async(query, params)
+        finally:
+            observe_neo4j_query(CYPHER.name_of(query), time.perf_counter() - started)
+
+    # Payload theo CTĐT / toàn trường: giống nhau cho mọi user, chỉ đổi khi đồ thị đổi phiên bản
+    # → đọc qua program_cache (trong process + Redis dùng chung), cả cụm chỉ truy vấn Neo4j 1 lần
+    def _program_key(self, query, params):
+        return CYPHER.name_of(query), tuple(sorted((params or {}).items()))
+
+    def run_program_query(self, query, params=None):
+        key, version = self._program_key(query, params), self.graph_version
+        records = self.program_cache.get(key, version)
+        if records is None:
+            records = self.run_query(query, params)
+            self.program_cache.set(key, records, PROGRAM_CACHE_TTL, version)
+        return records
 
-            logger.info("✅ Kết nối Neo4j thành công!")
+    async def run_program_query_async(self, query, params=None):
+        key, version = self._program_key(query, params), self.graph_version
+        records = await self.program_cache.get_async(key, version)
+        if records is None:
+            records = await self.run_query_async(query, params)
+            await self.program_cache.set_async(key, records, PROGRAM_CACHE_TTL, version)
+        return records
 
+    def __init__(self, openai_handler: OpenAIHandler = None):
+        # Chỉ tạo đối tượng (driver Neo4j kết nối lười), không mở kết nối mạng:
+        # kết nối + nạp cache ở connect(), gọi từ lifespan của app (backend/app/services/warmup.py)
+        # Pool kết nối + retry dùng chung cho mọi truy vấn
+        self.graph = GraphStore(NEO4J_URI, (NEO4J_USERNAME, NEO4J_PASSWORD))
+        self.driver = self.graph.driver
+
+        self.openai_handler = openai_handler
+        self.llm_client = openai_handler.client if openai_handler else None
+        self.async_llm_client = openai_handler.async_client if openai_handler else None
+
+        # Danh sách thực thể giống nhau cho mọi user → giữ trong process
+        self.entity_cache = EntityCache(
+            ttl_seconds=int(os.getenv("ENTITY_CACHE_TTL", "600")),
+            version_check_seconds=int(os.getenv("GRAPH_VERSION_CHECK_SECONDS", "30"))
+        )
+        self.program_cache = TieredCache(
+            max_entries=int(os.getenv("PROGRAM_CACHE_SIZE", "256")),
+            namespace="program",
+            shared=shared_store
+        )
+        # Automaton so khớp tên thực thể, xây lại khi entity cache đổi
+        self._entity_matcher = None
+        self._entity_matcher_source = None
+        # Đồ thị tiên quyết theo CTĐT, dựng lại khi phiên bản đồ thị đổi
+        self._prerequisite_graphs = {}
+        self._prerequisite_graphs_version = None
+        # Điều kiện tốt nghiệp chung (mọi CTĐT), giữ theo phiên bản đồ thị
+        self._graduation_chung = None
+        self._graduation_chung_version = None
+
+    def connect(self):
+        """
+        Kiểm tra kết nối + làm nóng: plan Cypher, danh sách thực thể (CTĐT / học phần / học kỳ),
+        điều kiện tốt nghiệp chung. Lỗi kết nối → ném exception (lifespan thử lại).
+        """
+        try:
+            self.graph.verify_connectivity()
         except Exception as e:
             logger.error(f"❌ Lỗi khi kết nối Neo4j: {e}")
             raise e
+        logger.info("✅ Kết nối Neo4j thành công!")
+
+        if os.getenv("NEO4J_WARM_QUERY_PLANS", "1") == "1":
+            self.warm_query_plans()
+        self.warm_entity_cache()
+        self.get_dieu_kien_tot_nghiep_chung()
+
+    @property
+    def async_driver(self):
+        return self.graph.async_driver
+
+    def pool_stats(self):
+        return self.graph.stats()
+
+    def warm_query_plans(self):
+        # EXPLAIN mọi câu lệnh trong registry → request đầu không phải chờ lập plan
+        return CYPHER.warm_up(self.graph.read)
+
+    def query_plan_stats(self):
+        return CYPHER.stats()
 
     def close(self):
-        if hasattr(self, "driver") and self.driver:
-            self.driver.close()
+        if getattr(self, "graph", None):
+            self.graph.close()
             logger.info("🔒 Đã đóng kết nối Neo4j.")
 
-    
+    async def close_async(self):
+        if getattr(self, "graph", None):
+            await self.graph.close_async()
+            logger.info("🔒 Đã đóng kết nối Neo4j (async).")
 
-    def extract_ctdt_name(self, question: str):
-        """
-        Trích xuất tên chương trình đào tạo từ câu hỏi bằng cách:
-        - làm sạch câu hỏi
-        - loại bỏ stopwords
-        - chạy BM25 để match gần đúng tên CTĐT
-        """
 
-        stopwords = [
-            "chương trình", "ctdt", "ctđt", "ngành",
-            "là gì", "giới thiệu", "thuộc khoa nào",
-            "học gì", "gồm những gì", "bao gồm",
-            "nội dung", "cho mình hỏi", "tư vấn"
-        ]
 
+    def _clean_ctdt_question(self, question: str):
         clean = question.lower()
-        for sw in stopwords:
+        for sw in CTDT_STOPWORDS:
             clean = clean.replace(sw, "")
 
         clean = clean.strip()
@@ -66,80 +162,132 @@ class Neo4jHandler:
         if not clean:
             clean = question
 
-        # chạy BM25 để lấy tên CTĐT khớp nhất
-        query = """
-        CALL db.index.fulltext.queryNodes(
-            'ChuongTrinhDaoTao_full_text',
-            $q
-        ) YIELD node, score
-        RETURN node.ten_chuong_trinh AS ten, score
-        ORDER BY score DESC
-        LIMIT 1
+        return clean
+
+    def extract_ctdt_name(self, question: str):
         """
+        Trích xuất tên chương trình đào tạo từ câu hỏi bằng cách:
+        - làm sạch câu hỏi
+        - loại bỏ stopwords
+        - chạy BM25 để match gần đúng tên CTĐT
+        """
+        clean = self._clean_ctdt_question(question)
 
-        with self.driver.session() as sess:
-            result = sess.run(query, {"q": clean}).single()
+        # chạy BM25 để lấy tên CTĐT khớp nhất
+        records = self.run_query(CTDT_NAME_QUERY, {"q": clean})
 
-        if result:
-            return result["ten"]
+        if records:
+            return records[0]["ten"]
+
+        return None
+
+    async def extract_ctdt_name_async(self, question: str):
+        clean = self._clean_ctdt_question(question)
+        records = await self.run_query_async(CTDT_NAME_QUERY, {"q": clean})
+
+        if records:
+            return records[0]["ten"]
 
         return None
     # # ==========================
     # # BM25 Fulltext Search
     # # ==========================
-    
+
     def bm25_search(self, query, limit=5):
         """
         Tìm kiếm toàn văn bằng BM25 (Fulltext Search).
         """
-        cypher = """
-        CALL db.index.fulltext.queryNodes('ChuongTrinhDaoTao_full_text', $query)
-        YIELD node, score
-        RETURN node.ten_chuong_trinh AS ten_chuong_trinh,
-               node.noi_dung AS noi_dung,
-               score
-        ORDER BY score DESC
-        LIMIT $limit
-        """
-        with self.driver.session() as session:
-            result = session.run(cypher, {"query": query, "limit": limit})
-            records = [r.data() for r in result]
+        records = self.run_query(BM25_SEARCH_QUERY, {"query": query, "limit": limit})
         logger.info(f"🔍 BM25 Search trả về {len(records)} kết quả cho truy vấn: '{query}'")
         return records
 
-    def extract_entities_from_question(self, question: str):
+    async def bm25_search_async(self, query, limit=5):
+        records = await self.run_query_async(BM25_SEARCH_QUERY, {"query": query, "limit": limit})
+        logger.info(f"🔍 BM25 Search trả về {len(records)} kết quả cho truy vấn: '{query}'")
+        return records
 
-        program_name = None
-        course_name = None
-        semester_name = None
+    # ==========================
+    # Phiên bản đồ thị + danh sách thực thể (có cache)
+    # ==========================
+    def _format_graph_version(self, records):
+        if not records:
+            return None
+        r = records[0]
+        return f"{r.get('version') or 0}:{r.get('nodes')}:{r.get('rels')}"
 
-        try:
-            # 1️⃣ Lấy danh sách entity từ Neo4j
-            cypher = """
-            MATCH (c:HocPhanTienQuyet) RETURN c.ten_mon AS name
-            UNION
-            MATCH (c:HocPhanDaiCuong) RETURN c.ten_mon AS name
-            UNION
-            MATCH (c:HocPhanKeTiep) RETURN c.ten_mon AS name
-            UNION
-            MATCH (c:HocPhanSongHanh) RETURN c.ten_mon AS name
-            UNION
-            MATCH (p:ChuongTrinhDaoTao) RETURN p.ten_chuong_trinh AS name
-            UNION
-            MATCH (s:HocKy) RETURN s.ten_hoc_ky AS name
-            """
-
-            result = self.run_query(cypher)
-            entity_list = [r["name"] for r in result if r["name"]]
+    def get_graph_version(self):
+        return self._format_graph_version(self.run_query(GRAPH_VERSION_QUERY))
 
-            print("🟢 Entity list from Neo4j:", entity_list[:20], "...")
+    async def get_graph_version_async(self):
+        return self._format_graph_version(await self.run_query_async(GRAPH_VERSION_QUERY))
 
-            # 2️⃣ Kiểm tra LLM client
-            if not self.llm_client:
-                raise Exception("LLM client chưa được khởi tạo")
+    def _build_entities(self, result):
+        entities = [{"name": r["name"], "kind": r["kind"]} for r in result if r["name"]]
+        logger.info(f"📚 Nạp {len(entities)} thực thể từ Neo4j.")
+        return entities
 
-            # 3️⃣ Prompt cho LLM
-            prompt = f"""
+    def _load_entities(self):
+        return self._build_entities(self.run_query(ENTITY_NAMES_QUERY))
+
+    async def _load_entities_async(self):
+        return self._build_entities(await self.run_query_async(ENTITY_NAMES_QUERY))
+
+    def get_entities(self):
+        """
+        Danh sách thực thể [{name, kind}] với kind ∈ program / course / semester.
+        """
+        return self.entity_cache.get(self._load_entities, self.get_graph_version)
+
+    async def get_entities_async(self):
+        return await self.entity_cache.get_async(self._load_entities_async, self.get_graph_version_async)
+
+    def _get_entity_matcher(self, entities):
+        if self._entity_matcher_source is not entities:
+            self._entity_matcher = EntityMatcher(entities)
+            self._entity_matcher_source = entities
+        return self._entity_matcher
+
+    def _match_entities_locally(self, question: str, entities):
+        """
+        So khớp tên thực thể tại chỗ (không gọi LLM).
+        Trả về None nếu không tìm thấy gì hoặc kết quả mơ hồ.
+        """
+        match = self._get_entity_matcher(entities).extract(question)
+
+        if match.ambiguous or not (match.program_name or match.course_name or match.semester_name):
+            logger.debug(f"🔁 Entity matcher không chắc chắn → dùng LLM: {match}")
+            return None
+
+        print("🟡 Extracted (local):")
+        print("   program_name:", match.program_name)
+        print("   course_name:", match.course_name)
+        print("   semester_name:", match.semester_name)
+
+        return match.program_name, match.course_name, match.semester_name
+
+    def resolve_entities(self, question: str):
+        """
+        (program, course, semester) tìm được bằng entity matcher, không gọi LLM.
+        Dùng làm 1 phần khóa answer cache.
+        """
+        match = self._get_entity_matcher(self.get_entities()).extract(question)
+        return match.program_name, match.course_name, match.semester_name
+
+    async def resolve_entities_async(self, question: str):
+        match = self._get_entity_matcher(await self.get_entities_async()).extract(question)
+        return match.program_name, match.course_name, match.semester_name
+
+    @property
+    def graph_version(self):
+        # phiên bản đồ thị lần kiểm tra gần nhất của entity cache
+        return self.entity_cache.version
+
+    def warm_entity_cache(self):
+        # lỗi → ném ra: connect() thất bại, lifespan thử lại và app chưa báo ready
+        self._get_entity_matcher(self.get_entities())
+
+    def _entity_prompt(self, entity_list, question: str):
+        return f"""
     Bạn là hệ thống trích xuất thực thể từ câu hỏi.
 
     Danh sách thực thể:
@@ -160,189 +308,162 @@ class Neo4jHandler:
     4. semester_name chỉ dùng cho học kỳ.
     5. Không gán 1 tên cho 2 trường.
 
-    Chỉ trả JSON, không markdown:
-
-    {{
-    "program_name": "... hoặc null",
-    "course_name": "... hoặc null",
-    "semester_name": "... hoặc null"
-    }}
+    Không có thì để null.
 
     Câu hỏi:
     "{question}"
 
     """
 
-            response = self.llm_client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0
-            )
+    def _parse_entities(self, parsed: QuestionEntities):
+        # structured output: OpenAI trả về đúng schema QuestionEntities (None nếu model từ chối)
+        if parsed is None:
+            raise ValueError("LLM không trả về thực thể")
+
+        program_name, course_name, semester_name = parsed.as_tuple()
 
-            raw = response.choices[0].message.content.strip()
-            print("🔍 RAW LLM OUTPUT:", raw)
+        print("🟡 Extracted:")
+        print("   program_name:", program_name)
+        print("   course_name:", course_name)
+        print("   semester_name:", semester_name)
 
-            # 4️⃣ Làm sạch markdown nếu có
-            if raw.startswith("```"):
-                raw = raw.replace("```json", "").replace("```", "").strip()
+        return program_name, course_name, semester_name
+
+    def _merge_entities(self, local, other):
+        """
+        Khớp tại chỗ chỉ ra 1 phần (vd tên học phần, thiếu CTĐT viết tắt "CNTT"):
+        lấy trường còn thiếu từ understood / LLM, không để None của bản local đè lên giá trị đã có.
+        """
+        other = tuple(other)
+        if not local:
+            return other
+        return tuple(mine if mine is not None else theirs for mine, theirs in zip(local, other))
+
+    def extract_entities_from_question(self, question: str, understood=None):
+        """
+        - understood: (program, course, semester) từ bước understand của IntentDetector
+          (đã gọi LLM cùng lúc với intent) → không gọi LLM lần nữa.
+        """
 
-            data = json.loads(raw)
+        local = None
+        program_name = None
+        course_name = None
+        semester_name = None
+
+        try:
+            # 1️⃣ Lấy danh sách entity (cache trong process, làm mới theo TTL / phiên bản đồ thị)
+            entities = self.get_entities()
+
+            # So khớp tại chỗ trước, chỉ gọi LLM khi không có kết quả, mơ hồ hoặc thiếu tên CTĐT
+            local = self._match_entities_locally(question, entities)
+            if local and local[0]:
+                return local
+
+            if understood is not None:
+                return self._merge_entities(local, understood)
+
+            entity_list = [e["name"] for e in entities]
+            print("🟢 Entity list from Neo4j:", entity_list[:20], "...")
+
+            # 2️⃣ Kiểm tra LLM client
+            if not self.llm_client:
+                raise Exception("LLM client chưa được khởi tạo")
 
-            program_name = data.get("program_name")
-            course_name = data.get("course_name")
-            semester_name = data.get("semester_name")
+            # 3️⃣ Prompt cho LLM (output ràng buộc theo schema QuestionEntities)
+            with llm_call("entities", "gpt-4o-mini") as call:
+                response = self.llm_client.beta.chat.completions.parse(
+                    model="gpt-4o-mini",
+                    messages=[{"role": "user", "content": self._entity_prompt(entity_list, question)}],
+                    response_format=QuestionEntities,
+                    temperature=0
+                )
+                call.record_usage(response.usage)
 
-            print("🟡 Extracted:")
-            print("   program_name:", program_name)
-            print("   course_name:", course_name)
-            print("   semester_name:", semester_name)
+            program_name, course_name, semester_name = self._parse_entities(response.choices[0].message.parsed)
 
         except Exception as e:
             print("❌ Lỗi tách entity:", e)
 
-        return program_name, course_name, semester_name
+        return self._merge_entities(local, (program_name, course_name, semester_name))
+
+    async def extract_entities_from_question_async(self, question: str, understood=None):
+
+        local = None
+        program_name = None
+        course_name = None
+        semester_name = None
+
+        try:
+            entities = await self.get_entities_async()
+
+            local = self._match_entities_locally(question, entities)
+            if local and local[0]:
+                return local
+
+            if understood is not None:
+                return self._merge_entities(local, understood)
+
+            entity_list = [e["name"] for e in entities]
+            print("🟢 Entity list from Neo4j:", entity_list[:20], "...")
+
+            if not self.async_llm_client:
+                raise Exception("LLM client chưa được khởi tạo")
+
+            with llm_call("entities", "gpt-4o-mini") as call:
+                response = await self.async_llm_client.beta.chat.completions.parse(
+                    model="gpt-4o-mini",
+                    messages=[{"role": "user", "content": self._entity_prompt(entity_list, question)}],
+                    response_format=QuestionEntities,
+                    temperature=0
+                )
+                call.record_usage(response.usage)
+
+            program_name, course_name, semester_name = self._parse_entities(response.choices[0].message.parsed)
+
+        except Exception as e:
+            print("❌ Lỗi tách entity:", e)
+
+        return self._merge_entities(local, (program_name, course_name, semester_name))
 
 
 
     # ==========================
     # Lấy điều kiện tốt nghiệp chung
     # ==========================
+    def _graduation_chung_from_cache(self):
+        # chỉ phụ thuộc dữ liệu đồ thị → dùng lại đến khi phiên bản đồ thị đổi
+        if self._graduation_chung_version != self.graph_version:
+            return None
+        return self._graduation_chung
+
+    def _store_graduation_chung(self, data):
+        logger.info(f"🎓 Lấy {len(data)} điều kiện tốt nghiệp (toàn bộ CTĐT).")
+        if data:
+            self._graduation_chung = data
+            self._graduation_chung_version = self.graph_version
+        return data
+
     def get_dieu_kien_tot_nghiep_chung(self):
-        query = "*"  # tìm tất cả chương trình
-        cypher = """
-        CALL db.index.fulltext.queryNodes('ChuongTrinhDaoTao_full_text', $query)
-        YIELD node AS ctdt, score
-
-        OPTIONAL MATCH (dk:DieuKienTotNghiep)-[r:ĐOI_VOI]->(ctdt)
-
-        OPTIONAL MATCH (ctdt)-[rel:CO_CHUAN_NGOAI_NGU_DAU_RA_LA|CO_CHUAN_NGOAI_NGU_DAU_RA_TOI_THIEU_LA]->(lang)
-        WHERE lang IS NOT NULL
-
-        WITH 
-            ctdt, dk, r, score,
-            collect({
-                he: rel.he,
-                lang_type: HEAD(labels(lang)),
-                thong_tin_ngoai_ngu: CASE HEAD(labels(lang))
-                    WHEN 'TiengAnh' THEN {
-                        bac: lang.bac,
-                        Cambridge: lang.Cambridge,
-                        chung_chi: lang.chung_chi,
-                        IELTS: lang.IELTS,
-                        TOEFL_iBT: lang.TOEFL_iBT,
-                        TOEFL_ITP: lang.TOEFL_ITP,
-                        TOEIC: lang.TOEIC
-                    }
-                    WHEN 'TiengNhat' THEN {
-                        bac: lang.bac,
-                        chung_chi: lang.chung_chi,
-                        JLPT: lang.JLPT,
-                        NAT_TEST: lang.NAT_TEST,
-                        TOP_J: lang.TOP_J
-                    }
-                    WHEN 'TiengPhap' THEN {
-                        bac: lang.bac,
-                        chung_chi: lang.chung_chi,
-                        DELF_va_DALF: lang.DELF_va_DALF,
-                        TCF: lang.TCF
-                    }
-                    ELSE NULL
-                END
-            }) AS ngoai_ngu_list
-
-        RETURN 
-            ctdt.ten_chuong_trinh AS ten_chuong_trinh,
-            dk.quyet_dinh AS Quyet_dinh,
-            dk.dieu_kien_chung AS dieu_kien_chung,
-            coalesce(r.dieu_kien_rieng, "Không có yêu cầu riêng.") AS dieu_kien_rieng,
-            [x IN ngoai_ngu_list WHERE x.lang_type IS NOT NULL] AS ngoai_ngu_list,
-            score
-
-        ORDER BY score DESC, ten_chuong_trinh
-        """
-        with self.driver.session() as session:
-            result = session.run(cypher, {"query": query})
-            data = [r.data() for r in result]
+        data = self._graduation_chung_from_cache()
+        if data is None:
+            data = self._store_graduation_chung(self.run_program_query(DIEU_KIEN_TOT_NGHIEP_CHUNG_QUERY))
+        return data
 
-        logger.info(f"🎓 Lấy {len(data)} điều kiện tốt nghiệp (BM25).")
+    async def get_dieu_kien_tot_nghiep_chung_async(self):
+        data = self._graduation_chung_from_cache()
+        if data is None:
+            data = self._store_graduation_chung(await self.run_program_query_async(DIEU_KIEN_TOT_NGHIEP_CHUNG_QUERY))
         return data
 
     # ==========================
     # Lấy điều kiện tốt nghiệp CTĐT cụ thể
     # ==========================
-    def get_dieu_kien_tot_nghiep_ctdt(self, question: str):
-
-        bm25_results = self.bm25_search(question, limit=1)
-        if not bm25_results:
+    def _build_dieu_kien_tot_nghiep_ctdt(self, records, question):
+        if not records:
             logger.warning(f"⚠️ Không tìm thấy CTĐT cho truy vấn: {question}")
             return None
 
-        ten_ctdt = bm25_results[0]["ten_chuong_trinh"]
-
-
-        # 3️⃣ Truy vấn chi tiết node
-        cypher = """
-        CALL db.index.fulltext.queryNodes('ChuongTrinhDaoTao_full_text', $ten_ctdt)
-        YIELD node AS ctdt, score
-        WHERE toLower(ctdt.ten_chuong_trinh) CONTAINS toLower($ten_ctdt)
-
-        OPTIONAL MATCH (dk:DieuKienTotNghiep)-[r:ĐOI_VOI]->(ctdt)
-
-        OPTIONAL MATCH (ctdt)-[rel:CO_CHUAN_NGOAI_NGU_DAU_RA_LA]->(lang)
-
-        WITH 
-            ctdt, dk, r, score,
-            collect({
-                he: rel.he,
-                lang_type: HEAD(labels(lang)),
-                thong_tin_ngoai_ngu: CASE HEAD(labels(lang))
-                    WHEN 'TiengAnh' THEN {
-                        bac: lang.bac,
-                        Cambridge: lang.Cambridge,
-                        chung_chi: lang.chung_chi,
-                        IELTS: lang.IELTS,
-                        TOEFL_iBT: lang.TOEFL_iBT,
-                        TOEFL_ITP: lang.TOEFL_ITP,
-                        TOEIC: lang.TOEIC
-                    }
-                    WHEN 'TiengNhat' THEN {
-                        bac: lang.bac,
-                        chung_chi: lang.chung_chi,
-                        JLPT: lang.JLPT,
-                        NAT_TEST: lang.NAT_TEST,
-                        TOP_J: lang.TOP_J
-                    }
-                    WHEN 'TiengPhap' THEN {
-                        bac: lang.bac,
-                        chung_chi: lang.chung_chi,
-                        DELF_va_DALF: lang.DELF_va_DALF,
-                        TCF: lang.TCF
-                    }
-                    ELSE null
-                END
-            }) AS ngoai_ngu_list
-
-        RETURN 
-            ctdt.ten_chuong_trinh AS ten_chuong_trinh,
-            dk.quyet_dinh AS quyet_dinh,
-            dk.dieu_kien_chung AS dieu_kien_chung,
-            coalesce(r.dieu_kien_rieng, "Không có yêu cầu riêng.") AS dieu_kien_rieng,
-
-            [x IN ngoai_ngu_list WHERE x.he = "Cử nhân"] AS chuan_ngoai_ngu_cu_nhan,
-
-            [x IN ngoai_ngu_list WHERE x.he = "Kỹ sư"] AS chuan_ngoai_ngu_ky_su,
-
-            score
-        ORDER BY score DESC
-        LIMIT 1;
-        """
-        with self.driver.session() as session:
-                record = session.run(cypher, {"ten_ctdt": ten_ctdt}).single()
-
-        if not record:
-            logger.warning(f"⚠️ Không tìm thấy chi tiết CTĐT: {ten_ctdt}")
-            return None
-
+        record = records[0]
         data = {
             "ten_chuong_trinh": record["ten_chuong_trinh"],
             "quyet_dinh": record["quyet_dinh"],
@@ -352,74 +473,31 @@ class Neo4jHandler:
             "chuan_ngoai_ngu_ky_su": record["chuan_ngoai_ngu_ky_su"]
         }
 
-        logger.info(f"🎓 Lấy điều kiện tốt nghiệp cho CTĐT: {ten_ctdt}")
+        logger.info(f"🎓 Lấy điều kiện tốt nghiệp cho CTĐT: {data['ten_chuong_trinh']}")
         return data
 
+    def get_dieu_kien_tot_nghiep_ctdt(self, question: str):
+        # tìm CTĐT + lấy chi tiết trong cùng 1 truy vấn
+        records = self.run_query(DIEU_KIEN_TOT_NGHIEP_CTDT_QUERY, {"query": question})
+        return self._build_dieu_kien_tot_nghiep_ctdt(records, question)
+
+    async def get_dieu_kien_tot_nghiep_ctdt_async(self, question: str):
+        records = await self.run_query_async(DIEU_KIEN_TOT_NGHIEP_CTDT_QUERY, {"query": question})
+        return self._build_dieu_kien_tot_nghiep_ctdt(records, question)
+
     # ==========================
     # Lấy chuẩn ngoại ngữ đầu ra nói chung
     # ==========================
     def get_chuan_ngoai_ngu_dau_ra_chung(self):
-        query = """
-        MATCH (ctdt:ChuongTrinhDaoTao)
-
-        OPTIONAL MATCH (ctdt)-[rel:CO_CHUAN_NGOAI_NGU_DAU_RA_LA|CO_CHUAN_NGOAI_NGU_DAU_RA_TOI_THIEU_LA]->(lang)
-        WHERE lang IS NOT NULL
-
-        WITH 
-            ctdt,
-            collect({
-                he: rel.he,
-                lang_type: HEAD(labels(lang)),
-                thong_tin_ngoai_ngu: CASE HEAD(labels(lang))
-                    WHEN 'TiengAnh' THEN {
-                        bac: lang.bac,
-                        Cambridge: lang.Cambridge,
-                        chung_chi: lang.chung_chi,
-                        IELTS: lang.IELTS,
-                        TOEFL_iBT: lang.TOEFL_iBT,
-                        TOEFL_ITP: lang.TOEFL_ITP,
-                        TOEIC: lang.TOEIC
-                    }
-                    WHEN 'TiengNhat' THEN {
-                        bac: lang.bac,
-                        chung_chi: lang.chung_chi,
-                        JLPT: lang.JLPT,
-                        NAT_TEST: lang.NAT_TEST,
-                        TOP_J: lang.TOP_J
-                    }
-                    WHEN 'TiengPhap' THEN {
-                        bac: lang.bac,
-                        chung_chi: lang.chung_chi,
-                        DELF_va_DALF: lang.DELF_va_DALF,
-                        TCF: lang.TCF
-                    }
-                    ELSE NULL
-                END
-            }) AS ngoai_ngu_list
-
-        RETURN 
-            ctdt.ten_chuong_trinh AS ten_chuong_trinh,
-
-            [x IN ngoai_ngu_list 
-                WHERE x.lang_type IS NOT NULL AND x.he = "Cử nhân"] 
-                AS chuan_ngoai_ngu_cu_nhan,
-
-            [x IN ngoai_ngu_list 
-                WHERE x.lang_type IS NOT NULL AND x.he = "Kỹ sư"] 
-                AS chuan_ngoai_ngu_ky_su
-
-        ORDER BY ten_chuong_trinh;
-        """
-        with self.driver.session() as session:
-            result = session.run(query)
-            return [record.data() for record in result]
+        return self.run_program_query(CHUAN_NGOAI_NGU_DAU_RA_CHUNG_QUERY)
+
+    async def get_chuan_ngoai_ngu_dau_ra_chung_async(self):
+        return await self.run_program_query_async(CHUAN_NGOAI_NGU_DAU_RA_CHUNG_QUERY)
      # ==========================
     # Lấy chuẩn ngoại ngữ đầu ra của 1 chương trình đào tạo cụ thể
     # ==========================
 
-    def get_chuan_ngoai_ngu_dau_ra_cua_ctdt(self, question: str):
-
-        program_name, course_name, semester_name = self.extract_entities_from_question(question)
+    def _build_chuan_ngoai_ngu_ctdt(self, records, program_name):
         if not program_name:
             logger.warning(" Không tách được program_name từ câu hỏi")
             return {
@@ -429,68 +507,7 @@ class Neo4jHandler:
                 "score": 0.0
             }
 
-        # 2️⃣ Neo4j fulltext query dùng program_name
-
-        cypher = f"""
-        CALL db.index.fulltext.queryNodes('ChuongTrinhDaoTao_full_text', '{program_name}')
-        YIELD node AS ctdt, score
-        WHERE toLower(ctdt.ten_chuong_trinh) CONTAINS toLower('{program_name}')
-
-        OPTIONAL MATCH (ctdt)-[rel:CO_CHUAN_NGOAI_NGU_DAU_RA_LA|CO_CHUAN_NGOAI_NGU_DAU_RA_TOI_THIEU_LA]->(lang)
-
-        WITH 
-            ctdt, score,
-            collect({{
-                he: rel.he,
-                lang_type: HEAD(labels(lang)),
-                thong_tin_ngoai_ngu: CASE HEAD(labels(lang))
-                    WHEN 'TiengAnh' THEN {{
-                        bac: lang.bac,
-                        Cambridge: lang.Cambridge,
-                        chung_chi: lang.chung_chi,
-                        IELTS: lang.IELTS,
-                        TOEFL_iBT: lang.TOEFL_iBT,
-                        TOEFL_ITP: lang.TOEFL_ITP,
-                        TOEIC: lang.TOEIC
-                    }}
-                    WHEN 'TiengNhat' THEN {{
-                        bac: lang.bac,
-                        chung_chi: lang.chung_chi,
-                        JLPT: lang.JLPT,
-                        NAT_TEST: lang.NAT_TEST,
-                        TOP_J: lang.TOP_J
-                    }}
-                    WHEN 'TiengPhap' THEN {{
-                        bac: lang.bac,
-                        chung_chi: lang.chung_chi,
-                        DELF_va_DALF: lang.DELF_va_DALF,
-                        TCF: lang.TCF
-                    }}
-                    ELSE NULL
-                END
-            }}) AS ngoai_ngu_list
-
-        RETURN
-            ctdt.ten_chuong_trinh AS ten_chuong_trinh,
-
-            [x IN ngoai_ngu_list 
-                WHERE x.he = "Cử nhân" AND x.lang_type IS NOT NULL] 
-                AS chuan_ngoai_ngu_cu_nhan,
-
-            [x IN ngoai_ngu_list 
-                WHERE x.he = "Kỹ sư" AND x.lang_type IS NOT NULL] 
-                AS chuan_ngoai_ngu_ky_su,
-
-            score
-        ORDER BY score DESC
-        LIMIT 1
-        """
-
-        with self.driver.session() as session:
-            record = session.run(cypher).single()
-
-
-        if not record:
+        if not records:
             return {
                 "ten_chuong_trinh": program_name,
                 "chuan_ngoai_ngu_cu_nhan": [],
@@ -498,6 +515,7 @@ class Neo4jHandler:
                 "score": 0.0
             }
 
+        record = records[0]
         data = {
             "ten_chuong_trinh": record["ten_chuong_trinh"],
             "chuan_ngoai_ngu_cu_nhan": record["chuan_ngoai_ngu_cu_nhan"],
@@ -509,20 +527,31 @@ class Neo4jHandler:
 
         return data
 
+    def get_chuan_ngoai_ngu_dau_ra_cua_ctdt(self, question: str, understood=None):
+
+        program_name, course_name, semester_name = self.extract_entities_from_question(question, understood)
+        if not program_name:
+            return self._build_chuan_ngoai_ngu_ctdt([], program_name)
+
+        # 2️⃣ Neo4j fulltext query dùng program_name
+        records = self.run_program_query(CHUAN_NGOAI_NGU_CTDT_QUERY, {"program_name": program_name})
+        return self._build_chuan_ngoai_ngu_ctdt(records, program_name)
+
+    async def get_chuan_ngoai_ngu_dau_ra_cua_ctdt_async(self, question: str, understood=None):
+
+        program_name, course_name, semester_name = await self.extract_entities_from_question_async(question, understood)
+        if not program_name:
+            return self._build_chuan_ngoai_ngu_ctdt([], program_name)
+
+        records = await self.run_program_query_async(CHUAN_NGOAI_NGU_CTDT_QUERY, {"program_name": program_name})
+        return self._build_chuan_ngoai_ngu_ctdt(records, program_name)
+
 
      # ==========================
     # Lấy hỏi toiec bao nhiều thì tốt nghiệp (chung + chương trình đào tạo cụ thể)
     # ==========================
 
-    def query_language_requirement(self, question: str):
-        """
-        Truy vấn chuẩn đầu ra ngoại ngữ theo câu hỏi người dùng.
-        Pipeline:
-        1️⃣ Thực hiện fulltext search BM25 trên Neo4j
-        2️⃣ Thu thập dữ liệu ChuongTrinhDaoTao + NgoaiNgu
-        3️⃣ Lọc theo chứng chỉ người dùng hỏi (TOEIC, IELTS, ...)
-        """
-
+    def _detect_cert(self, question: str):
         cert_keywords = [
             "TOEIC","IELTS","TOEFL_iBT","TOEFL_ITP","Cambridge","chung_chi",
             "JLPT","NAT_TEST","TOP_J","DELF_va_DALF","TCF"
@@ -535,166 +564,57 @@ class Neo4jHandler:
                 break
         if not matched_cert:
             matched_cert = "TOEIC"  # default nếu không detect được
+        return matched_cert
 
-        cypher = """
-        CALL db.index.fulltext.queryNodes('NgoaiNgu_fulltext', $query)
-        YIELD node AS lang, score
-
-        OPTIONAL MATCH (ctdt:ChuongTrinhDaoTao)
-            -[rel:CO_CHUAN_NGOAI_NGU_DAU_RA_LA|CO_CHUAN_NGOAI_NGU_DAU_RA_TOI_THIEU_LA]->(lang)
-
-        WITH lang, ctdt, rel, score,
-            HEAD(labels(lang)) AS lang_type,
-            ctdt.ten_chuong_trinh AS thuoc_chuong_trinh,
-            rel.he AS he
-        WHERE thuoc_chuong_trinh IS NOT NULL
-
-        WITH thuoc_chuong_trinh, he, score, lang_type, COLLECT(lang) AS langs
-
-        WITH thuoc_chuong_trinh, he, score, lang_type,
-            CASE lang_type
-                WHEN 'TiengAnh' THEN {
-                    bac: [l IN langs | l.bac],
-                    Cambridge: [l IN langs | l.Cambridge],
-                    chung_chi: [l IN langs | l.chung_chi],
-                    IELTS: [l IN langs | l.IELTS],
-                    TOEFL_iBT: [l IN langs | l.TOEFL_iBT],
-                    TOEFL_ITP: [l IN langs | l.TOEFL_ITP],
-                    TOEIC: [l IN langs | l.TOEIC]
-                }
-                WHEN 'TiengNhat' THEN {
-                    bac: [l IN langs | l.bac],
-                    chung_chi: [l IN langs | l.chung_chi],
-                    JLPT: [l IN langs | l.JLPT],
-                    NAT_TEST: [l IN langs | l.NAT_TEST],
-                    TOP_J: [l IN langs | l.TOP_J]
-                }
-                WHEN 'TiengPhap' THEN {
-                    bac: [l IN langs | l.bac],
-                    chung_chi: [l IN langs | l.chung_chi],
-                    DELF_va_DALF: [l IN langs | l.DELF_va_DALF],
-                    TCF: [l IN langs | l.TCF]
-                }
-                ELSE NULL
-            END AS thong_tin
-
-        RETURN 
-            thuoc_chuong_trinh,
-            he,
-            score,
-            lang_type,
-            thong_tin
-        ORDER BY score DESC;
-
-        """
+    def _build_language_requirement(self, results, matched_cert):
+        data = []
+        for record in results:
+            chuong_trinh = record["thuoc_chuong_trinh"]
+            lang_type = record["lang_type"]
+            thong_tin = record["thong_tin"]
+            score = record["score"]
 
-        with self.driver.session() as session:
-            results = session.run(cypher, {"query": question})
-
-            data = []
-            for record in results:
-                chuong_trinh = record["thuoc_chuong_trinh"]
-                lang_type = record["lang_type"]
-                thong_tin = record["thong_tin"]
-                score = record["score"]
-
-                if not thong_tin:
-                    continue
+            if not thong_tin:
+                continue
 
-                # Lọc chỉ giữ chứng chỉ matched_cert
-                cert_data = thong_tin.get(matched_cert, [])
-                if not cert_data:
-                    continue
+            # Lọc chỉ giữ chứng chỉ matched_cert
+            cert_data = thong_tin.get(matched_cert, [])
+            if not cert_data:
+                continue
 
-                # Loại trùng, bỏ None
-                cert_data = list(set([v for v in cert_data if v is not None]))
+            # Loại trùng, bỏ None
+            cert_data = list(set([v for v in cert_data if v is not None]))
 
-                data.append({
-                    "chuong_trinh": chuong_trinh,
-                    "ngon_ngu": lang_type,
-                    "cert": cert_data,
-                    "score": score
-                })
+            data.append({
+                "chuong_trinh": chuong_trinh,
+                "ngon_ngu": lang_type,
+                "cert": cert_data,
+                "score": score
+            })
 
         logger.info(f"🎓 Lấy {len(data)} kết quả chuẩn ngoại ngữ cho chứng chỉ {matched_cert}.")
         return data, matched_cert
+
+    def query_language_requirement(self, question: str):
+        """
+        Truy vấn chuẩn đầu ra ngoại ngữ theo câu hỏi người dùng.
+        Pipeline:
+        1️⃣ Thực hiện fulltext search BM25 trên Neo4j
+        2️⃣ Thu thập dữ liệu ChuongTrinhDaoTao + NgoaiNgu
+        3️⃣ Lọc theo chứng chỉ người dùng hỏi (TOEIC, IELTS, ...)
+        """
+        matched_cert = self._detect_cert(question)
+        results = self.run_query(LANGUAGE_REQUIREMENT_QUERY, {"query": question})
+        return self._build_language_requirement(results, matched_cert)
+
+    async def query_language_requirement_async(self, question: str):
+        matched_cert = self._detect_cert(question)
+        results = await self.run_query_async(LANGUAGE_REQUIREMENT_QUERY, {"query": question})
+        return self._build_language_requirement(results, matched_cert)
     # ==========================
     # hỏi Khung năng lực ngoại ngữ là gì và hung năng lưc ngoại ngữ gồm các bậc nào?
     # ==========================
-    def get_khung_nang_luc_ngoai_ngu(self):
-        cypher = """
-        CALL db.index.fulltext.queryNodes("ft_khung_nang_luc", "khung năng lực ngoại ngữ")
-        YIELD node AS khung, score
-        OPTIONAL MATCH (khung)-[:BAO_GOM]->(lang)
-        WITH khung, score, collect(lang) AS langs
-
-        UNWIND langs AS l
-        WITH khung, score, HEAD(labels(l)) AS lang_type, l
-        WITH khung, score, lang_type, collect(l) AS group_langs
-
-        WITH khung, score, collect(
-        CASE lang_type
-            WHEN 'TiengAnh' THEN {
-            lang_type: lang_type,
-            thong_tin: {
-                bac: [x IN group_langs | x.bac],
-                Cambridge: [x IN group_langs | x.Cambridge],
-                chung_chi: [x IN group_langs | x.chung_chi],
-                IELTS: [x IN group_langs | x.IELTS],
-                TOEFL_iBT: [x IN group_langs | x.TOEFL_iBT],
-                TOEFL_ITP: [x IN group_langs | x.TOEFL_ITP],
-                TOEIC: [x IN group_langs | x.TOEIC]
-            }
-            }
-            WHEN 'TiengNhat' THEN {
-            lang_type: lang_type,
-            thong_tin: {
-                bac: [x IN group_langs | x.bac],
-                chung_chi: [x IN group_langs | x.chung_chi],
-                JLPT: [x IN group_langs | x.JLPT],
-                NAT_TEST: [x IN group_langs | x.NAT_TEST],
-                TOP_J: [x IN group_langs | x.TOP_J]
-            }
-            }
-            WHEN 'TiengPhap' THEN {
-            lang_type: lang_type,
-            thong_tin: {
-                bac: [x IN group_langs | x.bac],
-                chung_chi: [x IN group_langs | x.chung_chi],
-                DELF_va_DALF: [x IN group_langs | x.DELF_va_DALF],
-                TCF: [x IN group_langs | x.TCF]
-            }
-            }
-            WHEN 'TiengTrung' THEN {
-            lang_type: lang_type,
-            thong_tin: {
-                bac: [x IN group_langs | x.bac],
-                chung_chi: [x IN group_langs | x.chung_chi],
-                HSK: [x IN group_langs | x.HSK],
-                TOCFL: [x IN group_langs | x.TOCFL]
-            }
-            }
-            ELSE {
-            lang_type: lang_type,
-            thong_tin: {
-                bac: [x IN group_langs | x.bac],
-                chung_chi: [x IN group_langs | x.chung_chi]
-            }
-            }
-        END
-        ) AS cac_ngon_ngu
-
-        RETURN {
-        khung: {khai_niem: khung.khai_niem},
-        cac_ngon_ngu: [nn IN cac_ngon_ngu WHERE nn IS NOT NULL],
-        score: score
-        } AS info
-        ORDER BY score DESC;
-        """
-
-        with self.driver.session() as session:
-            raw_data = [r["info"] for r in session.run(cypher)]
-
+    def _build_khung_nang_luc(self, raw_data):
         # --- Sắp xếp theo lang_type và bậc ---
         sorted_data = []
         lang_order = ["TiengAnh", "TiengPhap", "TiengNhat", "TiengTrung"]
@@ -723,74 +643,19 @@ class Neo4jHandler:
             "score": raw_data[0]["score"]
         }
 
+    def get_khung_nang_luc_ngoai_ngu(self):
+        raw_data = [r["info"] for r in self.run_program_query(KHUNG_NANG_LUC_NGOAI_NGU_QUERY)]
+        return self._build_khung_nang_luc(raw_data)
+
+    async def get_khung_nang_luc_ngoai_ngu_async(self):
+        raw_data = [r["info"] for r in await self.run_program_query_async(KHUNG_NANG_LUC_NGOAI_NGU_QUERY)]
+        return self._build_khung_nang_luc(raw_data)
+
     # ==========================
     # hỏi Chương trình đào tạo là gì, đại cương, tự do phải học trong chương trình đào tạo?
     # chương trình đào tạo có những môn gì ? Số tín chỉ của chương trình đào tạo
     # ==========================
-    def get_course(self, question: str):
-
-        logger.debug(f"🔎 get_course question = {question}")
-
-        program_name, course_name, semester_name = self.extract_entities_from_question(question)
-
-        if not program_name:
-            logger.warning("⚠️ Không trích xuất được tên chương trình đào tạo")
-            return []
-
-        cypher = """
-        MATCH (hp)-[r:THUOC]->(ctdt:ChuongTrinhDaoTao {ten_chuong_trinh: $program_name})
-        OPTIONAL MATCH (ctdt)-[:THUOC]->(k:Khoa)
-
-        WITH
-            ctdt,
-            k,
-            CASE
-                WHEN r.he = 'Kỹ sư' THEN 'Kỹ sư'
-                ELSE 'Cử nhân'
-            END AS he,
-            hp,
-            r
-
-        WITH
-            ctdt,
-            k,
-            he,
-            COLLECT({
-                loai: labels(hp)[0],
-                ten: hp.ten_mon,
-                ma_hoc_phan: hp.ma_hoc_phan,
-                he: r.he,
-                so_tin_chi: hp.so_tin_chi
-            }) AS danh_sach_hoc_phan
-
-        RETURN
-            ctdt.ten_chuong_trinh AS ten_chuong_trinh,
-
-            k.ten_khoa AS ten_khoa,
-            ctdt.khoa AS khoa,
-            ctdt.noi_dung AS noi_dung,
-
-            ctdt.tong_so_tin_chi_yeu_cau_doi_voi_ky_su AS tong_so_tin_chi_yeu_cau_doi_voi_ky_su,
-            ctdt.so_tin_chi_bat_buoc_doi_voi_ky_su AS so_tin_chi_bat_buoc_doi_voi_ky_su,
-            ctdt.so_tin_chi_tu_chon_doi_voi_ky_su AS so_tin_chi_tu_chon_doi_voi_ky_su,
-
-            ctdt.tong_so_tin_chi_yeu_cau_doi_voi_cu_nhan AS tong_so_tin_chi_yeu_cau_doi_voi_cu_nhan,
-            ctdt.so_tin_chi_bat_buoc_doi_voi_cu_nhan AS so_tin_chi_bat_buoc_doi_voi_cu_nhan,
-            ctdt.so_tin_chi_tu_chon_doi_voi_cu_nhan AS so_tin_chi_tu_chon_doi_voi_cu_nhan,
-
-            he,
-            size(danh_sach_hoc_phan) AS tong_so_hoc_phan,
-            danh_sach_hoc_phan
-
-        ORDER BY he
-        """
-
-        with self.driver.session() as session:
-            result = session.run(cypher, {
-                "program_name": program_name
-            })
-            records = [r.data() for r in result]
-
+    def _build_course_output(self, records):
         if not records:
             return []
 
@@ -824,42 +689,35 @@ class Neo4jHandler:
 
         return final_output
 
+    def get_course(self, question: str, understood=None):
 
-    # Hỏi về nhưng học phần học trong học kỳ bất kỳ 
-    def get_hoc_phan_theo_hoc_ky_ctdt(self, question: str):
-        logger.debug(f"🔎 get_hoc_phan_theo_hoc_ky_ctdt question = {question}")
+        logger.debug(f"🔎 get_course question = {question}")
 
-        program_name, course_name, semester_name = self.extract_entities_from_question(question)
+        program_name, course_name, semester_name = self.extract_entities_from_question(question, understood)
 
         if not program_name:
-            logger.warning("⚠️ Thiếu tên chương trình đào tạo")
+            logger.warning("⚠️ Không trích xuất được tên chương trình đào tạo")
             return []
 
-        cypher = """
-        MATCH (c:ChuongTrinhDaoTao {ten_chuong_trinh: $program_name})
-        <-[:THUOC]-(hp)
-        -[:SE_HOC_TRONG]->(hk:HocKy)
-        WHERE
-            hp:HocPhanDaiCuong
-        OR hp:HocPhanTienQuyet
-        OR hp:HocPhanSongHanh
-        OR hp:HocPhanKeTiep
-        OR hp:HocPhanTuDo
-        RETURN DISTINCT
-            hp.ten_mon AS ten_mon,
-            hp.ma_hoc_phan AS ma_hoc_phan,
-            hp.so_tin_chi AS so_tin_chi,
-            hk.ten_hoc_ky AS ten_hoc_ky,
-            c.ten_chuong_trinh AS ten_chuong_trinh
-        ORDER BY hk.ten_hoc_ky, hp.ten_mon
-        """
+        records = self.run_program_query(COURSE_QUERY, {"program_name": program_name})
+        return self._build_course_output(records)
 
-        with self.driver.session() as session:
-            result = session.run(cypher, {
-                "program_name": program_name
-            })
-            records = [r.data() for r in result]
-        
+    async def get_course_async(self, question: str, understood=None):
+
+        logger.debug(f"🔎 get_course question = {question}")
+
+        program_name, course_name, semester_name = await self.extract_entities_from_question_async(question, understood)
+
+        if not program_name:
+            logger.warning("⚠️ Không trích xuất được tên chương trình đào tạo")
+            return []
+
+        records = await self.run_program_query_async(COURSE_QUERY, {"program_name": program_name})
+        return self._build_course_output(records)
+
+
+    # Hỏi về nhưng học phần học trong học kỳ bất kỳ
+    def _build_hoc_phan_theo_hoc_ky(self, records, program_name):
         print("🟢 Neo4j RAW RESULT:")
         for r in records:
             print(r)
@@ -886,6 +744,30 @@ class Neo4jHandler:
 
         return final_output
 
+    def get_hoc_phan_theo_hoc_ky_ctdt(self, question: str, understood=None):
+        logger.debug(f"🔎 get_hoc_phan_theo_hoc_ky_ctdt question = {question}")
+
+        program_name, course_name, semester_name = self.extract_entities_from_question(question, understood)
+
+        if not program_name:
+            logger.warning("⚠️ Thiếu tên chương trình đào tạo")
+            return []
+
+        records = self.run_program_query(HOC_PHAN_THEO_HOC_KY_QUERY, {"program_name": program_name})
+        return self._build_hoc_phan_theo_hoc_ky(records, program_name)
+
+    async def get_hoc_phan_theo_hoc_ky_ctdt_async(self, question: str, understood=None):
+        logger.debug(f"🔎 get_hoc_phan_theo_hoc_ky_ctdt question = {question}")
+
+        program_name, course_name, semester_name = await self.extract_entities_from_question_async(question, understood)
+
+        if not program_name:
+            logger.warning("⚠️ Thiếu tên chương trình đào tạo")
+            return []
+
+        records = await self.run_program_query_async(HOC_PHAN_THEO_HOC_KY_QUERY, {"program_name": program_name})
+        return self._build_hoc_phan_theo_hoc_ky(records, program_name)
+
 
     # ==========================
     # Hỏi về danh sách chương trình đào tạo
@@ -898,146 +780,123 @@ class Neo4jHandler:
         - ma_chuong_trinh
         - tong_so_tin_chi_yeu_cau
         """
+        return self.run_program_query(LIST_COURSE_QUERY)
 
-        cypher = """
-            MATCH (ct:ChuongTrinhDaoTao)
-            RETURN 
-                ct.ten_chuong_trinh AS ten_chuong_trinh,
-                ct.khoa AS Khoa,
-                ct.ma_chuong_trinh AS ma_chuong_trinh,
-                ct.tong_so_tin_chi_yeu_cau_doi_voi_ky_su AS tong_so_tin_chi_yeu_cau_doi_voi_ky_su,
-                ct.so_tin_chi_bat_buoc_doi_voi_ky_su AS so_tin_chi_bat_buoc_doi_voi_ky_su,
-                ct.so_tin_chi_tu_chon_doi_voi_ky_su AS so_tin_chi_tu_chon_doi_voi_ky_su,
-                ct.tong_so_tin_chi_yeu_cau_doi_voi_cu_nhan AS tong_so_tin_chi_yeu_cau_doi_voi_cu_nhan,
-                ct.so_tin_chi_bat_buoc_doi_voi_cu_nhan AS so_tin_chi_bat_buoc_doi_voi_cu_nhan,
-                ct.so_tin_chi_tu_chon_doi_voi_cu_nhan AS so_tin_chi_tu_chon_doi_voi_cu_nhan
-        """
-
-        with self.driver.session() as session:
-            result = session.run(cypher)
-            data_raw = [r.data() for r in result]
-
-        return data_raw
+    async def get_list_course_async(self):
+        return await self.run_program_query_async(LIST_COURSE_QUERY)
     # ==========================
     # Hỏi về học phần tiên quyết của chương trình đào tạo
     # ==========================
-    def get_tien_quyet(self, question: str):
-
-        logger.debug(f"🔎 get_tien_quyet question = {question}")
-
-        program_name, course_name, semester_name = self.extract_entities_from_question(question)
-
-        if not program_name:
-            logger.warning("⚠️ Thiếu tên chương trình đào tạo")
-            return []
-
-        cypher = """
-        MATCH (c:ChuongTrinhDaoTao {ten_chuong_trinh: $program_name})
-        <-[:THUOC]-(tq)
-        -[:LA_HOC_PHAN_TIEN_QUYET_CUA]->(hp)-[:THUOC]->(c)
-        WHERE
-            tq:HocPhanDaiCuong
-            OR tq:HocPhanTienQuyet
-            OR tq:HocPhanSongHanh
-            OR tq:HocPhanKeTiep
-            OR tq:HocPhanTuDo
-        RETURN DISTINCT
-            c.ten_chuong_trinh AS ten_chuong_trinh,
-            tq.ten_mon AS ten_hoc_phan_tien_quyet,
-            labels(tq) AS labels_tq,
-            tq.ma_hoc_phan AS ma_hoc_phan_tien_quyet,
-            tq.so_tin_chi AS so_tin_chi_tien_quyet,
-            hp.ten_mon AS ten_hoc_phan_bi_tien_quyet,
-            hp.ma_hoc_phan AS ma_hoc_phan_bi_tien_quyet,
-            labels(hp) AS labels_hp
-        ORDER BY tq.ten_mon, hp.ten_mon
-        """
-
-        with self.driver.session() as session:
-            result = session.run(cypher, {
-                "program_name": program_name
-            })
-            records = [r.data() for r in result]
-
+    def _prerequisite_graph_from_cache(self, program_name):
+        # đồ thị đổi phiên bản → bỏ toàn bộ đồ thị tiên quyết đã dựng
+        if self._prerequisite_graphs_version != self.graph_version:
+            self._prerequisite_graphs.clear()
+            self._prerequisite_graphs_version = self.graph_version
+        return self._prerequisite_graphs.get(program_name)
+
+    def _store_prerequisite_graph(self, program_name, records):
         print("🟢 Neo4j RAW RESULT:")
         for r in records:
             print(r)
 
-        if not records:
+        graph = PrerequisiteGraph(program_name, records)
+        self._prerequisite_graphs[program_name] = graph
+        logger.info(f"📚 Dựng đồ thị tiên quyết {program_name}: {len(graph)} học phần, {graph.edge_count} quan hệ.")
+        return graph
+
+    def get_prerequisite_graph(self, program_name):
+        graph = self._prerequisite_graph_from_cache(program_name)
+        if graph is None:
+            records = self.run_program_query(TIEN_QUYET_QUERY, {"program_name": program_name})
+            graph = self._store_prerequisite_graph(program_name, records)
+        return graph
+
+    async def get_prerequisite_graph_async(self, program_name):
+        graph = self._prerequisite_graph_from_cache(program_name)
+        if graph is None:
+            records = await self.run_program_query_async(TIEN_QUYET_QUERY, {"program_name": program_name})
+            graph = self._store_prerequisite_graph(program_name, records)
+        return graph
+
+    @staticmethod
+    def _course_in_program(records, course_name):
+        # khớp chính xác hoặc không dấu, giống PrerequisiteGraph.index_of
+        folded = fold_vietnamese(course_name)
+        return any(r["ten_mon"] == course_name or fold_vietnamese(r["ten_mon"]) == folded for r in records)
+
+    def _build_tien_quyet(self, graph, course_name, in_program=False):
+        """
+        in_program: học phần được hỏi có thuộc CTĐT không (chỉ dùng khi học phần không có trong đồ thị tiên quyết).
+        """
+        if not len(graph):
             return []
 
         # =====================
         # Chuẩn hóa output
+        # - Có tên học phần: chỉ gửi chuỗi tiên quyết / phụ thuộc của học phần đó
+        # - Không có: gửi toàn bộ quan hệ + danh sách học phần tiên quyết chính thức
         # =====================
 
         final_output = {
-            "ten_chuong_trinh": program_name,
+            "ten_chuong_trinh": graph.program_name,
+            "hoc_phan_hoi": None,
             "danh_sach_tien_quyet": []
         }
 
-        seen = set()
-
-        for r in records:
-            key = (
-                r.get("ten_hoc_phan_tien_quyet"),
-                r.get("ten_hoc_phan_bi_tien_quyet")
-            )
-
-            if key in seen:
-                continue
-            seen.add(key)
+        idx = graph.index_of(course_name)
 
-            final_output["danh_sach_tien_quyet"].append({
-                "hoc_phan_tien_quyet": r.get("ten_hoc_phan_tien_quyet"),
-                "ma_hoc_phan_tien_quyet": r.get("ma_hoc_phan_tien_quyet"),
-                "loai_hoc_phan_cua_hoc_phan_tien_quyet":  r.get("labels_tq"),
-                "so_tin_chi_tien_quyet": r.get("so_tin_chi_tien_quyet"),
-                "hoc_phan_bi_tien_quyet": r.get("ten_hoc_phan_bi_tien_quyet"),
-                "ma_hoc_phan_bi_tien_quyet": r.get("ma_hoc_phan_bi_tien_quyet"),
-                "loai_hoc_phan_cua_hoc_phan_bi_tien_quyet":  r.get("labels_hp"),
-                "quan_he": "là học phần tiên quyết của"
-            })
+        if idx is not None:
+            final_output["hoc_phan_hoi"] = {"co_trong_ctdt": True, "co_quan_he_tien_quyet": True,
+                                            **graph.course_summary(idx)}
+            final_output["danh_sach_tien_quyet"] = graph.subgraph_edges(idx)
+        else:
+            if course_name:
+                # không có trong đồ thị = không có quan hệ tiên quyết nào, chưa chắc không thuộc CTĐT
+                final_output["hoc_phan_hoi"] = {"co_trong_ctdt": in_program, "co_quan_he_tien_quyet": False,
+                                                "ten": course_name}
+            final_output["hoc_phan_tien_quyet_chinh_thuc"] = [graph.names[i] for i in graph.official_prerequisites()]
+            final_output["danh_sach_tien_quyet"] = graph.edges()
 
         return final_output
 
-     # ==========================
-    # Hỏi về học phần song hành của chương trình đào tạo
-    # ==========================
-    def get_song_hanh(self, question: str):
+    def get_tien_quyet(self, question: str, understood=None):
 
-        logger.debug(f"🔎 get_song_hanh(): question='{question}'")
+        logger.debug(f"🔎 get_tien_quyet question = {question}")
 
-        program_name, course_name, semester_name = self.extract_entities_from_question(question)
+        program_name, course_name, semester_name = self.extract_entities_from_question(question, understood)
 
         if not program_name:
-            return "Bạn chưa cung cấp tên chương trình đào tạo."
+            logger.warning("⚠️ Thiếu tên chương trình đào tạo")
+            return []
 
-        cypher = """
-        MATCH (c:ChuongTrinhDaoTao {ten_chuong_trinh: $program_name})
-            <-[:THUOC]-(hp1)-[:LA_HOC_PHAN_SONG_HANH_VOI]->(hp2)-[:THUOC]->(c)
-
-        OPTIONAL MATCH (c)<-[:THUOC]-(tq1)-[:LA_HOC_PHAN_TIEN_QUYET_CUA]->(hp1)
-        OPTIONAL MATCH (c)<-[:THUOC]-(tq2)-[:LA_HOC_PHAN_TIEN_QUYET_CUA]->(hp2)
-
-        RETURN
-            c.ten_chuong_trinh AS ten_chuong_trinh,
-            hp1.ten_mon AS hoc_phan_1,
-            labels(hp1) AS labels_hp1,
-            hp1.ma_hoc_phan AS ma_hoc_hoc_phan_1,
-            hp1.so_tin_chi AS so_tin_chi_hoc_phan_1,
-            hp2.ten_mon AS hoc_phan_2,
-            labels(hp2) AS labels_hp2,
-            hp2.ma_hoc_phan AS ma_hoc_hoc_phan_2,
-            hp2.so_tin_chi AS so_tin_chi_hoc_phan_2,
-            collect(DISTINCT tq1.ten_mon) AS tien_quyet_hp1,
-            collect(DISTINCT tq2.ten_mon) AS tien_quyet_hp2
-        ORDER BY hoc_phan_1, hoc_phan_2
-        """
+        graph = self.get_prerequisite_graph(program_name)
+        in_program = False
+        if course_name and len(graph) and graph.index_of(course_name) is None:
+            records = self.run_program_query(HOC_PHAN_CTDT_QUERY, {"program_name": program_name})
+            in_program = self._course_in_program(records, course_name)
+        return self._build_tien_quyet(graph, course_name, in_program)
 
-        with self.driver.session() as session:
-            result = session.run(cypher, {"program_name": program_name})
-            rows = [r.data() for r in result]
+    async def get_tien_quyet_async(self, question: str, understood=None):
 
+        logger.debug(f"🔎 get_tien_quyet question = {question}")
+
+        program_name, course_name, semester_name = await self.extract_entities_from_question_async(question, understood)
+
+        if not program_name:
+            logger.warning("⚠️ Thiếu tên chương trình đào tạo")
+            return []
+
+        graph = await self.get_prerequisite_graph_async(program_name)
+        in_program = False
+        if course_name and len(graph) and graph.index_of(course_name) is None:
+            records = await self.run_program_query_async(HOC_PHAN_CTDT_QUERY, {"program_name": program_name})
+            in_program = self._course_in_program(records, course_name)
+        return self._build_tien_quyet(graph, course_name, in_program)
+
+     # ==========================
+    # Hỏi về học phần song hành của chương trình đào tạo
+    # ==========================
+    def _build_song_hanh(self, rows, program_name):
         if not rows:
             return f"Trong chương trình đào tạo {program_name}, không có học phần song hành."
 
@@ -1082,7 +941,26 @@ class Neo4jHandler:
 
         return final_output
 
+    def get_song_hanh(self, question: str, understood=None):
+
+        logger.debug(f"🔎 get_song_hanh(): question='{question}'")
+
+        program_name, course_name, semester_name = self.extract_entities_from_question(question, understood)
 
+        if not program_name:
+            return "Bạn chưa cung cấp tên chương trình đào tạo."
+
+        rows = self.run_program_query(SONG_HANH_QUERY, {"program_name": program_name})
+        return self._build_song_hanh(rows, program_name)
 
-         
+    async def get_song_hanh_async(self, question: str, understood=None):
+
+        logger.debug(f"🔎 get_song_hanh(): question='{question}'")
+
+        program_name, course_name, semester_name = await self.extract_entities_from_question_async(question, understood)
+
+        if not program_name:
+            return "Bạn chưa cung cấp tên chương trình đào tạo."
 
+        rows = await self.run_program_query_async(SONG_HANH_QUERY, {"program_name": program_name})
+        return self._build_song_hanh(rows, program_name)
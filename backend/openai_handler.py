@@ -1,16 +1,131 @@
 
 # backend/openai_handler.py
 from backend.config import client
-import json
+from backend.prompt_serializer import to_table, to_fields, count_message_tokens, count_message_tokens_async
+from backend.metrics import llm_call
+from openai import AsyncOpenAI
 from collections import OrderedDict
+import logging
 
+logger = logging.getLogger(__name__)
+
+
+# Client async dùng chung cấu hình (api key, base url, timeout) với client sync trong config
+async_client = AsyncOpenAI(
+    api_key=client.api_key,
+    organization=client.organization,
+    base_url=client.base_url,
+    timeout=client.timeout,
+    max_retries=client.max_retries
+)
+
+
+def _gpt_error_reply(e):
+    print("❌ Lỗi GPT:", e)
+    return "Xin lỗi, hệ thống gặp lỗi khi xử lý câu hỏi."
 
 
 class OpenAIHandler:
     def __init__(self):
         self.client = client  # gán client từ config
+        self.async_client = async_client
         self.model_embedding = "text-embedding-3-small"
         self.model_reasoning = "gpt-4o-mini"
+        # (dữ liệu, văn bản) điều kiện tốt nghiệp chung đã dựng gần nhất
+        self._graduation_chung_context = (None, None)
+
+    async def warm_async(self):
+        # mở sẵn kết nối HTTPS tới API (DNS + TLS) → câu hỏi đầu tiên không chịu thêm độ trễ bắt tay
+        await self.async_client.models.list()
+
+    # ---------- Gọi LLM (dùng chung cho sync / async) ----------
+    def _llm_request(self, model, messages, temperature, on_error=None):
+        """
+        Đóng gói 1 lần gọi chat completion để có thể chạy sync hoặc async.
+        - on_error: hàm nhận exception và trả về câu trả lời thay thế (None → ném lỗi)
+        - prompt_tokens: số token prompt, đếm lúc thực thi (bản async không đếm trên event loop)
+        """
+        return {
+            "params": {
+                "model": model,
+                "messages": messages,
+                "temperature": temperature
+            },
+            "on_error": on_error,
+            "prompt_tokens": None
+        }
+
+    @staticmethod
+    def _log_prompt_tokens(request, prompt_tokens):
+        request["prompt_tokens"] = prompt_tokens
+        logger.info(f"🧮 Prompt {request['params']['model']}: {prompt_tokens} token")
+
+    def complete(self, request):
+        """
+        Thực thi request tạo bởi các hàm *_request.
+        Nếu request là chuỗi → đó là câu trả lời sẵn, không cần gọi LLM.
+        """
+        if isinstance(request, str):
+            return request
+
+        params = request["params"]
+        self._log_prompt_tokens(request, count_message_tokens(params["messages"], params["model"]))
+        try:
+            with llm_call("answer", request["params"]["model"]) as call:
+                response = self.client.chat.completions.create(**request["params"])
+                call.record_usage(response.usage)
+        except Exception as e:
+            if request.get("on_error") is None:
+                raise
+            return request["on_error"](e)
+
+        return response.choices[0].message.content.strip()
+
+    async def complete_async(self, request):
+        if isinstance(request, str):
+            return request
+
+        params = request["params"]
+        self._log_prompt_tokens(request, await count_message_tokens_async(params["messages"], params["model"]))
+        try:
+            with llm_call("answer", request["params"]["model"]) as call:
+                response = await self.async_client.chat.completions.create(**request["params"])
+                call.record_usage(response.usage)
+        except Exception as e:
+            if request.get("on_error") is None:
+                raise
+            return request["on_error"](e)
+
+        return response.choices[0].message.content.strip()
+
+    async def stream_async(self, request):
+        """
+        Stream từng đoạn token của câu trả lời (dùng cho SSE /chat/stream).
+        Request dạng chuỗi được trả về nguyên trong 1 lần.
+        """
+        if isinstance(request, str):
+            yield request
+            return
+
+        params = request["params"]
+        self._log_prompt_tokens(request, await count_message_tokens_async(params["messages"], params["model"]))
+        try:
+            with llm_call("answer", request["params"]["model"]) as call:
+                # include_usage: chunk cuối (không có choices) mang số token
+                stream = await self.async_client.chat.completions.create(
+                    **request["params"], stream=True, stream_options={"include_usage": True}
+                )
+                async for chunk in stream:
+                    if not chunk.choices:
+                        call.record_usage(getattr(chunk, "usage", None))
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        yield delta
+        except Exception as e:
+            if request.get("on_error") is None:
+                raise
+            yield request["on_error"](e)
 
     # ---------- Embedding ----------
     def create_embedding(self, text):
@@ -20,12 +135,35 @@ class OpenAIHandler:
         )
         return response.data[0].embedding
 
+    async def create_embedding_async(self, text):
+        response = await self.async_client.embeddings.create(
+            model=self.model_embedding,
+            input=text
+        )
+        return response.data[0].embedding
+
     # ---------- Summarization ----------
     def summarize_graduation_conditions_chung(self, data, question):
+        return self.complete(self.summarize_graduation_conditions_chung_request(data, question))
 
-        if not data:
-            return "Hiện chưa có dữ liệu điều kiện tốt nghiệp trong hệ thống."
+    async def summarize_graduation_conditions_chung_async(self, data, question):
+        return await self.complete_async(self.summarize_graduation_conditions_chung_request(data, question))
+
+    def _graduation_conditions_chung_context(self, data):
+        """
+        Văn bản điều kiện tốt nghiệp chung dựng từ dữ liệu mọi CTĐT.
+        Neo4jHandler trả về cùng 1 list cho tới khi đồ thị đổi phiên bản
+        → chỉ dựng lại khi nhận list khác.
+        """
+        cached_data, formatted = self._graduation_chung_context
+        if cached_data is data:
+            return formatted
+
+        formatted = self._format_graduation_conditions_chung(data)
+        self._graduation_chung_context = (data, formatted)
+        return formatted
 
+    def _format_graduation_conditions_chung(self, data):
         if isinstance(data, dict):
             data = [data]
 
@@ -111,6 +249,15 @@ class OpenAIHandler:
 
             formatted += "\n"
 
+        return formatted
+
+    def summarize_graduation_conditions_chung_request(self, data, question):
+
+        if not data:
+            return "Hiện chưa có dữ liệu điều kiện tốt nghiệp trong hệ thống."
+
+        formatted = self._graduation_conditions_chung_context(data)
+
         # -------- PROMPT GPT --------
         prompt = f"""
         Người dùng hỏi: "{question}"
@@ -128,27 +275,28 @@ class OpenAIHandler:
         - Văn phong ngắn gọn, rõ ràng.
         """
 
-        try:
-            response = client.chat.completions.create(
-                model=self.model_reasoning,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "Bạn là trợ lý học vụ, trả lời điều kiện tốt nghiệp chung chuẩn học thuật."
-                    },
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.2
-            )
-
-            return response.choices[0].message.content.strip()
-
-        except Exception as e:
-            return formatted + f"\n\nLỗi GPT: {str(e)}"
+        return self._llm_request(
+            model=self.model_reasoning,
+            messages=[
+                {
+                    "role": "system",
+                    "content": "Bạn là trợ lý học vụ, trả lời điều kiện tốt nghiệp chung chuẩn học thuật."
+                },
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.2,
+            on_error=lambda e: formatted + f"\n\nLỗi GPT: {str(e)}"
+        )
 
         
     #Hàm hỏi về điều kiện tốt nghiệp riêng của 1 chương trình cụ thể?
     def summarize_graduation_conditions_ctdt(self, data: dict, question: str):
+        return self.complete(self.summarize_graduation_conditions_ctdt_request(data, question))
+
+    async def summarize_graduation_conditions_ctdt_async(self, data: dict, question: str):
+        return await self.complete_async(self.summarize_graduation_conditions_ctdt_request(data, question))
+
+    def summarize_graduation_conditions_ctdt_request(self, data: dict, question: str):
 
         if not data:
             return "Xin lỗi, tôi không tìm thấy thông tin điều kiện tốt nghiệp cho chương trình đào tạo này."
@@ -185,8 +333,8 @@ class OpenAIHandler:
     Chỉ trả về nội dung câu trả lời cho sinh viên.
     """
 
-        response = self.client.chat.completions.create(
-            model=self.model_reasoning,   
+        return self._llm_request(
+            model=self.model_reasoning,
             messages=[
                 {"role": "system", "content": "Bạn là trợ lý học vụ."},
                 {"role": "user", "content": prompt}
@@ -194,11 +342,15 @@ class OpenAIHandler:
             temperature=0.3
         )
 
-        return response.choices[0].message.content.strip()
-
 
     #Hàm toán tắt riêng cho câu hỏi chuẩn ngoại ngữ đầu ra là gì?
     def summarize_language_requirements(self, data, question):
+        return self.complete(self.summarize_language_requirements_request(data, question))
+
+    async def summarize_language_requirements_async(self, data, question):
+        return await self.complete_async(self.summarize_language_requirements_request(data, question))
+
+    def summarize_language_requirements_request(self, data, question):
 
         cu_nhan = []
         ky_su = []
@@ -254,7 +406,7 @@ class OpenAIHandler:
     {text}
     """
 
-        response = self.client.chat.completions.create(
+        return self._llm_request(
             model="gpt-4o-mini",
             messages=[
                 {"role": "system", "content": "Bạn là trợ lý học vụ Đại học Bách Khoa."},
@@ -262,12 +414,16 @@ class OpenAIHandler:
             ],
             temperature=0
         )
-
-        return response.choices[0].message.content.strip()
         
 
     #àm toán tắt riêng cho câu hỏi chuẩn ngoại ngữ đầu ra của 1 học phần cụ thể là gì?
     def summarize_language_requirements_ctdt(self, data, question):
+        return self.complete(self.summarize_language_requirements_ctdt_request(data, question))
+
+    async def summarize_language_requirements_ctdt_async(self, data, question):
+        return await self.complete_async(self.summarize_language_requirements_ctdt_request(data, question))
+
+    def summarize_language_requirements_ctdt_request(self, data, question):
 
         if not data or not data.get("ten_chuong_trinh"):
             return "Hiện tại tôi chưa tìm thấy thông tin chuẩn ngoại ngữ đầu ra cho chương trình đào tạo bạn hỏi."
@@ -342,7 +498,7 @@ class OpenAIHandler:
         Chỉ trả về nội dung đã trình bày, không kèm giải thích.
     """
 
-        response = self.client.chat.completions.create(
+        return self._llm_request(
             model="gpt-4o-mini",
             messages=[
                 {"role": "system", "content": "Bạn là trợ lý học vụ Đại học Bách Khoa."},
@@ -351,13 +507,17 @@ class OpenAIHandler:
             temperature=0
         )
 
-        return response.choices[0].message.content.strip()
-
     def summarize_language_score_requirement_properties(self, data, question: str):
         """
         Xử lý tất cả chứng chỉ ngoại ngữ cho câu hỏi dạng:
         - TOEIC/IELTS/Cambridge/TOEFL_iBT/TOEFL_ITP/JLPT/NAT_TEST/TOP_J/DELF_va_DALF/TCF
         """
+        return self.complete(self.summarize_language_score_requirement_properties_request(data, question))
+
+    async def summarize_language_score_requirement_properties_async(self, data, question: str):
+        return await self.complete_async(self.summarize_language_score_requirement_properties_request(data, question))
+
+    def summarize_language_score_requirement_properties_request(self, data, question: str):
         cert_keywords = [
             "toeic","ielts","toefl","cambridge","chung_chi",
             "jlpt","nat_test","top_j","delf","tcf"
@@ -369,11 +529,17 @@ class OpenAIHandler:
         else:
             requested_cert = None
 
+        # Neo4jHandler.query_language_requirement trả về (danh sách, chứng chỉ khớp)
+        rows, matched_cert = data if isinstance(data, tuple) else (data, None)
+        context = to_table(rows, ["chuong_trinh", "ngon_ngu", "cert"], hoist_constants=False)
+        if matched_cert:
+            context = f"chung_chi: {matched_cert}\n{context}"
+
         prompt = f"""
     Bạn là trợ lý học vụ Đại học Bách Khoa.
 
     Dữ liệu chuẩn đầu ra ngoại ngữ từ hệ thống:
-    {data}
+{context}
 
     Câu hỏi:
     "{question}"
@@ -411,12 +577,11 @@ class OpenAIHandler:
 
     """
 
-        response = self.client.chat.completions.create(
+        return self._llm_request(
             model="gpt-4o-mini",
             messages=[{"role": "user", "content": prompt}],
             temperature=0
         )
-        return response.choices[0].message.content.strip()
 
 
     def summarize_language_framework(self, data, question: str):
@@ -425,6 +590,12 @@ class OpenAIHandler:
         - data: trả về từ get_khung_nang_luc_ngoai_ngu()
         - question: câu hỏi người dùng
         """
+        return self.complete(self.summarize_language_framework_request(data, question))
+
+    async def summarize_language_framework_async(self, data, question: str):
+        return await self.complete_async(self.summarize_language_framework_request(data, question))
+
+    def summarize_language_framework_request(self, data, question: str):
  
         prompt = f"""
         Bạn là trợ lý học vụ Đại học Bách Khoa.
@@ -446,30 +617,45 @@ class OpenAIHandler:
 
         """
 
-        response = self.client.chat.completions.create(
+        return self._llm_request(
             model="gpt-4o-mini",
             messages=[{"role": "user", "content": prompt}],
             temperature=0
         )
 
-        return response.choices[0].message.content.strip()
-
     def get_course(self, data: list, question: str):
+        return self.complete(self.get_course_request(data, question))
+
+    async def get_course_async(self, data: list, question: str):
+        return await self.complete_async(self.get_course_request(data, question))
+
+    def _course_context(self, data):
+        # Thông tin CTĐT dạng "khóa: giá trị", học phần mỗi hệ 1 bảng
+        if not isinstance(data, dict):
+            return to_table(data)
+
+        sections = [to_fields(data, [k for k in data if k != "hoc_phan_theo_he"])]
+        for nhom in data.get("hoc_phan_theo_he") or []:
+            sections.append(
+                f"Học phần hệ {nhom.get('he')} ({nhom.get('tong_so_hoc_phan')} học phần):\n"
+                + to_table(nhom.get("danh_sach_hoc_phan"), ["loai", "ten", "ma_hoc_phan", "so_tin_chi"],
+                           hoist_constants=False)
+            )
+        return "\n\n".join(sections)
 
-        try:
-            data_json = json.dumps(data, ensure_ascii=False, indent=2)
-        except Exception:
-            data_json = str(data)
+    def get_course_request(self, data: list, question: str):
+
+        context = self._course_context(data)
 
         prompt = f"""
         Bạn là trợ lý AI tư vấn chương trình đào tạo cho sinh viên.
 
-        Bạn chỉ được sử dụng dữ liệu trong JSON dưới đây, tuyệt đối không được suy đoán hay bịa thông tin.
+        Bạn chỉ được sử dụng dữ liệu dưới đây, tuyệt đối không được suy đoán hay bịa thông tin.
 
         ========================
         DỮ LIỆU NEO4J
         ========================
-        {data_json}
+        {context}
 
         ========================
         CÂU HỎI NGƯỜI DÙNG
@@ -482,7 +668,7 @@ class OpenAIHandler:
 
         Hãy trả lời bằng văn phong tự nhiên, dễ hiểu, giống người tư vấn.
 
-        Không liệt kê máy móc theo dạng JSON hay key:value.
+        Không liệt kê máy móc theo dạng bảng hay key:value.
 
         Không nhắc lại câu hỏi.
 
@@ -664,7 +850,7 @@ class OpenAIHandler:
 
         model_name = getattr(self, "model_reasoning", None) or "gpt-4o-mini"
 
-        response = self.client.chat.completions.create(
+        return self._llm_request(
             model=model_name,
             messages=[
                 {
@@ -679,26 +865,26 @@ class OpenAIHandler:
             temperature=0
         )
 
-        return response.choices[0].message.content.strip()
-
 
     def get_list_course(self, data: list, question: str):
         """
         Format danh sách tất cả chương trình đào tạo để trả lời chatbot.
         """
+        return self.complete(self.get_list_course_request(data, question))
 
-        
-        try:
-            data_json = json.dumps(data, ensure_ascii=False, indent=2)
-        except Exception:
-            data_json = str(data)
+    async def get_list_course_async(self, data: list, question: str):
+        return await self.complete_async(self.get_list_course_request(data, question))
+
+    def get_list_course_request(self, data: list, question: str):
+
+        context = to_table(data, hoist_constants=False)
 
         prompt = f"""
         Bạn là trợ lý AI chuyên trả lời câu hỏi về danh sách chương trình đào tạo.
-        Bạn KHÔNG được bịa dữ liệu. Chỉ dùng đúng dữ liệu trong JSON dưới đây.
+        Bạn KHÔNG được bịa dữ liệu. Chỉ dùng đúng dữ liệu trong bảng dưới đây.
 
         Danh sách CTĐT:
-        {data_json}
+        {context}
 
         Câu hỏi người dùng: "{question}"
 
@@ -726,7 +912,7 @@ class OpenAIHandler:
 
         model_name = getattr(self, "model_reasoning", None) or "gpt-4o-mini"
 
-        response = self.client.chat.completions.create(
+        return self._llm_request(
             model=model_name,
             messages=[
                 {"role": "system", "content": "Bạn là trợ lý AI chuyên liệt kê danh sách CTĐT."},
@@ -735,9 +921,13 @@ class OpenAIHandler:
             temperature=0
         )
 
-        return response.choices[0].message.content.strip()
-
     def get_hoc_phan_theo_hoc_ky_ctdt(self, question: str, data: dict):
+        return self.complete(self.get_hoc_phan_theo_hoc_ky_ctdt_request(question, data))
+
+    async def get_hoc_phan_theo_hoc_ky_ctdt_async(self, question: str, data: dict):
+        return await self.complete_async(self.get_hoc_phan_theo_hoc_ky_ctdt_request(question, data))
+
+    def get_hoc_phan_theo_hoc_ky_ctdt_request(self, question: str, data: dict):
 
         danh_sach = data.get("danh_sach_hoc_phan", [])
         ten_ctdt = data.get("ten_chuong_trinh", "")
@@ -750,7 +940,7 @@ class OpenAIHandler:
 
     Dữ liệu học phần của chương trình đào tạo "{ten_ctdt}":
 
-    {danh_sach}
+    {to_table(danh_sach, ["ten_hoc_ky", "ten_mon", "ma_hoc_phan", "so_tin_chi"], hoist_constants=False)}
 
     =================================
     CÂU HỎI
@@ -809,31 +999,97 @@ class OpenAIHandler:
     ---------------------------------
     """
 
-        try:
-            model_name = getattr(self, "model_reasoning", None) or "gpt-4o-mini"
-
-            response = self.client.chat.completions.create(
-                model=model_name,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "Bạn là trợ lý tư vấn chương trình đào tạo đại học, trả lời chính xác dựa trên dữ liệu Neo4j."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                temperature=0
-            )
-
-            return response.choices[0].message.content.strip()
+        model_name = getattr(self, "model_reasoning", None) or "gpt-4o-mini"
 
-        except Exception as e:
-            print("❌ Lỗi GPT:", e)
-            return "Xin lỗi, hệ thống gặp lỗi khi xử lý câu hỏi."
+        return self._llm_request(
+            model=model_name,
+            messages=[
+                {
+                    "role": "system",
+                    "content": "Bạn là trợ lý tư vấn chương trình đào tạo đại học, trả lời chính xác dựa trên dữ liệu Neo4j."
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            temperature=0,
+            on_error=_gpt_error_reply
+        )
 
     def get_tien_quyet(self, question: str, data: dict):
+        return self.complete(self.get_tien_quyet_request(question, data))
+
+    async def get_tien_quyet_async(self, question: str, data: dict):
+        return await self.complete_async(self.get_tien_quyet_request(question, data))
+
+    def _tien_quyet_template_answer(self, question: str, data: dict):
+        """
+        Trả lời thẳng từ đồ thị tiên quyết đã tính sẵn (không gọi LLM) cho các câu hỏi dạng liệt kê:
+        - "nếu rớt X thì không học được môn nào?"
+        - "để học X cần học trước môn nào?"
+        - "CTĐT A có những học phần tiên quyết nào?"
+        Trả về None nếu câu hỏi cần LLM diễn giải.
+        """
+        q = question.lower()
+        ten_ctdt = data.get("ten_chuong_trinh", "")
+        hoc_phan = data.get("hoc_phan_hoi")
+
+        def bullet(names):
+            return "\n".join(f"- {n}" for n in names)
+
+        if hoc_phan is None:
+            chinh_thuc = data.get("hoc_phan_tien_quyet_chinh_thuc")
+            if chinh_thuc and any(k in q for k in (
+                "những học phần tiên quyết", "các học phần tiên quyết",
+                "học phần nào là học phần tiên quyết", "danh sách học phần tiên quyết"
+            )):
+                return f"Chương trình đào tạo {ten_ctdt} có các học phần tiên quyết sau:\n{bullet(chinh_thuc)}"
+            return None
+
+        x = hoc_phan["ten"]
+
+        if any(k in q for k in ("rớt", "trượt", "không qua", "không đạt")):
+            if not hoc_phan["co_trong_ctdt"]:
+                return f"Không có học phần {x} trong chương trình đào tạo {ten_ctdt}."
+            # co_trong_ctdt nhưng không có trong đồ thị tiên quyết → không có bi_tien_quyet_truc_tiep
+            truc_tiep = hoc_phan.get("bi_tien_quyet_truc_tiep")
+            if not truc_tiep:
+                return (
+                    f"Trong chương trình đào tạo {ten_ctdt}, học phần {x} "
+                    "không phải là học phần tiên quyết của học phần nào."
+                )
+            answer = (
+                f"Trong chương trình đào tạo {ten_ctdt}, nếu bạn rớt học phần \"{x}\" "
+                f"thì bạn sẽ không được học các học phần sau:\n{bullet(truc_tiep)}"
+            )
+            if hoc_phan.get("bi_tien_quyet_gian_tiep"):
+                answer += (
+                    "\n\nNgoài ra, do chuỗi tiên quyết, bạn cũng chưa thể học:\n"
+                    f"{bullet(hoc_phan['bi_tien_quyet_gian_tiep'])}"
+                )
+            return answer
+
+        if ("học trước" in q or "cần học" in q) and "có phải" not in q:
+            if not hoc_phan["co_trong_ctdt"]:
+                return f"Không có học phần {x} trong chương trình đào tạo {ten_ctdt}."
+            truc_tiep = hoc_phan.get("tien_quyet_truc_tiep")
+            if not truc_tiep:
+                return f"Học phần \"{x}\" trong chương trình đào tạo {ten_ctdt} không có học phần tiên quyết."
+            answer = (
+                f"Để học môn \"{x}\" trong chương trình đào tạo {ten_ctdt}, "
+                f"bạn cần học trước các học phần sau:\n{bullet(truc_tiep)}"
+            )
+            if hoc_phan.get("tien_quyet_gian_tiep"):
+                answer += (
+                    "\n\nCác học phần trên lại yêu cầu học trước:\n"
+                    f"{bullet(hoc_phan['tien_quyet_gian_tiep'])}"
+                )
+            return answer
+
+        return None
+
+    def get_tien_quyet_request(self, question: str, data: dict):
 
         danh_sach = data.get("danh_sach_tien_quyet", [])
         ten_ctdt = data.get("ten_chuong_trinh", "")
@@ -841,12 +1097,29 @@ class OpenAIHandler:
         if not danh_sach:
             return "Xin lỗi, tôi không tìm thấy thông tin học phần tiên quyết cho chương trình đào tạo này."
 
+        answer = self._tien_quyet_template_answer(question, data)
+        if answer:
+            return answer
+
+        # Chỉ gửi phần đồ thị liên quan tới học phần được hỏi (nếu xác định được)
+        hoc_phan = data.get("hoc_phan_hoi")
+        tom_tat = ""
+        if hoc_phan and hoc_phan.get("co_quan_he_tien_quyet"):
+            tom_tat = f"""
+    Dữ liệu trên CHỈ gồm các quan hệ tiên quyết liên quan tới học phần "{hoc_phan['ten']}".
+    Học phần không xuất hiện trong dữ liệu nghĩa là không có quan hệ tiên quyết với "{hoc_phan['ten']}".
+
+    Tóm tắt đã tính sẵn cho học phần "{hoc_phan['ten']}":
+{to_fields(hoc_phan)}
+"""
+
         prompt = f"""
     Bạn là trợ lý học vụ đại học.
 
     Dữ liệu học phần tiên quyết của chương trình đào tạo "{ten_ctdt}":
 
-    {danh_sach}
+{to_table(danh_sach)}
+{tom_tat}
 
     =================================
     CÂU HỎI
@@ -1036,32 +1309,36 @@ class OpenAIHandler:
     - Nếu liệt kê nhiều học phần → phân tách bằng dấu phẩy.
     """
 
-        try:
-            model_name = getattr(self, "model_reasoning", None) or "gpt-4o-mini"
-
-            response = self.client.chat.completions.create(
-                model=model_name,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "Bạn là trợ lý tư vấn chương trình đào tạo đại học, trả lời chính xác dựa trên dữ liệu Neo4j."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                temperature=0
-            )
-
-            return response.choices[0].message.content.strip()
+        model_name = getattr(self, "model_reasoning", None) or "gpt-4o-mini"
 
-        except Exception as e:
-            print("❌ Lỗi GPT:", e)
-            return "Xin lỗi, hệ thống gặp lỗi khi xử lý câu hỏi."
+        return self._llm_request(
+            model=model_name,
+            messages=[
+                {
+                    "role": "system",
+                    "content": "Bạn là trợ lý tư vấn chương trình đào tạo đại học, trả lời chính xác dựa trên dữ liệu Neo4j."
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            temperature=0,
+            on_error=_gpt_error_reply
+        )
 
 
     def get_song_hanh(self, question: str, data: dict):
+        return self.complete(self.get_song_hanh_request(question, data))
+
+    async def get_song_hanh_async(self, question: str, data: dict):
+        return await self.complete_async(self.get_song_hanh_request(question, data))
+
+    def get_song_hanh_request(self, question: str, data: dict):
+
+        # Neo4jHandler.get_song_hanh trả về chuỗi thông báo khi thiếu tên CTĐT
+        if isinstance(data, str):
+            return data
 
         danh_sach = data.get("song_hanh", [])
         ten_ctdt = data.get("ten_chuong_trinh", "")
@@ -1074,7 +1351,7 @@ class OpenAIHandler:
 
     Dữ liệu quan hệ học phần song hành của chương trình đào tạo "{ten_ctdt}":
 
-    {danh_sach}
+{to_table(danh_sach)}
 
     =================================
     CÂU HỎI
@@ -1202,37 +1479,64 @@ class OpenAIHandler:
     - Nếu liệt kê nhiều học phần → phân tách bằng dấu phẩy
     """
 
-        try:
-            model_name = getattr(self, "model_reasoning", None) or "gpt-4o-mini"
-
-            response = self.client.chat.completions.create(
-                model=model_name,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "Bạn là trợ lý tư vấn chương trình đào tạo đại học, trả lời chính xác dựa trên dữ liệu Neo4j."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                temperature=0
-            )
+        model_name = getattr(self, "model_reasoning", None) or "gpt-4o-mini"
 
-            return response.choices[0].message.content.strip()
+        return self._llm_request(
+            model=model_name,
+            messages=[
+                {
+                    "role": "system",
+                    "content": "Bạn là trợ lý tư vấn chương trình đào tạo đại học, trả lời chính xác dựa trên dữ liệu Neo4j."
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            temperature=0,
+            on_error=_gpt_error_reply
+        )
 
-        except Exception as e:
-            print("❌ Lỗi GPT:", e)
-            return "Xin lỗi, hệ thống gặp lỗi khi xử lý câu hỏi."
 
 
+    # ---------- Diễn đạt lại câu trả lời dựng sẵn ----------
+    def polish_answer_request(self, answer, question):
+        """
+        Câu trả lời từ answer_templates → LLM chỉ viết lại cho tự nhiên (prompt nhỏ, không gửi dữ liệu thô).
+        Lỗi GPT → dùng nguyên câu trả lời dựng sẵn.
+        """
+        prompt = f"""
+Người dùng hỏi: "{question}"
+
+Câu trả lời đã soạn từ dữ liệu:
+{answer}
+
+Hãy viết lại câu trả lời trên bằng tiếng Việt tự nhiên, thân thiện.
+Giữ nguyên mọi tên, mã, con số; không thêm thông tin ngoài câu trả lời đã soạn; giữ dạng danh sách nếu có.
+"""
+
+        def _keep_template(e):
+            print("⚠️ Lỗi GPT khi diễn đạt lại, dùng câu trả lời dựng sẵn:", e)
+            return answer
+
+        return self._llm_request(
+            model=self.model_reasoning,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.3,
+            on_error=_keep_template
+        )
 
     # ---------- Reasoning ----------
     def reason_over_results(self, search_results, question):
         """
         Dùng GPT để tổng hợp kết quả từ BM25 + Vector Search.
         """
+        return self.complete(self.reason_over_results_request(search_results, question))
+
+    async def reason_over_results_async(self, search_results, question):
+        return await self.complete_async(self.reason_over_results_request(search_results, question))
+
+    def reason_over_results_request(self, search_results, question):
         if not search_results:
             return "Không tìm thấy thông tin phù hợp với câu hỏi."
 
@@ -1246,7 +1550,7 @@ Dưới đây là các kết quả tìm kiếm liên quan:
 Hãy viết câu trả lời ngắn gọn, tự nhiên, rõ ràng và chính xác bằng tiếng Việt.
 """
 
-        response = client.chat.completions.create(
+        return self._llm_request(
             model=self.model_reasoning,
             messages=[
                 {"role": "system", "content": "Bạn là trợ lý thông minh giúp trả lời câu hỏi học vụ."},
@@ -1254,4 +1558,3 @@ Hãy viết câu trả lời ngắn gọn, tự nhiên, rõ ràng và chính xá
             ],
             temperature=0.5
         )
-        return response.choices[0].message.content.strip()
@@ -0,0 +1,176 @@
+# backend/prerequisite_graph.py
+from array import array
+from collections import deque
+
+from backend.entity_matcher import fold_vietnamese
+
+
+class PrerequisiteGraph:
+    """
+    Đồ thị tiên quyết của 1 CTĐT, giữ trong process.
+
+    - Mỗi học phần được đánh số 0..n-1, thông tin (tên, mã, tín chỉ, labels) lưu theo số.
+    - Cạnh A → B nghĩa là "A là học phần tiên quyết của B".
+    - Kề xuôi (A → các học phần bị A tiên quyết) và kề ngược (B → các tiên quyết của B)
+      lưu dạng CSR: offsets + targets bằng array('i').
+    """
+
+    def __init__(self, program_name, records):
+        self.program_name = program_name
+
+        self.names = []
+        self.codes = []
+        self.credits = []
+        self.labels = []
+        self._index = {}
+        self._folded_index = {}
+
+        edges = set()
+        for r in records:
+            src = self._add_node(r.get("ten_hoc_phan_tien_quyet"), r.get("ma_hoc_phan_tien_quyet"),
+                                 r.get("so_tin_chi_tien_quyet"), r.get("labels_tq"))
+            dst = self._add_node(r.get("ten_hoc_phan_bi_tien_quyet"), r.get("ma_hoc_phan_bi_tien_quyet"),
+                                 None, r.get("labels_hp"))
+            if src is not None and dst is not None and src != dst:
+                edges.add((src, dst))
+
+        self.edge_count = len(edges)
+        self._out_offsets, self._out_targets = self._build_csr(edges)
+        self._in_offsets, self._in_targets = self._build_csr((dst, src) for src, dst in edges)
+
+    def _add_node(self, name, code, credits, labels):
+        if not name:
+            return None
+
+        idx = self._index.get(name)
+        if idx is None:
+            idx = len(self.names)
+            self._index[name] = idx
+            self._folded_index.setdefault(fold_vietnamese(name), idx)
+            self.names.append(name)
+            self.codes.append(code)
+            self.credits.append(credits)
+            self.labels.append(labels or [])
+        else:
+            # cùng 1 học phần có thể xuất hiện ở cả 2 đầu cạnh → bổ sung thông tin còn thiếu
+            self.codes[idx] = self.codes[idx] or code
+            self.credits[idx] = self.credits[idx] or credits
+            if labels and not self.labels[idx]:
+                self.labels[idx] = labels
+        return idx
+
+    def _build_csr(self, pairs):
+        n = len(self.names)
+        buckets = [[] for _ in range(n)]
+        for src, dst in pairs:
+            buckets[src].append(dst)
+
+        offsets = array("i", [0])
+        targets = array("i")
+        for b in buckets:
+            targets.extend(sorted(b, key=self.names.__getitem__))
+            offsets.append(len(targets))
+        return offsets, targets
+
+    def __len__(self):
+        return len(self.names)
+
+    # ---------- tra cứu ----------
+    def index_of(self, course_name):
+        """
+        Số hiệu học phần theo tên (khớp chính xác, sau đó khớp không dấu). None nếu không có.
+        """
+        if not course_name:
+            return None
+        idx = self._index.get(course_name)
+        if idx is None:
+            idx = self._folded_index.get(fold_vietnamese(course_name))
+        return idx
+
+    def _neighbors(self, offsets, targets, idx):
+        return targets[offsets[idx]:offsets[idx + 1]]
+
+    def _reachable(self, offsets, targets, idx):
+        # BFS, trả về theo thứ tự khoảng cách tăng dần (không gồm idx)
+        seen = {idx}
+        order = []
+        queue = deque([idx])
+        while queue:
+            u = queue.popleft()
+            for v in self._neighbors(offsets, targets, u):
+                if v not in seen:
+                    seen.add(v)
+                    order.append(v)
+                    queue.append(v)
+        return order
+
+    def direct_prerequisites(self, idx):
+        return list(self._neighbors(self._in_offsets, self._in_targets, idx))
+
+    def all_prerequisites(self, idx):
+        return self._reachable(self._in_offsets, self._in_targets, idx)
+
+    def direct_dependents(self, idx):
+        return list(self._neighbors(self._out_offsets, self._out_targets, idx))
+
+    def all_dependents(self, idx):
+        return self._reachable(self._out_offsets, self._out_targets, idx)
+
+    def official_prerequisites(self):
+        """
+        Học phần có label HocPhanTienQuyet và là tiên quyết của ít nhất 1 học phần.
+        """
+        return sorted(
+            (i for i in range(len(self.names))
+             if "HocPhanTienQuyet" in self.labels[i] and self._out_offsets[i + 1] > self._out_offsets[i]),
+            key=self.names.__getitem__
+        )
+
+    # ---------- xuất dữ liệu ----------
+    def _edge(self, src, dst):
+        return {
+            "hoc_phan_tien_quyet": self.names[src],
+            "ma_hoc_phan_tien_quyet": self.codes[src],
+            "loai_hoc_phan_cua_hoc_phan_tien_quyet": self.labels[src],
+            "so_tin_chi_tien_quyet": self.credits[src],
+            "hoc_phan_bi_tien_quyet": self.names[dst],
+            "ma_hoc_phan_bi_tien_quyet": self.codes[dst],
+            "loai_hoc_phan_cua_hoc_phan_bi_tien_quyet": self.labels[dst],
+            "quan_he": "là học phần tiên quyết của"
+        }
+
+    def edges(self):
+        return [
+            self._edge(src, dst)
+            for src in range(len(self.names))
+            for dst in self.direct_dependents(src)
+        ]
+
+    def subgraph_edges(self, idx):
+        """
+        Các cạnh trên chuỗi tiên quyết đi vào idx và chuỗi học phần phụ thuộc đi ra từ idx.
+        """
+        ancestors = set(self.all_prerequisites(idx))
+        descendants = set(self.all_dependents(idx))
+
+        result = []
+        for v in [idx, *ancestors]:
+            for u in self.direct_prerequisites(v):
+                result.append(self._edge(u, v))
+        for u in [idx, *descendants]:
+            for v in self.direct_dependents(u):
+                result.append(self._edge(u, v))
+        return result
+
+    def course_summary(self, idx):
+        names = self.names
+        prereqs = self.direct_prerequisites(idx)
+        dependents = self.direct_dependents(idx)
+        return {
+            "ten": names[idx],
+            "ma_hoc_phan": self.codes[idx],
+            "tien_quyet_truc_tiep": [names[i] for i in prereqs],
+            "tien_quyet_gian_tiep": [names[i] for i in self.all_prerequisites(idx) if i not in prereqs],
+            "bi_tien_quyet_truc_tiep": [names[i] for i in dependents],
+            "bi_tien_quyet_gian_tiep": [names[i] for i in self.all_dependents(idx) if i not in dependents],
+        }
@@ -0,0 +1,160 @@
+# backend/prompt_serializer.py
+"""
+Chuyển kết quả Neo4j thành ngữ cảnh prompt gọn (ít token) cho OpenAIHandler.
+
+- to_table(): danh sách bản ghi → 1 dòng tiêu đề + mỗi bản ghi 1 dòng, cột cách nhau bằng " | "
+  (tên khóa dài chỉ xuất hiện 1 lần thay vì lặp lại ở mọi dòng như JSON / repr).
+- Bỏ giá trị null / rỗng, bỏ cột rỗng ở mọi dòng; cột có cùng 1 giá trị ở mọi dòng
+  được đưa lên trên bảng thành 1 dòng "khóa: giá trị".
+- count_tokens() / count_message_tokens(): đếm token của prompt (tiktoken nếu có,
+  không thì ước lượng theo số ký tự).
+- count_message_tokens_async(): cho route async; prompt lớn hoặc tokenizer chưa nạp (lần đầu tiktoken
+  tải bảng BPE qua mạng) → đếm trong thread, không chặn event loop. Nạp sẵn bằng load_encoding() lúc warmup.
+"""
+import asyncio
+import logging
+import math
+import os
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken
+except ImportError:  # không có tiktoken → ước lượng
+    tiktoken = None
+
+COLUMN_SEPARATOR = " | "
+LIST_SEPARATOR = ", "
+
+# Ước lượng khi không có tokenizer: tiếng Việt có dấu ≈ 3 ký tự / token
+CHARS_PER_TOKEN = 3
+
+_encodings = {}
+
+# Prompt từ chừng này ký tự trở lên: bản async đếm token trong thread
+TOKEN_COUNT_THREAD_CHARS = int(os.getenv("TOKEN_COUNT_THREAD_CHARS", "20000"))
+
+
+def _is_empty(value):
+    return value is None or value == "" or value == [] or value == {}
+
+
+def format_value(value):
+    """
+    1 ô của bảng: list → "a, b", dict → "k=v; ...", số thực nguyên → "3",
+    bỏ xuống dòng và ký tự phân cách cột trong chuỗi.
+    """
+    if _is_empty(value):
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, (list, tuple)):
+        return LIST_SEPARATOR.join(format_value(v) for v in value if not _is_empty(v))
+    if isinstance(value, dict):
+        return "; ".join(f"{k}={format_value(v)}" for k, v in value.items() if not _is_empty(v))
+    return " ".join(str(value).replace("|", "/").split())
+
+
+def flatten(record, prefix=""):
+    """
+    {"hoc_phan_1": {"ten": "A"}} → {"hoc_phan_1.ten": "A"} (để dict lồng nhau thành cột).
+    """
+    flat = {}
+    for key, value in record.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{name}."))
+        else:
+            flat[name] = value
+    return flat
+
+
+def to_fields(record, keys=None):
+    """
+    Các trường đơn của 1 bản ghi, mỗi trường 1 dòng "khóa: giá trị" (bỏ trường rỗng).
+    """
+    keys = keys or list(record)
+    return "\n".join(
+        f"{k}: {format_value(record[k])}"
+        for k in keys
+        if not _is_empty(record.get(k))
+    )
+
+
+def to_table(rows, columns=None, hoist_constants=True):
+    """
+    rows: list[dict] (bản ghi Neo4j đã chuẩn hóa); columns: các cột cần giữ, theo thứ tự
+    (None → mọi khóa, theo thứ tự xuất hiện).
+    """
+    rows = [flatten(r) for r in rows or []]
+    if not rows:
+        return ""
+
+    if columns is None:
+        columns = list(dict.fromkeys(k for r in rows for k in r))
+
+    cells = [[format_value(r.get(c)) for c in columns] for r in rows]
+
+    header_lines = []
+    kept = []
+    for i, column in enumerate(columns):
+        values = {row[i] for row in cells}
+        if values == {""}:
+            continue
+        if hoist_constants and len(rows) > 1 and len(values) == 1:
+            header_lines.append(f"{column}: {values.pop()}")
+            continue
+        kept.append(i)
+
+    lines = header_lines
+    if kept:
+        lines.append(COLUMN_SEPARATOR.join(columns[i] for i in kept))
+        lines.extend(COLUMN_SEPARATOR.join(row[i] for i in kept) for row in cells)
+    return "\n".join(lines)
+
+
+# ---------- đếm token ----------
+def _encoding(model):
+    if model not in _encodings:
+        encoding = None
+        if tiktoken is not None:
+            try:
+                try:
+                    encoding = tiktoken.encoding_for_model(model)
+                except KeyError:
+                    # model tiktoken chưa biết → bảng của dòng gpt-4o
+                    encoding = tiktoken.get_encoding("o200k_base")
+            except Exception as e:
+                # tiktoken tải bảng BPE ở lần đầu (cả bảng dự phòng), có thể lỗi khi không có mạng
+                logger.warning(f"⚠️ Không nạp được tokenizer cho {model}, dùng ước lượng: {e}")
+        _encodings[model] = encoding
+    return _encodings[model]
+
+
+def load_encoding(model="gpt-4o-mini"):
+    """
+    Nạp (và tải nếu cần) tokenizer của model; True nếu có tokenizer, False → đếm bằng ước lượng.
+    Gọi trong thread lúc warmup (backend/app/services/warmup.py).
+    """
+    return _encoding(model) is not None
+
+
+def count_tokens(text, model="gpt-4o-mini"):
+    encoding = _encoding(model)
+    if encoding is None:
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+    return len(encoding.encode(text))
+
+
+def count_message_tokens(messages, model="gpt-4o-mini"):
+    """
+    Số token prompt của 1 lần gọi chat completion
+    (nội dung + ~3 token định dạng mỗi message + 3 token mồi câu trả lời).
+    """
+    return sum(count_tokens(m["content"], model) + 3 for m in messages) + 3
+
+
+async def count_message_tokens_async(messages, model="gpt-4o-mini"):
+    if model in _encodings and sum(len(m["content"]) for m in messages) < TOKEN_COUNT_THREAD_CHARS:
+        return count_message_tokens(messages, model)
+    return await asyncio.to_thread(count_message_tokens, messages, model)
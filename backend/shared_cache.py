@@ -0,0 +1,315 @@
+# backend/shared_cache.py
+"""
+Cache 2 tầng dùng chung giữa các worker uvicorn / gunicorn:
+
+- Tầng 1: LRU + TTL trong process, không tốn round trip.
+- Tầng 2: store chung (Redis) cho cả cụm → câu trả lời LLM và payload CTĐT lấy từ Neo4j
+  chỉ tính 1 lần cho cả cụm, worker khác trượt tầng 1 sẽ đọc lại từ Redis.
+
+Bật tầng 2 bằng SHARED_CACHE_URL (vd redis://cache:6379/0); không đặt → chỉ có tầng 1.
+- Khóa Redis: <SHARED_CACHE_PREFIX>:<namespace>:<phiên bản đồ thị>:<sha1 khóa> → đồ thị đổi phiên bản
+  thì không đọc nhầm bản cũ, bản cũ tự hết hạn theo TTL.
+- Giá trị lưu dạng JSON (không dùng pickle): {"value": ..., "expires_at": epoch}.
+- Redis lỗi / chậm → coi như trượt cache, tạm bỏ qua tầng 2 trong SHARED_CACHE_RETRY_SECONDS giây;
+  request chat không bao giờ lỗi vì cache.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from backend.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+SHARED_CACHE_URL = os.getenv("SHARED_CACHE_URL", "")
+SHARED_CACHE_PREFIX = os.getenv("SHARED_CACHE_PREFIX", "chatbot")
+SHARED_CACHE_TIMEOUT = float(os.getenv("SHARED_CACHE_TIMEOUT", "0.2"))
+SHARED_CACHE_RETRY_SECONDS = float(os.getenv("SHARED_CACHE_RETRY_SECONDS", "5"))
+
+
+class SharedStore:
+    """
+    Store chung trên Redis (redis-py: client sync cho luồng sync, redis.asyncio cho route async).
+    Client tạo lười → import module / khởi tạo không mở kết nối mạng.
+    """
+
+    def __init__(self, url, timeout=0.2, retry_seconds=5):
+        self.url = url
+        self.timeout = timeout
+        self.retry_seconds = retry_seconds
+
+        self._client = None
+        self._async_client = None
+        self._down_until = 0.0
+
+        self.errors = 0
+
+    # ---------- client ----------
+    def _options(self):
+        return {
+            "socket_timeout": self.timeout,
+            "socket_connect_timeout": self.timeout,
+            "decode_responses": True,
+        }
+
+    @property
+    def client(self):
+        if self._client is None:
+            import redis
+            self._client = redis.Redis.from_url(self.url, **self._options())
+        return self._client
+
+    @property
+    def async_client(self):
+        # pool async gắn với event loop đang chạy → tạo ở lần dùng đầu tiên
+        if self._async_client is None:
+            import redis.asyncio
+            self._async_client = redis.asyncio.Redis.from_url(self.url, **self._options())
+        return self._async_client
+
+    # ---------- lỗi ----------
+    def _available(self):
+        return time.monotonic() >= self._down_until
+
+    def _failed(self, op, e):
+        self.errors += 1
+        if self._available():
+            logger.warning(f"⚠️ Shared cache lỗi khi {op}, bỏ qua Redis trong {self.retry_seconds:g}s: {e}")
+        self._down_until = time.monotonic() + self.retry_seconds
+
+    # ---------- sync ----------
+    def get(self, key):
+        if not self._available():
+            return None
+        try:
+            return self.client.get(key)
+        except Exception as e:
+            self._failed("GET", e)
+            return None
+
+    def set(self, key, raw, ttl_seconds):
+        if not self._available():
+            return
+        try:
+            self.client.set(key, raw, px=max(int(ttl_seconds * 1000), 1))
+        except Exception as e:
+            self._failed("SET", e)
+
+    # ---------- async ----------
+    async def get_async(self, key):
+        if not self._available():
+            return None
+        try:
+            return await self.async_client.get(key)
+        except Exception as e:
+            self._failed("GET", e)
+            return None
+
+    async def set_async(self, key, raw, ttl_seconds):
+        if not self._available():
+            return
+        try:
+            await self.async_client.set(key, raw, px=max(int(ttl_seconds * 1000), 1))
+        except Exception as e:
+            self._failed("SET", e)
+
+    async def close_async(self):
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    def stats(self):
+        return {"errors": self.errors, "available": self._available()}
+
+
+def build_shared_store(url=None):
+    url = SHARED_CACHE_URL if url is None else url
+    if not url:
+        return None
+    logger.info(f"🗄️ Shared cache: {url.split('@')[-1]}")
+    return SharedStore(url, timeout=SHARED_CACHE_TIMEOUT, retry_seconds=SHARED_CACHE_RETRY_SECONDS)
+
+
+# Dùng chung cho mọi TieredCache của process (answer cache, payload CTĐT)
+shared_store = build_shared_store()
+
+
+class TieredCache:
+    """
+    LRU + TTL trong process, phía sau là SharedStore (tùy chọn).
+
+    - Khóa: tuple bất kỳ dựng được JSON; giá trị: dữ liệu JSON (chuỗi, list, dict...).
+    - Giới hạn max_entries ở tầng 1, loại bỏ theo LRU (max_entries = 0 → tắt cả 2 tầng).
+    - TTL truyền vào khi set (0 → không cache); tầng 1 xóa toàn bộ khi phiên bản đồ thị đổi.
+    - Trượt tầng 1, trúng tầng 2 → chép về tầng 1 với TTL còn lại.
+    """
+
+    def __init__(self, max_entries=1000, namespace="cache", shared=None):
+        self.max_entries = max_entries
+        self.namespace = namespace
+        self.shared = shared if max_entries else None
+
+        self._entries = OrderedDict()  # key → (value, expires_at)
+        self._version = None
+
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+
+    # ---------- tầng 1 ----------
+    def _check_version(self, version):
+        if version is not None and version != self._version:
+            if self._entries:
+                logger.info(f"🔄 Đồ thị đổi phiên bản ({self._version} → {version}), xóa {self.namespace} cache.")
+            self._entries.clear()
+            self._version = version
+
+    def _get_local(self, key, version):
+        with self._lock:
+            self._check_version(version)
+
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            value, expires_at = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def _put_local(self, key, value, ttl_seconds, version):
+        if not ttl_seconds or not value or not self.max_entries:
+            return False
+
+        with self._lock:
+            # giá trị tạo từ phiên bản đồ thị cũ → bỏ qua
+            if version is not None and version != self._version:
+                return False
+
+            self._entries[key] = (value, time.monotonic() + ttl_seconds)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return True
+
+    def _miss(self):
+        with self._lock:
+            self.misses += 1
+        return None
+
+    # ---------- tầng 2 ----------
+    def _shared_key(self, key, version):
+        digest = hashlib.sha1(json.dumps(key, ensure_ascii=False, default=str).encode()).hexdigest()
+        return f"{SHARED_CACHE_PREFIX}:{self.namespace}:{version}:{digest}"
+
+    def _encode(self, value, ttl_seconds):
+        try:
+            return json.dumps({"value": value, "expires_at": time.time() + ttl_seconds}, ensure_ascii=False)
+        except (TypeError, ValueError) as e:
+            logger.debug(f"Bỏ qua shared cache ({self.namespace}): giá trị không chuyển được sang JSON: {e}")
+            return None
+
+    def _from_shared(self, key, version, raw):
+        if raw is None:
+            return None
+        try:
+            envelope = json.loads(raw)
+            value, ttl_left = envelope["value"], envelope["expires_at"] - time.time()
+        except (ValueError, TypeError, KeyError):
+            return None
+        if ttl_left <= 0:
+            return None
+
+        self._put_local(key, value, ttl_left, version)
+        with self._lock:
+            self.shared_hits += 1
+        return value
+
+    # ---------- sync ----------
+    def get(self, key, version=None):
+        value = self._get_local(key, version)
+        if value is not None:
+            return value
+
+        if self.shared is not None:
+            value = self._from_shared(key, version, self.shared.get(self._shared_key(key, version)))
+            if value is not None:
+                return value
+        return self._miss()
+
+    def set(self, key, value, ttl_seconds, version=None):
+        if not self._put_local(key, value, ttl_seconds, version) or self.shared is None:
+            return
+
+        raw = self._encode(value, ttl_seconds)
+        if raw is not None:
+            self.shared.set(self._shared_key(key, version), raw, ttl_seconds)
+
+    # ---------- async ----------
+    async def get_async(self, key, version=None):
+        value = self._get_local(key, version)
+        if value is not None:
+            return value
+
+        if self.shared is not None:
+            raw = await self.shared.get_async(self._shared_key(key, version))
+            value = self._from_shared(key, version, raw)
+            if value is not None:
+                return value
+        return self._miss()
+
+    async def set_async(self, key, value, ttl_seconds, version=None):
+        if not self._put_local(key, value, ttl_seconds, version) or self.shared is None:
+            return
+
+        raw = self._encode(value, ttl_seconds)
+        if raw is not None:
+            await self.shared.set_async(self._shared_key(key, version), raw, ttl_seconds)
+
+    def invalidate(self):
+        # chỉ tầng 1; tầng 2 tách theo phiên bản đồ thị trong khóa
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        total = self.hits + self.shared_hits + self.misses
+        return {
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round((self.hits + self.shared_hits) / total, 4) if total else 0.0,
+            "size": len(self._entries),
+            "version": self._version,
+            "shared": self.shared is not None,
+        }
+
+
+def _collect_shared_store_stats():
+    if shared_store is None:
+        return []
+    stats = shared_store.stats()
+    return [
+        ("chatbot_shared_cache_errors_total", "Số lần Redis (shared cache) lỗi / quá thời gian", {}, stats["errors"]),
+        ("chatbot_shared_cache_available", "Shared cache đang dùng được (1) hay tạm bỏ qua (0)", {},
+         int(stats["available"])),
+    ]
+
+
+REGISTRY.add_collector(_collect_shared_store_stats)
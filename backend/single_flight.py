@@ -0,0 +1,113 @@
+# backend/single_flight.py
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Flight:
+    """
+    1 lần tính câu trả lời đang chạy, dùng chung cho mọi request cùng khóa.
+
+    - task: asyncio.Task chạy độc lập với request đã tạo nó → client ngắt kết nối giữa chừng
+      không làm hỏng kết quả của các request đang chờ.
+    - tokens: các đoạn câu trả lời đã sinh (request stream đọc lại từ đầu rồi chờ đoạn mới).
+    - has_data: đã lấy xong dữ liệu Neo4j chưa / có dữ liệu không (sự kiện "data" của SSE).
+    """
+
+    def __init__(self):
+        self.task = None
+        self.tokens = []
+        self.has_data = None
+        self.waiters = 0
+        self._changed = asyncio.Event()
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def set_data(self, has_data):
+        self.has_data = has_data
+        self._notify()
+
+    def publish(self, token):
+        self.tokens.append(token)
+        self._notify()
+
+    async def _wait_change(self):
+        await self._changed.wait()
+
+    async def result(self):
+        # shield: request này bị hủy không hủy lần tính chung; lỗi của lần tính → ném lại cho mọi request
+        return await asyncio.shield(self.task)
+
+    async def data(self):
+        while self.has_data is None:
+            if self.task.done():
+                self.task.result()
+                return False
+            await self._wait_change()
+        return self.has_data
+
+    async def stream(self):
+        i = 0
+        while True:
+            if i < len(self.tokens):
+                yield self.tokens[i]
+                i += 1
+                continue
+            if self.task.done():
+                self.task.result()
+                return
+            await self._wait_change()
+
+
+class SingleFlight:
+    """
+    Gộp các lần tính trùng khóa đang chạy đồng thời (trong 1 process, 1 event loop):
+    request đầu tiên tạo Flight, request đến sau khi Flight chưa xong thì chờ chung kết quả / lỗi.
+    Flight xong → bỏ khỏi bảng, request sau đó đọc answer cache như thường.
+    """
+
+    def __init__(self):
+        self._flights = {}
+
+        self.started = 0
+        self.joined = 0
+
+    def join(self, key, compute):
+        """
+        compute(flight) → coroutine trả về kết quả, chỉ gọi khi chưa có Flight cho key.
+        Trả về (flight, leader): leader=False → request này dùng chung lần tính đã có.
+        """
+        flight = self._flights.get(key)
+        if flight is not None:
+            flight.waiters += 1
+            self.joined += 1
+            return flight, False
+
+        flight = Flight()
+        self._flights[key] = flight
+        self.started += 1
+        flight.task = asyncio.ensure_future(compute(flight))
+        flight.task.add_done_callback(lambda task: self._finish(key, flight, task))
+        return flight, True
+
+    def _finish(self, key, flight, task):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if flight.waiters:
+            logger.info(f"🔗 {flight.waiters} request dùng chung 1 lần tính (không gọi lại Neo4j / LLM)")
+        # lỗi đã chuyển cho các request đang chờ; đánh dấu đã đọc để asyncio không cảnh báo
+        if not task.cancelled():
+            task.exception()
+        flight._notify()
+
+    def stats(self):
+        total = self.started + self.joined
+        return {
+            "started": self.started,
+            "joined": self.joined,
+            "in_flight": len(self._flights),
+            "coalesced_ratio": round(self.joined / total, 4) if total else 0.0,
+        }
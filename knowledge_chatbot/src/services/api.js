@@ -20,4 +20,16 @@ api.interceptors.request.use((config) => {
 export default api;
 export const deleteConversation = async (conversationId) => {
   return api.delete(`/chat/conversations/${conversationId}`);
-};
\ No newline at end of file
+};
+// API lịch sử chat / admin phân trang keyset: cursor trang sau nằm ở header X-Next-Cursor,
+// gửi lại qua ?before=... tới khi hết. older=true: trang sau là dữ liệu cũ hơn, ghép lên đầu (tin nhắn).
+export const getAllPages = async (path, { older = false } = {}) => {
+  let items = [];
+  let before = null;
+  do {
+    const res = await api.get(path, { params: before ? { before } : {} });
+    items = older ? [...res.data, ...items] : [...items, ...res.data];
+    before = res.headers["x-next-cursor"];
+  } while (before);
+  return items;
+};